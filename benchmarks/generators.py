@@ -0,0 +1,58 @@
+"""
+Synthetic proof graphs for the benchmarks.
+"""
+
+import random
+
+import networkx
+
+RULES = ["Ax", "∧L", "∧R", "∨L", "∨R", "→L", "→R", "¬L", "¬R", "MP"]
+STATUSES = ["valid", "invalid", "depends", "assumed"]
+
+
+def formula(i: int, rng: random.Random):
+    a, b = rng.randrange(64), rng.randrange(64)
+    return f"(p{a} → q{b}) ∧ r{i}"
+
+
+def proof_dag(count: int, seed: int = 0, window: int = 64, max_premises: int = 3):
+    """
+    A derivation-shaped DAG of count formula nodes: every node after the first few assumptions concludes from one
+    to max_premises premises among the window nodes before it, like the steps of a long proof.
+    """
+    rng = random.Random(seed)
+    graph = networkx.DiGraph(name=f"proof {count}", logic="propositional")
+    nodes = []
+    for i in range(count):
+        node = formula(i, rng)
+        nodes.append(node)
+        if i < max_premises:
+            graph.add_node(node, rule="assumption")
+            continue
+        rule = rng.choice(RULES)
+        graph.add_node(node, rule=rule, status=rng.choice(STATUSES))
+        start = max(0, i - window)
+        for premise in rng.sample(nodes[start:i], rng.randint(1, min(max_premises, i - start))):
+            graph.add_edge(premise, node, rule=rule)
+    return graph
+
+
+def positions(graph, seed: int = 0):
+    rng = random.Random(seed)
+    return {node: [rng.uniform(-1000, 1000), rng.uniform(-1000, 1000)] for node in graph}
+
+
+def write_leda(graph, path):
+    """
+    LEDA native format, which networkx reads but cannot write. Node attributes are dropped.
+    """
+    index = {node: i for i, node in enumerate(graph, 1)}
+    with open(path, "w", encoding="utf-8") as file_p:
+        file_p.write(f"LEDA.GRAPH\nstring\nvoid\n{-1 if graph.is_directed() else -2}\n{len(index)}\n")
+        file_p.writelines(f"|{{{node}}}|\n" for node in graph)
+        file_p.write(f"{graph.number_of_edges()}\n")
+        file_p.writelines(f"{index[u]} {index[v]} 0 |{{}}|\n" for u, v in graph.edges)
+
+
+def write_pajek(graph, path):
+    networkx.write_pajek(networkx.relabel_nodes(graph, {node: str(i) for i, node in enumerate(graph)}), path)
@@ -0,0 +1,239 @@
+"""
+Benchmarks of reading and writing every graph file format, of the page payload sent by draw_index and of log
+throughput, on synthetic proof graphs. Compares with baseline.json and exits with 1 on a regression.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --sizes 1000 1000000 --repeat 1
+    python benchmarks/run.py --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "proofy"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+# Qt, where it is used, must not need a display.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import networkx  # noqa: E402
+
+from formats.registry import FORMATS, read_graph, write_graph  # noqa: E402
+from generators import positions, proof_dag, write_leda, write_pajek  # noqa: E402
+from widgets.graphdiff import RenderedGraph  # noqa: E402
+from widgets.logstore import LogRecordStore  # noqa: E402
+
+BASELINE = pathlib.Path(__file__).resolve().parent / "baseline.json"
+# Larger graphs, up to 1_000_000 nodes, are given with --sizes; the networkx based readers dominate their run time.
+SIZES = [1_000, 10_000]
+# Slower (or larger) than the baseline by more than this fraction is a regression.
+TOLERANCE = 0.5
+# Read-only formats and how to make an input file for them.
+INPUT_WRITERS = {
+    "GraphML": networkx.write_graphml,
+    "LEDA": write_leda,
+    "Pajek": write_pajek,
+}
+# Fraction of nodes whose status changes between two draws, as after an edit in the verifier.
+CHANGED_FRACTION = 0.01
+
+
+class Skip(Exception):
+    pass
+
+
+def read_benchmark(graph_format):
+    def prepare(graph, directory):
+        path = directory / f"input{graph_format.extensions[0]}"
+        if not path.exists():
+            if graph_format.write is not None:
+                graph_format.write(graph, path)
+            else:
+                INPUT_WRITERS[graph_format.name](graph, path)
+        return lambda: read_graph(path, graph_format.name)
+
+    return prepare
+
+
+def write_benchmark(graph_format):
+    def prepare(graph, directory):
+        path = directory / f"output{graph_format.extensions[0]}"
+        return lambda: write_graph(graph, path, graph_format.name)
+
+    return prepare
+
+
+def draw_payload(graph, directory):
+    layout = positions(graph)
+    return lambda: RenderedGraph().diff(graph, layout)
+
+
+def draw_update(graph, directory):
+    layout = positions(graph)
+    rendered = RenderedGraph()
+    rendered.diff(graph, layout)
+    view = graph.copy()
+    for node in list(view)[:: int(1 / CHANGED_FRACTION)]:
+        view.nodes[node]["status"] = "changed"
+    return lambda: rendered.diff(view, layout)
+
+
+def log_store(graph, directory):
+    messages = [f"Checked {node}" for node in graph]
+
+    def run():
+        store = LogRecordStore()
+        created = time.time()
+        for i, message in enumerate(messages):
+            store.append(logging.INFO if i % 8 else logging.DEBUG, "logic.verifier", created, message)
+        store.select(logging.INFO, None, "r1")
+
+    return run
+
+
+def log_handler(graph, directory):
+    try:
+        from PySide2.QtCore import QCoreApplication
+        from widgets.loghandler import LogHandler
+    except ImportError as e:
+        raise Skip(f"PySide2 is not available: {e}")
+    application = QCoreApplication.instance() or QCoreApplication([])
+    messages = [f"Checked {node}" for node in graph]
+    log = logging.getLogger("benchmarks.log_handler")
+    log.propagate = False
+
+    def run():
+        handler = LogHandler()
+        handler.MAX_PENDING = len(messages)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        log.addHandler(handler)
+        try:
+            for message in messages:
+                log.info(message)
+            handler.flush()
+            application.processEvents()
+        finally:
+            log.removeHandler(handler)
+            handler.close()
+
+    return run
+
+
+def benchmarks():
+    result = {}
+    for graph_format in FORMATS:
+        if graph_format.read is not None:
+            result[f"read {graph_format.name}"] = read_benchmark(graph_format)
+    for graph_format in FORMATS:
+        if graph_format.write is not None:
+            result[f"write {graph_format.name}"] = write_benchmark(graph_format)
+    result["draw payload"] = draw_payload
+    result["draw update"] = draw_update
+    result["log store"] = log_store
+    result["log handler"] = log_handler
+    return result
+
+
+def measure(prepare, graph, directory, repeat: int, memory: bool):
+    """
+    Best time of repeat runs, and the peak memory traced during one more run (tracing slows the run down).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        run = prepare(graph, directory)
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    result = {"seconds": best}
+    if memory:
+        run = prepare(graph, directory)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_all(sizes, names=None, repeat: int = 3, memory: bool = True):
+    results = {}
+    selected = {name: prepare for name, prepare in benchmarks().items() if not names or name in names}
+    for size in sizes:
+        graph = proof_dag(size)
+        with tempfile.TemporaryDirectory(prefix="proofy-benchmarks-") as directory:
+            for name, prepare in selected.items():
+                key = f"{name}/{size}"
+                try:
+                    results[key] = measure(prepare, graph, pathlib.Path(directory), repeat, memory)
+                except Skip as e:
+                    print(f"{key:40} skipped: {e}", flush=True)
+                    continue
+                peak = results[key].get("peak_bytes")
+                peak = f"{peak / (1 << 20):10.1f} MiB" if peak is not None else ""
+                print(f"{key:40} {results[key]['seconds'] * 1000:12.1f} ms {peak}", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance: float = TOLERANCE):
+    """
+    Descriptions of the results that are worse than their baseline by more than tolerance.
+    """
+    regressions = []
+    for key, result in results.items():
+        if (reference := baseline.get(key)) is None:
+            continue
+        for measure_name in ("seconds", "peak_bytes"):
+            if measure_name in result and measure_name in reference and reference[measure_name] > 0:
+                ratio = result[measure_name] / reference[measure_name]
+                if ratio > 1 + tolerance:
+                    regressions.append(f"{key} {measure_name}: {ratio:.2f}x the baseline")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Node counts of the generated graphs.")
+    parser.add_argument("--only", nargs="+", help="Names of the benchmarks to run, e.g. 'read Node Link Graph'.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that measures peak memory.")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline.")
+    parser.add_argument("--output", type=pathlib.Path, help="Also write the results here as JSON.")
+    arguments = parser.parse_args(argv)
+
+    results = run_all(arguments.sizes, arguments.only, arguments.repeat, not arguments.no_memory)
+    document = {"machine": platform.platform(), "python": platform.python_version(), "results": results}
+    if arguments.output:
+        arguments.output.write_text(json.dumps(document, indent=2))
+    if arguments.update_baseline:
+        if arguments.baseline.exists():
+            previous = json.loads(arguments.baseline.read_text())["results"]
+            document["results"] = {**previous, **results}
+        arguments.baseline.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n")
+        print(f"Updated {arguments.baseline}")
+        return 0
+    if not arguments.baseline.exists():
+        print(f"No baseline at {arguments.baseline}, run with --update-baseline to create one")
+        return 0
+    if regressions := compare(results, json.loads(arguments.baseline.read_text())["results"], arguments.tolerance):
+        print("Regressions:\n" + "\n".join(regressions))
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Headless conversion and verification of proof graph files, without Qt.
+
+    python proofy/batch.py convert --to "Proofy Binary Graph" graphs/*.json
+    python proofy/batch.py verify @paths.txt
+
+Prints one JSON object per file as soon as it is done.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from formats.registry import FORMATS, find_format, read_graph, write_graph
+
+# Files queued per worker process, so thousands of paths do not all wait as futures at once.
+QUEUED_PER_WORKER = 4
+
+
+def convert(path, file_type=None, to=None, output_dir=None):
+    target = find_format(to)
+    graph = read_graph(path, file_type)
+    source = pathlib.Path(path)
+    output = pathlib.Path(output_dir or source.parent) / (source.stem + target.extensions[0])
+    if output.resolve() == source.resolve():
+        raise ValueError(f"Converting {path} would overwrite it!")
+    write_graph(graph, output, target.name)
+    return {"output": str(output), "nodes": graph.number_of_nodes(), "edges": graph.number_of_edges()}
+
+
+def verify(path, file_type=None):
+    from logic.verifier import INVALID, Verifier
+
+    verifier = Verifier(read_graph(path, file_type))
+    verifier.verify()
+    statuses = {}
+    for status in verifier.status.values():
+        statuses[status] = statuses.get(status, 0) + 1
+    invalid = [node for node, status in verifier.status.items() if status == INVALID]
+    return {"nodes": len(verifier.status), "statuses": statuses, "invalid": invalid, "ok": not invalid}
+
+
+COMMANDS = {"convert": convert, "verify": verify}
+
+
+def run(command, path, options):
+    """
+    One file, in a worker process. Errors are reported in the result rather than raised.
+    """
+    start = time.perf_counter()
+    try:
+        result = {"path": path, **COMMANDS[command](path, **options)}
+    except Exception as e:
+        result = {"path": path, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    result.setdefault("ok", True)
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def run_all(command, paths, options, jobs=1):
+    """
+    Results of command for every path, in the order they finish.
+    """
+    if jobs <= 1:
+        for path in paths:
+            yield run(command, path, options)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+        paths = iter(paths)
+        pending = set()
+        while True:
+            for path in paths:
+                pending.add(executor.submit(run, command, path, options))
+                if len(pending) >= jobs * QUEUED_PER_WORKER:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter, fromfile_prefix_chars="@"
+    )
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("paths", nargs="+", help="Graph files, or @file to read paths from a file (one per line).")
+    parser.add_argument(
+        "--from",
+        dest="file_type",
+        help="Input format, by default guessed from the file extension and the keys of a JSON file.",
+    )
+    parser.add_argument("--to", choices=[graph_format.name for graph_format in FORMATS if graph_format.write])
+    parser.add_argument("--output-dir", help="Where converted files go, by default next to the inputs.")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Worker processes.")
+    arguments = parser.parse_args(argv)
+    if arguments.command == "convert" and arguments.to is None:
+        parser.error("convert needs --to")
+    return arguments
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    options = {"file_type": arguments.file_type}
+    if arguments.command == "convert":
+        options.update(to=arguments.to, output_dir=arguments.output_dir)
+        if arguments.output_dir:
+            pathlib.Path(arguments.output_dir).mkdir(parents=True, exist_ok=True)
+    ok = True
+    for result in run_all(arguments.command, arguments.paths, options, arguments.jobs):
+        ok &= result["ok"]
+        print(json.dumps(result, ensure_ascii=False, default=str), flush=True)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from formats.jsonstream import GRAPH_CLASSES, to_tuple
+from tracing import span
+
+MAGIC = b"PROOFYGB"
+VERSION = 1
+DIRECTED = 1
+MULTIGRAPH = 2
+NO_STRING = 0xFFFFFFFF
+SECTIONS = (
+    "string_offsets",
+    "string_data",
+    "node_ids",
+    "node_attribute_offsets",
+    "node_attribute_keys",
+    "node_attribute_values",
+    "edge_offsets",
+    "edge_targets",
+    "edge_keys",
+    "edge_attribute_offsets",
+    "edge_attribute_keys",
+    "edge_attribute_values",
+)
+SECTION_TYPES = {
+    "string_offsets": "Q",
+    "string_data": "B",
+    "node_ids": "I",
+    "node_attribute_offsets": "Q",
+    "node_attribute_keys": "I",
+    "node_attribute_values": "I",
+    "edge_offsets": "Q",
+    "edge_targets": "I",
+    "edge_keys": "I",
+    "edge_attribute_offsets": "Q",
+    "edge_attribute_keys": "I",
+    "edge_attribute_values": "I",
+}
+HEADER = struct.Struct(f"<8sIIQQI{2 * len(SECTIONS)}Q")
+IMMUTABLE = (str, int, float, bool, type(None))
+
+
+def encode(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class StringTable:
+    def __init__(self):
+        self.indices = {}
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+
+    def intern(self, text: str) -> int:
+        if (index := self.indices.get(text)) is None:
+            index = self.indices[text] = len(self.indices)
+            self.data += text.encode("utf-8")
+            self.offsets.append(len(self.data))
+        return index
+
+
+def write_binary_graph(graph, file_p):
+    """
+    Writes graph as CSR arrays (nodes -> attributes, nodes -> edges -> attributes) over an interned string table.
+    Node ids, edge keys and attribute values are stored as JSON text, so every distinct value is stored once.
+    """
+    strings = StringTable()
+    sections = {name: array(SECTION_TYPES[name]) for name in SECTIONS}
+    indices = {}
+
+    def add_attributes(attributes, prefix):
+        for key, value in attributes.items():
+            sections[f"{prefix}_attribute_keys"].append(strings.intern(str(key)))
+            sections[f"{prefix}_attribute_values"].append(strings.intern(encode(value)))
+        sections[f"{prefix}_attribute_offsets"].append(len(sections[f"{prefix}_attribute_keys"]))
+
+    sections["node_attribute_offsets"].append(0)
+    for index, (node, attributes) in enumerate(graph.nodes(data=True)):
+        indices[node] = index
+        sections["node_ids"].append(strings.intern(encode(node)))
+        add_attributes(attributes, "node")
+
+    if graph.is_multigraph():
+        edges = ((u, v, strings.intern(encode(k)), d) for u, v, k, d in graph.edges(keys=True, data=True))
+    else:
+        edges = ((u, v, NO_STRING, d) for u, v, d in graph.edges(data=True))
+    counts = array("Q", bytes(8 * len(indices)))
+    sections["edge_attribute_offsets"].append(0)
+    previous = 0
+    for u, v, key, attributes in edges:
+        source = indices[u]
+        if source < previous:
+            raise ValueError("Edges are not grouped by source node!")
+        previous = source
+        counts[source] += 1
+        sections["edge_targets"].append(indices[v])
+        sections["edge_keys"].append(key)
+        add_attributes(attributes, "edge")
+    sections["edge_offsets"].append(0)
+    for count in counts:
+        sections["edge_offsets"].append(sections["edge_offsets"][-1] + count)
+
+    graph_string = strings.intern(encode(graph.graph))
+    sections["string_offsets"] = strings.offsets
+    sections["string_data"] = array("B", strings.data)
+
+    flags = (DIRECTED if graph.is_directed() else 0) | (MULTIGRAPH if graph.is_multigraph() else 0)
+    layout = []
+    offset = HEADER.size
+    for name in SECTIONS:
+        offset = (offset + 7) & ~7
+        size = len(sections[name]) * sections[name].itemsize
+        layout += [offset, size]
+        offset += size
+    file_p.write(HEADER.pack(MAGIC, VERSION, flags, len(indices), len(sections["edge_targets"]), graph_string, *layout))
+    position = HEADER.size
+    for name, offset in zip(SECTIONS, layout[::2]):
+        file_p.write(bytes(offset - position))
+        if sys.byteorder != "little":
+            sections[name].byteswap()
+        sections[name].tofile(file_p)
+        position = offset + len(sections[name]) * sections[name].itemsize
+
+
+class BinaryGraph:
+    """
+    Read only, memory mapped view of a file written by write_binary_graph.
+    Opening only maps the file; strings and attributes are decoded when they are accessed.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file_p:
+            self.mmap = mmap.mmap(file_p.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mmap) < HEADER.size or self.mmap[: len(MAGIC)] != MAGIC:
+            self.mmap.close()
+            raise ValueError("Not a Proofy binary graph!")
+        magic, version, flags, self.node_count, self.edge_count, self.graph_string, *layout = HEADER.unpack_from(
+            self.mmap
+        )
+        if version != VERSION:
+            self.mmap.close()
+            raise ValueError(f"Unsupported Proofy binary graph version {version}!")
+        self.view = memoryview(self.mmap)
+        self.directed = bool(flags & DIRECTED)
+        self.multigraph = bool(flags & MULTIGRAPH)
+        for name, offset, size in zip(SECTIONS, layout[::2], layout[1::2]):
+            section = self.view[offset : offset + size]
+            if sys.byteorder != "little" and SECTION_TYPES[name] != "B":
+                section = array(SECTION_TYPES[name], section)
+                section.byteswap()
+                section = memoryview(section)
+            setattr(self, name, section.cast(SECTION_TYPES[name]))
+        self.keys = {}
+        self.values = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.node_count
+
+    def close(self):
+        for name in SECTIONS:
+            getattr(self, name).release()
+        self.view.release()
+        self.mmap.close()
+
+    def string(self, index: int) -> str:
+        return str(self.string_data[self.string_offsets[index] : self.string_offsets[index + 1]], "utf-8")
+
+    def value(self, index: int):
+        if (value := self.values.get(index, self)) is self:
+            value = json.loads(self.string(index))
+            if not isinstance(value, IMMUTABLE):
+                return value
+            self.values[index] = value
+        return value
+
+    def attributes(self, start: int, end: int, keys, values):
+        return {self.key(keys[i]): self.value(values[i]) for i in range(start, end)}
+
+    def key(self, index: int) -> str:
+        if (key := self.keys.get(index)) is None:
+            key = self.keys[index] = self.string(index)
+        return key
+
+    @property
+    def graph_attributes(self):
+        return json.loads(self.string(self.graph_string))
+
+    def node(self, index: int):
+        return to_tuple(self.value(self.node_ids[index]))
+
+    def node_attributes(self, index: int):
+        return self.attributes(
+            self.node_attribute_offsets[index],
+            self.node_attribute_offsets[index + 1],
+            self.node_attribute_keys,
+            self.node_attribute_values,
+        )
+
+    def edge_key(self, edge: int):
+        return None if self.edge_keys[edge] == NO_STRING else to_tuple(self.value(self.edge_keys[edge]))
+
+    def edge_attributes(self, edge: int):
+        return self.attributes(
+            self.edge_attribute_offsets[edge],
+            self.edge_attribute_offsets[edge + 1],
+            self.edge_attribute_keys,
+            self.edge_attribute_values,
+        )
+
+    def edges(self, index: int):
+        return range(self.edge_offsets[index], self.edge_offsets[index + 1])
+
+    def successors(self, index: int):
+        return self.edge_targets[self.edge_offsets[index] : self.edge_offsets[index + 1]]
+
+    def to_networkx(self, progress=None):
+        graph = GRAPH_CLASSES[self.directed, self.multigraph]()
+        graph.graph.update(self.graph_attributes)
+        value, key = self.value, self.key
+
+        def attributes(offsets, keys, values):
+            keys = [key(i) for i in keys.tolist()]
+            values = [value(i) for i in values.tolist()]
+            offsets = offsets.tolist()
+            return [dict(zip(keys[start:end], values[start:end])) for start, end in zip(offsets, offsets[1:])]
+
+        nodes = [to_tuple(value(i)) for i in self.node_ids.tolist()]
+        graph.add_nodes_from(
+            zip(nodes, attributes(self.node_attribute_offsets, self.node_attribute_keys, self.node_attribute_values))
+        )
+        edge_attributes = attributes(self.edge_attribute_offsets, self.edge_attribute_keys, self.edge_attribute_values)
+        targets = [nodes[i] for i in self.edge_targets.tolist()]
+        sources = [None] * self.edge_count
+        offsets = self.edge_offsets.tolist()
+        for i, source in enumerate(nodes):
+            sources[offsets[i] : offsets[i + 1]] = [source] * (offsets[i + 1] - offsets[i])
+        if self.multigraph:
+            edges = zip(sources, targets, [self.edge_key(e) for e in range(self.edge_count)], edge_attributes)
+        else:
+            edges = zip(sources, targets, edge_attributes)
+        if progress:
+            edges = reporting(edges, self.edge_count, progress)
+        graph.add_edges_from(edges)
+        return graph
+
+
+def reporting(items, count: int, progress):
+    step = max(count // 100, 1 << 16)
+    for i, item in enumerate(items):
+        if i % step == 0:
+            progress(i / count)
+        yield item
+
+
+def read_binary_graph(path, progress=None):
+    with span("parse", "io"):
+        binary_graph = BinaryGraph(path)
+    with binary_graph, span("graph build", "io", nodes=binary_graph.node_count):
+        return binary_graph.to_networkx(progress)
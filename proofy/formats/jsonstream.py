@@ -0,0 +1,364 @@
+import codecs
+import contextlib
+import itertools
+import json
+import os
+import pathlib
+import stat
+import tempfile
+
+import networkx
+
+ENCODER = json.JSONEncoder()
+DECODER = json.JSONDecoder()
+CHUNK_SIZE = 1 << 16
+BLOCK_SIZE = 1 << 20
+WHITESPACE = " \t\n\r"
+# Characters that can continue a number the decoder stopped at.
+NUMBER_PARTS = ".eE+-0123456789"
+# Read once, since os.umask can only be read by setting it.
+UMASK = os.umask(0)
+os.umask(UMASK)
+GRAPH_CLASSES = {
+    (False, False): networkx.Graph,
+    (True, False): networkx.DiGraph,
+    (False, True): networkx.MultiGraph,
+    (True, True): networkx.MultiDiGraph,
+}
+
+
+class ChunkWriter:
+    """
+    Collects encoder output and hands it to the file in CHUNK_SIZE pieces instead of one write per token.
+    """
+
+    def __init__(self, file_p, chunk_size: int = CHUNK_SIZE):
+        self.file_p = file_p
+        self.chunk_size = chunk_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def write_json(self, value):
+        for part in ENCODER.iterencode(value):
+            self.write(part)
+
+    def write_array(self, items):
+        self.write("[")
+        for i, item in enumerate(items):
+            if i:
+                self.write(", ")
+            self.write_json(item)
+        self.write("]")
+
+    def flush(self):
+        self.file_p.write("".join(self.parts))
+        self.parts.clear()
+        self.size = 0
+
+
+@contextlib.contextmanager
+def atomic_writer(path, mode: str = "w", buffering: int = CHUNK_SIZE * 16):
+    """
+    Writes to a temporary file next to path and renames it over path only once everything has been written.
+    The file keeps the permissions of the file it replaces, or gets those of a newly created file.
+    """
+    path = pathlib.Path(path)
+    try:
+        permissions = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        permissions = 0o666 & ~UMASK
+    fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with open(fd, mode, buffering=buffering, encoding=None if "b" in mode else "utf-8") as file_p:
+            yield file_p
+            file_p.flush()
+            os.fsync(file_p.fileno())
+        os.chmod(temp_path, permissions)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
+    sync_directory(path.parent)
+
+
+def sync_directory(directory):
+    """
+    Makes a rename in directory durable. Directories cannot be opened on Windows, where there is nothing to do.
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_header(writer: ChunkWriter, graph, graph_attributes):
+    writer.write('{"directed": ')
+    writer.write_json(graph.is_directed())
+    writer.write(', "multigraph": ')
+    writer.write_json(graph.is_multigraph())
+    writer.write(', "graph": ')
+    writer.write_json(graph_attributes)
+
+
+def write_node_link_json(graph, file_p):
+    """
+    Writes the same text as json.dump(networkx.node_link_data(graph), file_p) one node/link at a time.
+    """
+    writer = ChunkWriter(file_p)
+    write_header(writer, graph, graph.graph)
+    writer.write(', "nodes": ')
+    writer.write_array({**attributes, "id": node} for node, attributes in graph.nodes(data=True))
+    writer.write(', "links": ')
+    if graph.is_multigraph():
+        writer.write_array(
+            {**attributes, "source": u, "target": v, "key": k}
+            for u, v, k, attributes in graph.edges(keys=True, data=True)
+        )
+    else:
+        writer.write_array({**attributes, "source": u, "target": v} for u, v, attributes in graph.edges(data=True))
+    writer.write("}")
+    writer.flush()
+
+
+def write_adjacency_json(graph, file_p):
+    """
+    Writes the same text as json.dump(networkx.adjacency_data(graph), file_p) one node/adjacency list at a time.
+    """
+    writer = ChunkWriter(file_p)
+    write_header(writer, graph, list(graph.graph.items()))
+    writer.write(', "nodes": ')
+    writer.write_array({**attributes, "id": node} for node, attributes in graph.nodes(data=True))
+    writer.write(', "adjacency": ')
+    if graph.is_multigraph():
+        writer.write_array(
+            [
+                {**attributes, "id": neighbour, "key": k}
+                for neighbour, keys in neighbours.items()
+                for k, attributes in keys.items()
+            ]
+            for _, neighbours in graph.adjacency()
+        )
+    else:
+        writer.write_array(
+            [{**attributes, "id": neighbour} for neighbour, attributes in neighbours.items()]
+            for _, neighbours in graph.adjacency()
+        )
+    writer.write("}")
+    writer.flush()
+
+
+def to_tuple(value):
+    return tuple(map(to_tuple, value)) if isinstance(value, list) else value
+
+
+class JSONBlockReader:
+    """
+    Reads JSON text from a binary file in blocks, decoding one value at a time with the C scanner.
+    Only the unconsumed tail of the current block (plus the value being decoded) is held in memory.
+    """
+
+    def __init__(self, file_p, block_size: int = BLOCK_SIZE):
+        self.file_p = file_p
+        self.block_size = block_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self, size: int):
+        data = self.file_p.read(size)
+        text = self.decoder.decode(data, final=not data)
+        self.eof = not data
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill(self.block_size):
+                raise json.JSONDecodeError("Unexpected end of file", self.buffer, self.position)
+
+    def next_char(self) -> str:
+        char = self.peek()
+        self.position += 1
+        return char
+
+    def expect(self, char: str):
+        if (found := self.next_char()) != char:
+            raise json.JSONDecodeError(f"Expected {char!r}, found {found!r}", self.buffer, self.position - 1)
+
+    def value(self):
+        self.peek()
+        size = self.block_size
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buffer, self.position)
+                # A number that ends with the buffer, or before a fraction or exponent the buffer cuts short, might
+                # continue in the next block.
+                number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                if self.eof or (end < len(self.buffer) and not (number and self.buffer[end] in NUMBER_PARTS)):
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2
+
+    def object_keys(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if (char := self.next_char()) == "}":
+                return
+            elif char != ",":
+                raise json.JSONDecodeError(f"Expected ',' or '}}', found {char!r}", self.buffer, self.position - 1)
+
+    def array_items(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            if (char := self.next_char()) == "]":
+                return
+            elif char != ",":
+                raise json.JSONDecodeError(f"Expected ',' or ']', found {char!r}", self.buffer, self.position - 1)
+
+
+class StreamingGraphReader:
+    """
+    Adds the elements of the top level arrays straight into a networkx graph while the file is being read.
+    If "directed"/"multigraph" only appear after the arrays, the elements are kept until the graph type is known.
+    """
+
+    arrays = ()
+
+    def __init__(self, file_p, block_size: int = BLOCK_SIZE):
+        self.tokens = JSONBlockReader(file_p, block_size)
+        self.data = {}
+        self.pending = {}
+        self.graph = None
+
+    def create_graph(self):
+        return GRAPH_CLASSES[bool(self.data.get("directed", False)), bool(self.data.get("multigraph", True))]()
+
+    def read(self):
+        for key in self.tokens.object_keys():
+            if key in self.arrays and self.tokens.peek() == "[":
+                if self.graph is None and not self.pending and {"directed", "multigraph"} <= self.data.keys():
+                    self.graph = self.create_graph()
+                for item in self.tokens.array_items():
+                    if self.graph is None:
+                        self.pending.setdefault(key, []).append(item)
+                    else:
+                        self.add(key, item)
+            else:
+                self.data[key] = self.tokens.value()
+        if self.graph is None:
+            self.graph = self.create_graph()
+        for key in self.arrays:
+            for item in self.pending.pop(key, ()):
+                self.add(key, item)
+        self.graph.graph.update(self.graph_attributes())
+        return self.graph
+
+    def add(self, key, item):
+        raise NotImplementedError()
+
+    def graph_attributes(self):
+        raise NotImplementedError()
+
+
+class NodeLinkReader(StreamingGraphReader):
+    arrays = ("nodes", "links", "edges")
+
+    def __init__(self, *args, **kwargs):
+        super(NodeLinkReader, self).__init__(*args, **kwargs)
+        self.counter = itertools.count()
+
+    def add(self, key, item):
+        if key == "nodes":
+            self.graph.add_node(to_tuple(item.pop("id", next(self.counter))), **item)
+        else:
+            source = to_tuple(item.pop("source"))
+            target = to_tuple(item.pop("target"))
+            if self.graph.is_multigraph():
+                self.graph.add_edge(source, target, item.pop("key", None), **item)
+            else:
+                self.graph.add_edge(source, target, **item)
+
+    def graph_attributes(self):
+        return self.data.get("graph", {})
+
+
+class AdjacencyReader(StreamingGraphReader):
+    arrays = ("nodes", "adjacency")
+
+    def __init__(self, *args, **kwargs):
+        super(AdjacencyReader, self).__init__(*args, **kwargs)
+        self.mapping = []
+        self.index = 0
+
+    def add(self, key, item):
+        if key == "nodes":
+            node = to_tuple(item.pop("id"))
+            self.mapping.append(node)
+            self.graph.add_node(node, **item)
+        else:
+            source = self.mapping[self.index]
+            self.index += 1
+            for target_data in item:
+                target = to_tuple(target_data.pop("id"))
+                if self.graph.is_multigraph():
+                    self.graph.add_edge(source, target, target_data.pop("key", None), **target_data)
+                else:
+                    self.graph.add_edge(source, target, **target_data)
+
+    def graph_attributes(self):
+        return dict(self.data.get("graph", []))
+
+
+def top_level_keys(file_p, block_size: int = BLOCK_SIZE):
+    """
+    The keys of the top level object in turn. Arrays are skipped an item at a time, so only the keys are kept.
+    """
+    tokens = JSONBlockReader(file_p, block_size)
+    for key in tokens.object_keys():
+        yield key
+        if tokens.peek() == "[":
+            for _ in tokens.array_items():
+                pass
+        else:
+            tokens.value()
+
+
+def read_node_link_json(file_p, block_size: int = BLOCK_SIZE):
+    return NodeLinkReader(file_p, block_size).read()
+
+
+def read_adjacency_json(file_p, block_size: int = BLOCK_SIZE):
+    return AdjacencyReader(file_p, block_size).read()
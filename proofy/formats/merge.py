@@ -0,0 +1,164 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import pathlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import networkx
+
+from formats.registry import FORMATS, read_graph
+from logic.formula import Binary, Not, Quantifier, Sequent
+from logic.parser import parse
+from tracing import span
+
+
+class MergeReport:
+    """
+    What merge_files did: files read, nodes read and kept, and the files that could not be read as (path, error).
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.nodes_read = 0
+        self.nodes = 0
+        self.edges = 0
+        self.failed = []
+
+    def __str__(self):
+        text = f"Merged {self.files} files: {self.nodes_read} nodes into {self.nodes}, {self.edges} edges"
+        return text + (f", {len(self.failed)} files failed" if self.failed else "")
+
+
+def digest(text: str):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content(node, attributes):
+    """
+    The canonical text of the formula of a node, or None if it has none. Spacing, ASCII spellings and redundant
+    parentheses do not change it. The formula is the "formula" attribute, or else the id when it is a sequent or a
+    compound formula, as in Proofy's own proof graphs; plain ids such as n1 also parse, as atoms, but are not formulas.
+    """
+    if isinstance(text := attributes.get("formula"), str):
+        try:
+            return str(parse(text))
+        except ValueError:
+            return None
+    if not isinstance(node, str):
+        return None
+    try:
+        formula = parse(node)
+    except ValueError:
+        return None
+    return str(formula) if isinstance(formula, (Sequent, Not, Binary, Quantifier)) else None
+
+
+def read_part(path, file_type=None):
+    """
+    Reads one file for merging, in a worker process. Nodes are keyed by the hash of their formula, and nodes without
+    one by their file and id, so only formulas are shared between files. Node ids that are formulas are replaced by
+    the canonical text.
+    """
+    graph = read_graph(path, file_type)
+    keys = {}
+    nodes = {}
+    for node, attributes in graph.nodes(data=True):
+        if (text := content(node, attributes)) is not None:
+            key = digest(text)
+            name = node if "formula" in attributes else text
+        else:
+            key = digest(json.dumps([str(path), node], default=str))
+            name = node
+        keys[node] = key
+        nodes.setdefault(key, (name, attributes))
+    if graph.is_multigraph():
+        edges = [(keys[u], keys[v], k, attributes) for u, v, k, attributes in graph.edges(keys=True, data=True)]
+    else:
+        edges = [(keys[u], keys[v], None, attributes) for u, v, attributes in graph.edges(data=True)]
+    return {
+        "directed": graph.is_directed(),
+        "multigraph": graph.is_multigraph(),
+        "nodes_read": graph.number_of_nodes(),
+        "nodes": nodes,
+        "edges": edges,
+    }
+
+
+def merge_parts(parts, names):
+    """
+    One graph of the parts, each node key once with the id and attributes of its first occurrence. An id already
+    taken by other content gets the name of its file appended.
+    """
+    graph_class = networkx.Graph
+    if any(part["directed"] for part in parts):
+        graph_class = networkx.DiGraph
+    if any(part["multigraph"] for part in parts):
+        graph_class = networkx.MultiDiGraph if graph_class is networkx.DiGraph else networkx.MultiGraph
+    graph = graph_class()
+    ids = {}
+    taken = set()
+    for part, name in zip(parts, names):
+        for key, (node, attributes) in part["nodes"].items():
+            if key in ids:
+                continue
+            if node in taken:
+                node = f"{node} [{name}]"
+            ids[key] = node
+            taken.add(node)
+            graph.add_node(node, **attributes)
+        for u, v, k, attributes in part["edges"]:
+            if graph.is_multigraph():
+                graph.add_edge(ids[u], ids[v], k, **attributes)
+            else:
+                graph.add_edge(ids[u], ids[v], **attributes)
+    return graph
+
+
+def graph_files(directory):
+    """
+    The readable graph files below directory, sorted.
+    """
+    extensions = {extension for graph_format in FORMATS if graph_format.read for extension in graph_format.extensions}
+    return sorted(str(path) for path in pathlib.Path(directory).rglob("*") if path.suffix.lower() in extensions)
+
+
+def merge_files(paths, file_type=None, workers=None, progress=None):
+    """
+    Reads paths in a process pool and merges them (in the order of paths) into one graph with every formula once.
+    Returns the graph and a MergeReport. progress(fraction) may raise to cancel.
+    """
+    paths = [str(path) for path in paths]
+    report = MergeReport()
+    parts = [None] * len(paths)
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    futures = {}
+    try:
+        for i, path in enumerate(paths):
+            futures[executor.submit(read_part, path, file_type)] = i
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures[future]
+                try:
+                    parts[i] = future.result()
+                except Exception as e:
+                    report.failed.append((paths[i], f"{type(e).__name__}: {e}"))
+            if progress is not None:
+                progress((len(paths) - len(pending)) / len(paths))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    with span("merge", "io", files=len(paths)):
+        read = [(part, pathlib.Path(path).stem) for part, path in zip(parts, paths) if part is not None]
+        graph = merge_parts([part for part, _ in read], [name for _, name in read])
+    report.files = len(read)
+    report.nodes_read = sum(part["nodes_read"] for part, _ in read)
+    report.nodes = graph.number_of_nodes()
+    report.edges = graph.number_of_edges()
+    return graph, report
@@ -0,0 +1,63 @@
+import io
+import os
+
+
+class ProgressReader(io.RawIOBase):
+    """
+    Binary file wrapper that reports how far into the file the reader has got.
+    progress(fraction) may raise to abort the read (e.g. when the user cancels).
+    """
+
+    def __init__(self, path, progress=None, block_size: int = 1 << 20):
+        super(ProgressReader, self).__init__()
+        self.file_p = open(path, "rb")
+        self.progress = progress
+        self.block_size = block_size
+        self.size = os.fstat(self.file_p.fileno()).st_size
+        self.step = max(self.size // 1000, 1 << 16)
+        self.next_report = 0
+
+    def readable(self):
+        return True
+
+    def report(self):
+        if self.progress:
+            position = self.file_p.tell()
+            if position >= self.next_report or position >= self.size:
+                self.next_report = position + self.step
+                self.progress(position / self.size if self.size else 1.0)
+
+    def readinto(self, buffer):
+        count = self.file_p.readinto(buffer)
+        self.report()
+        return count
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = []
+            while chunk := self.read(self.block_size):
+                chunks.append(chunk)
+            return b"".join(chunks)
+        data = self.file_p.read(size)
+        self.report()
+        return data
+
+    def readline(self, size=-1):
+        line = self.file_p.readline(size)
+        self.report()
+        return line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if line := self.readline():
+            return line
+        raise StopIteration
+
+    def tell(self):
+        return self.file_p.tell()
+
+    def close(self):
+        self.file_p.close()
+        super(ProgressReader, self).close()
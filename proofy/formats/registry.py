@@ -0,0 +1,133 @@
+import pathlib
+
+import networkx
+
+from formats.binarygraph import read_binary_graph, write_binary_graph
+from formats.jsonstream import (
+    atomic_writer,
+    read_adjacency_json,
+    read_node_link_json,
+    top_level_keys,
+    write_adjacency_json,
+    write_node_link_json,
+)
+from formats.progressreader import ProgressReader
+from tracing import span
+
+
+class GraphFormat:
+    """
+    A graph file format: read(path, progress) returns a networkx graph and write(graph, path) saves one.
+    Either may be None for formats that can only be read or only be written. keys are the top level JSON keys that
+    only files of this format have, which tell apart the formats that share an extension.
+    """
+
+    def __init__(self, name: str, extensions, read=None, write=None, keys=()):
+        self.name = name
+        self.extensions = tuple(extensions)
+        self.read = read
+        self.write = write
+        self.keys = frozenset(keys)
+
+    @property
+    def file_filter(self):
+        return f"{self.name} ({' '.join(f'*{extension}' for extension in self.extensions)})"
+
+
+def text_reader(parse):
+    def read(path, progress=None):
+        with ProgressReader(path, progress) as file_p, span("parse", "io"):
+            return parse(file_p)
+
+    return read
+
+
+def text_writer(dump, mode="w"):
+    def write(graph, path):
+        with atomic_writer(path, mode) as file_p:
+            dump(graph, file_p)
+
+    return write
+
+
+FORMATS = []
+
+
+def register(graph_format: GraphFormat):
+    FORMATS.append(graph_format)
+    return graph_format
+
+
+register(
+    GraphFormat(
+        "Node Link Graph",
+        [".json"],
+        text_reader(read_node_link_json),
+        text_writer(write_node_link_json),
+        ["links", "edges"],
+    )
+)
+register(
+    GraphFormat(
+        "Adjacency Graph",
+        [".json"],
+        text_reader(read_adjacency_json),
+        text_writer(write_adjacency_json),
+        ["adjacency"],
+    )
+)
+register(GraphFormat("GraphML", [".graphml"], text_reader(networkx.read_graphml)))
+register(GraphFormat("LEDA", [".gw", ".lgr", ".leda"], text_reader(networkx.read_leda)))
+register(GraphFormat("Pajek", [".net"], text_reader(networkx.read_pajek)))
+register(GraphFormat("Proofy Binary Graph", [".pgb"], read_binary_graph, text_writer(write_binary_graph, "wb")))
+
+
+def open_filters():
+    return [graph_format.file_filter for graph_format in FORMATS if graph_format.read is not None]
+
+
+def save_filters():
+    return [graph_format.file_filter for graph_format in FORMATS if graph_format.write is not None]
+
+
+def find_format(file_type: str = None, path=None, sniff: bool = False):
+    """
+    The format named in file_type (a format name or file dialog filter), or else the one with the extension of path.
+    Of several formats with the extension the first is taken, or with sniff the one whose keys the file has.
+    """
+    if file_type:
+        for graph_format in FORMATS:
+            if file_type.lower().startswith(graph_format.name.lower()):
+                return graph_format
+        raise ValueError(f"Unknown file type {file_type}!")
+    extension = pathlib.Path(path).suffix.lower()
+    candidates = [graph_format for graph_format in FORMATS if extension in graph_format.extensions]
+    if not candidates:
+        raise ValueError(f"Unknown file extension {extension}!")
+    if len(candidates) == 1 or not sniff:
+        return candidates[0]
+    with open(path, "rb") as file_p:
+        for key in top_level_keys(file_p):
+            for graph_format in candidates:
+                if key in graph_format.keys:
+                    return graph_format
+    raise ValueError(f"Cannot tell the {extension} format of {path}, give its file type (--from)!")
+
+
+def read_graph(path, file_type: str = None, progress=None):
+    """
+    Parses path into a networkx graph. progress(fraction) may raise to abort the read.
+    """
+    graph_format = find_format(file_type, path, sniff=True)
+    if graph_format.read is None:
+        raise ValueError(f"{graph_format.name} files cannot be read!")
+    with span("open", "io", path=path, format=graph_format.name):
+        return graph_format.read(path, progress)
+
+
+def write_graph(graph, path, file_type: str = None):
+    graph_format = find_format(file_type, path)
+    if graph_format.write is None:
+        raise ValueError(f"{graph_format.name} files cannot be written!")
+    with span("save", "io", path=path, format=graph_format.name, nodes=graph.number_of_nodes()):
+        graph_format.write(graph, path)
@@ -0,0 +1,300 @@
+import collections
+import contextlib
+import sys
+
+# networkx is imported where it is needed, so that the graph widget can import this module without delaying startup.
+# Memory the undo and redo steps may hold before the oldest steps are forgotten.
+BUDGET = 64 << 20
+# Estimated bytes per operation, and per node and edge of a graph kept whole by a "graph" operation.
+OPERATION_BYTES = 120
+NODE_BYTES = 400
+EDGE_BYTES = 300
+
+
+class Step:
+    """
+    One undoable edit: the operations that redo it, the groups of operations that undo it (applied last group first)
+    and their estimated size in bytes.
+    """
+
+    __slots__ = ("description", "redo", "undo", "size")
+
+    def __init__(self, description: str, redo, undo):
+        self.description = description
+        self.redo = redo
+        self.undo = undo
+        self.size = sum(map(operation_size, redo)) + sum(operation_size(o) for group in undo for o in group)
+
+
+def item_size(item):
+    if isinstance(item, dict):
+        return sys.getsizeof(item) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in item.items())
+    return sys.getsizeof(item)
+
+
+def operation_size(operation):
+    if operation[0] == "graph":
+        graph = operation[1]
+        if graph is None:
+            return OPERATION_BYTES
+        return OPERATION_BYTES + NODE_BYTES * graph.number_of_nodes() + EDGE_BYTES * graph.number_of_edges()
+    return OPERATION_BYTES + sum(map(item_size, operation[1:]))
+
+
+def apply(graph, operation):
+    """
+    Applies an operation to graph (in place, except for "graph" which replaces it) and returns the graph.
+    """
+    kind, *arguments = operation
+    if kind == "add_node":
+        node, attributes = arguments
+        graph.add_node(node, **attributes)
+    elif kind == "remove_node":
+        (node,) = arguments
+        graph.remove_node(node)
+    elif kind == "node_attributes":
+        node, attributes = arguments
+        graph.nodes[node].clear()
+        graph.nodes[node].update(attributes)
+    elif kind == "add_edge":
+        u, v, key, attributes = arguments
+        if graph.is_multigraph():
+            graph.add_edge(u, v, key, **attributes)
+        else:
+            graph.add_edge(u, v, **attributes)
+    elif kind == "remove_edge":
+        u, v, key = arguments
+        if graph.is_multigraph():
+            graph.remove_edge(u, v, key)
+        else:
+            graph.remove_edge(u, v)
+    elif kind == "edge_attributes":
+        u, v, key, attributes = arguments
+        data = graph.edges[u, v, key] if graph.is_multigraph() else graph.edges[u, v]
+        data.clear()
+        data.update(attributes)
+    elif kind == "relabel":
+        import networkx
+
+        (mapping,) = arguments
+        networkx.relabel_nodes(graph, mapping, copy=False)
+    elif kind == "graph":
+        (graph,) = arguments
+    else:
+        raise ValueError(f"Unknown operation {kind}!")
+    return graph
+
+
+class Edit:
+    """
+    Changes a graph and records the inverse of every change, so that an edit costs time and memory in proportion
+    to what it changes. Reading is passed through to the graph, so an Edit can stand in for it, e.g. in apply_rule.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.redo = []
+        self.undo = []
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    def __contains__(self, node):
+        return node in self.graph
+
+    def __iter__(self):
+        return iter(self.graph)
+
+    def __len__(self):
+        return len(self.graph)
+
+    def record(self, operation, *inverse):
+        """
+        Records an operation that has already been applied, and the operations that undo it.
+        """
+        self.redo.append(operation)
+        self.undo.append(inverse)
+
+    def perform(self, operation, *inverse):
+        self.graph = apply(self.graph, operation)
+        self.record(operation, *inverse)
+
+    def add_node(self, node, **attributes):
+        if node in self.graph:
+            old = dict(self.graph.nodes[node])
+            self.perform(("node_attributes", node, {**old, **attributes}), ("node_attributes", node, old))
+        else:
+            self.perform(("add_node", node, attributes), ("remove_node", node))
+
+    def remove_node(self, node):
+        inverse = [("add_node", node, dict(self.graph.nodes[node]))]
+        if self.graph.is_multigraph():
+            edges = self.graph.edges(node, keys=True, data=True)
+            incoming = self.graph.in_edges(node, keys=True, data=True) if self.graph.is_directed() else []
+        else:
+            edges = ((u, v, None, data) for u, v, data in self.graph.edges(node, data=True))
+            incoming = (
+                ((u, v, None, data) for u, v, data in self.graph.in_edges(node, data=True))
+                if self.graph.is_directed()
+                else []
+            )
+        seen = set()
+        for u, v, key, data in [*edges, *incoming]:
+            if (u, v, key) not in seen:
+                seen.add((u, v, key))
+                inverse.append(("add_edge", u, v, key, dict(data)))
+        self.perform(("remove_node", node), *inverse)
+
+    def add_edge(self, u, v, key=None, **attributes):
+        for node in (u, v):
+            if node not in self.graph:
+                self.add_node(node)
+        if self.graph.is_multigraph():
+            if key is None:
+                key = self.graph.new_edge_key(u, v)
+            exists = self.graph.has_edge(u, v, key)
+        else:
+            exists = self.graph.has_edge(u, v)
+        if exists:
+            old = dict(self.graph.edges[u, v, key] if self.graph.is_multigraph() else self.graph.edges[u, v])
+            self.perform(("edge_attributes", u, v, key, {**old, **attributes}), ("edge_attributes", u, v, key, old))
+        else:
+            self.perform(("add_edge", u, v, key, attributes), ("remove_edge", u, v, key))
+        return key
+
+    def remove_edge(self, u, v, key=None):
+        if self.graph.is_multigraph():
+            if key is None:
+                key = next(reversed(self.graph[u][v]))
+            data = self.graph.edges[u, v, key]
+        else:
+            data = self.graph.edges[u, v]
+        self.perform(("remove_edge", u, v, key), ("add_edge", u, v, key, dict(data)))
+
+    def relabel(self, mapping):
+        """
+        Renames nodes in place when the new names are all new, and otherwise (nodes are merged or names swapped)
+        replaces the graph by a relabelled copy.
+        """
+        mapping = {old: new for old, new in mapping.items() if old != new}
+        if not mapping:
+            return
+        targets = set(mapping.values())
+        if len(targets) == len(mapping) and targets.isdisjoint(self.graph):
+            self.perform(("relabel", mapping), ("relabel", {new: old for old, new in mapping.items()}))
+        else:
+            import networkx
+
+            self.replace(networkx.relabel_nodes(self.graph, mapping))
+
+    def replace(self, graph):
+        """
+        Replaces the whole graph. The old graph is kept as it is, not copied.
+        """
+        self.perform(("graph", graph), ("graph", self.graph))
+
+    def rollback(self):
+        for group in reversed(self.undo):
+            for operation in group:
+                self.graph = apply(self.graph, operation)
+        self.redo.clear()
+        self.undo.clear()
+
+
+class History:
+    """
+    Undo and redo steps of the edits of one graph, holding at most budget bytes (estimated). The oldest steps are
+    forgotten first, but the newest step is always kept. Counts the steps since the graph was saved, so it tells
+    whether the graph is modified.
+    """
+
+    def __init__(self, budget: int = BUDGET):
+        self.budget = budget
+        self.undo_steps = collections.deque()
+        self.redo_steps = []
+        self.size = 0
+        self.position = 0
+        self.saved = 0
+
+    @property
+    def modified(self):
+        return self.position != self.saved
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    @property
+    def undo_text(self):
+        return self.undo_steps[-1].description if self.undo_steps else None
+
+    @property
+    def redo_text(self):
+        return self.redo_steps[-1].description if self.redo_steps else None
+
+    @contextlib.contextmanager
+    def edit(self, graph, description: str):
+        """
+        Yields an Edit of graph and adds its changes as one step. Changes are undone if the block raises.
+        """
+        edit = Edit(graph)
+        try:
+            yield edit
+        except BaseException:
+            edit.rollback()
+            raise
+        if edit.redo:
+            self.push(Step(description, edit.redo, edit.undo))
+
+    def push(self, step: Step):
+        if self.saved is not None and self.saved > self.position:
+            # The saved state was in the redo steps that are dropped now.
+            self.saved = None
+        self.size -= sum(redo_step.size for redo_step in self.redo_steps)
+        self.redo_steps.clear()
+        self.undo_steps.append(step)
+        self.size += step.size
+        self.position += 1
+        while self.size > self.budget and len(self.undo_steps) > 1:
+            self.size -= self.undo_steps.popleft().size
+
+    def undo(self, graph):
+        """
+        Undoes the last step on graph and returns the graph (another one if the step replaced it).
+        """
+        if not self.undo_steps:
+            raise ValueError("Nothing to undo!")
+        step = self.undo_steps.pop()
+        for group in reversed(step.undo):
+            for operation in group:
+                graph = apply(graph, operation)
+        self.redo_steps.append(step)
+        self.position -= 1
+        return graph
+
+    def redo(self, graph):
+        if not self.redo_steps:
+            raise ValueError("Nothing to redo!")
+        step = self.redo_steps.pop()
+        for operation in step.redo:
+            graph = apply(graph, operation)
+        self.undo_steps.append(step)
+        self.position += 1
+        return graph
+
+    def mark_saved(self):
+        self.saved = self.position
+
+    def clear(self, saved: bool = True):
+        """
+        Forgets every step, for a graph that was opened (saved) or made anew (not saved).
+        """
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.size = 0
+        self.position = 0
+        self.saved = 0 if saved else None
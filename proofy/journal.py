@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import pathlib
+import threading
+
+from formats.jsonstream import GRAPH_CLASSES, atomic_writer, to_tuple
+from history import apply
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+VERSION = 1
+# Seconds between two fsyncs of the journal; the edits in between are written and synced together.
+SYNC_INTERVAL = 1.0
+# Characters of steps after which the journal is compacted into a snapshot of the graph.
+COMPACT_SIZE = 4 << 20
+
+
+def journal_path(path):
+    return pathlib.Path(f"{path}.journal")
+
+
+def base_of(path):
+    """
+    Identifies the saved file a journal continues, so that a journal is not replayed on a file changed since.
+    """
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def graph_data(graph):
+    """
+    The graph in node-link form, as written by write_node_link_json.
+    """
+    if graph.is_multigraph():
+        links = [
+            {**attributes, "source": u, "target": v, "key": k}
+            for u, v, k, attributes in graph.edges(keys=True, data=True)
+        ]
+    else:
+        links = [{**attributes, "source": u, "target": v} for u, v, attributes in graph.edges(data=True)]
+    return {
+        "directed": graph.is_directed(),
+        "multigraph": graph.is_multigraph(),
+        "graph": dict(graph.graph),
+        "nodes": [{**attributes, "id": node} for node, attributes in graph.nodes(data=True)],
+        "links": links,
+    }
+
+
+def data_graph(data):
+    graph = GRAPH_CLASSES[data["directed"], data["multigraph"]](**data["graph"])
+    for item in data["nodes"]:
+        graph.add_node(to_tuple(item.pop("id")), **item)
+    for item in data["links"]:
+        source, target = to_tuple(item.pop("source")), to_tuple(item.pop("target"))
+        if graph.is_multigraph():
+            graph.add_edge(source, target, to_tuple(item.pop("key", None)), **item)
+        else:
+            graph.add_edge(source, target, **item)
+    return graph
+
+
+def encode(operation):
+    kind, *arguments = operation
+    if kind == "relabel":
+        return [kind, list(arguments[0].items())]
+    if kind == "graph":
+        return [kind, None if arguments[0] is None else graph_data(arguments[0])]
+    return [kind, *arguments]
+
+
+def decode(operation):
+    kind, *arguments = operation
+    if kind == "relabel":
+        return kind, {to_tuple(old): to_tuple(new) for old, new in arguments[0]}
+    if kind == "graph":
+        return kind, None if arguments[0] is None else data_graph(arguments[0])
+    return (kind, *map(to_tuple, arguments))
+
+
+def read_journal(path):
+    """
+    The header and entries of a journal. A line cut short by a crash ends the journal.
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as file_p:
+        try:
+            header = json.loads(file_p.readline())
+        except ValueError:
+            return None, entries
+        for line in file_p:
+            if not line.endswith("\n"):
+                break
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return header, entries
+
+
+def recoverable(path):
+    """
+    The number of edits in the journal of path that the saved file does not have, 0 if there is none that fits it.
+    """
+    try:
+        header, entries = read_journal(journal_path(path))
+        base = base_of(path)
+    except OSError:
+        return 0
+    if header is None or header.get("journal") != VERSION or header.get("base") != base:
+        return 0
+    steps = 0
+    for entry in entries:
+        steps = entry["steps"] if "snapshot" in entry else steps + 1
+    return steps
+
+
+def replay(path, graph):
+    """
+    Applies the journal of path to graph, its saved file as read. Returns the graph (another one after a snapshot).
+    """
+    _, entries = read_journal(journal_path(path))
+    for entry in entries:
+        if "snapshot" in entry:
+            graph = data_graph(entry["snapshot"])
+        else:
+            for operation in entry["operations"]:
+                graph = apply(graph, decode(operation))
+    return graph
+
+
+class Journal:
+    """
+    Appends the edits of a graph to the journal next to its file as JSON lines, with one "step" per edit. Where the
+    journal was compacted, a "snapshot" holds the whole graph and the number of edits it includes. A background thread
+    writes the lines and fsyncs them at most every interval seconds, so editing never waits for the disk. With resume
+    the existing journal is continued.
+    """
+
+    def __init__(self, path, resume: bool = False, interval: float = SYNC_INTERVAL):
+        self.steps = recoverable(path) if resume else 0
+        self.path = journal_path(path)
+        self.header = json.dumps({"journal": VERSION, "base": base_of(path)}) + "\n"
+        self.interval = interval
+        self.file_p = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if not resume:
+            self.file_p.write(self.header)
+        self.size = 0
+        self.queue = []
+        self.queued = 0
+        self.synced = 0
+        self.urgent = False
+        self.closing = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="journal", daemon=True)
+        self.thread.start()
+
+    def append(self, description: str, operations):
+        """
+        Queues an edit, given as the operations that redo it.
+        """
+        line = json.dumps({"step": description, "operations": [encode(o) for o in operations]}, ensure_ascii=False)
+        self.size += len(line) + 1
+        self.steps += 1
+        self.put(line + "\n")
+
+    def compact(self, graph):
+        """
+        Queues replacing the journal by a snapshot of graph, which is taken now.
+        """
+        self.size = 0
+        self.put((graph_data(graph), self.steps))
+
+    def put(self, item):
+        with self.condition:
+            self.queue.append(item)
+            self.queued += 1
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or self.closing)
+                items, self.queue = self.queue, []
+                closing = self.closing
+            try:
+                self.write(items)
+            except (OSError, TypeError, ValueError) as e:
+                logger.error(f"Could not write the journal {self.path}: {e}")
+            with self.condition:
+                self.synced += len(items)
+                self.urgent = self.urgent and self.synced < self.queued
+                self.condition.notify_all()
+                if closing and not self.queue:
+                    break
+                # Batches the edits of the next interval into one fsync, unless someone waits for them.
+                self.condition.wait_for(lambda: self.urgent or self.closing, timeout=self.interval)
+
+    def write(self, items):
+        if not items:
+            return
+        for item in items:
+            if isinstance(item, str):
+                self.file_p.write(item)
+            else:
+                self.file_p.close()
+                try:
+                    data, steps = item
+                    with atomic_writer(self.path) as file_p:
+                        file_p.write(self.header)
+                        file_p.write(f'{{"steps": {steps}, "snapshot": ')
+                        json.dump(data, file_p, ensure_ascii=False)
+                        file_p.write("}\n")
+                finally:
+                    self.file_p = open(self.path, "a", encoding="utf-8")
+        self.file_p.flush()
+        os.fsync(self.file_p.fileno())
+
+    def sync(self):
+        """
+        Waits until everything queued so far is on disk.
+        """
+        with self.condition:
+            target = self.queued
+            self.urgent = True
+            self.condition.notify_all()
+            self.condition.wait_for(lambda: self.synced >= target)
+
+    def close(self, remove: bool = False):
+        """
+        Writes what is queued and closes the journal, and removes it when its edits are no longer wanted.
+        """
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.file_p.close()
+        if remove:
+            try:
+                os.unlink(self.path)
+            except OSError as e:
+                logger.error(e)
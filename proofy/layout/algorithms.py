@@ -0,0 +1,146 @@
+import numpy
+
+SPACING = 150.0
+EXACT_REPULSION_LIMIT = 500
+REPULSION_SAMPLES = 64
+
+
+def csr(count: int, sources, targets):
+    order = numpy.argsort(sources, kind="stable")
+    offsets = numpy.zeros(count + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(sources, minlength=count), out=offsets[1:])
+    return offsets, targets[order]
+
+
+def gather(offsets, neighbours, frontier):
+    """
+    Concatenates the CSR rows of the frontier nodes without a Python loop.
+    """
+    starts, ends = offsets[frontier], offsets[frontier + 1]
+    lengths = ends - starts
+    if not lengths.sum():
+        return neighbours[:0]
+    positions = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths) + numpy.arange(lengths.sum())
+    return neighbours[positions]
+
+
+def longest_path_layers(count: int, sources, targets):
+    """
+    Kahn's algorithm one frontier at a time, so each node gets the length of the longest path from a source.
+    Returns None if the graph has a cycle.
+    """
+    offsets, neighbours = csr(count, sources, targets)
+    indegree = numpy.bincount(targets, minlength=count)
+    layers = numpy.full(count, -1, dtype=numpy.int64)
+    frontier = numpy.flatnonzero(indegree == 0)
+    layer = 0
+    while frontier.size:
+        layers[frontier] = layer
+        released = gather(offsets, neighbours, frontier)
+        numpy.subtract.at(indegree, released, 1)
+        released = numpy.unique(released)
+        frontier = released[indegree[released] == 0]
+        layer += 1
+    return None if (layers < 0).any() else layers
+
+
+def rank_within_layers(layers, keys):
+    order = numpy.lexsort((keys, layers))
+    sorted_layers = layers[order]
+    starts = numpy.flatnonzero(numpy.r_[True, sorted_layers[1:] != sorted_layers[:-1]])
+    first = numpy.repeat(starts, numpy.diff(numpy.r_[starts, layers.size]))
+    ranks = numpy.empty(layers.size, dtype=numpy.float64)
+    ranks[order] = numpy.arange(layers.size) - first
+    sizes = numpy.bincount(layers)
+    return ranks - (sizes[layers] - 1) / 2
+
+
+def layered_layout(count: int, sources, targets, initial=None, sweeps: int = 8):
+    """
+    Hierarchical layout for proof DAGs (edges point from premise to conclusion): conclusions at the bottom,
+    every premise one layer above the step that uses it, and barycenter sweeps to reduce crossings.
+    """
+    # Layer by longest path to a sink, so premises sit right above their conclusions.
+    layers = longest_path_layers(count, targets, sources)
+    if layers is None:
+        return None
+    x = rank_within_layers(layers, initial[:, 0] if initial is not None else numpy.arange(count, dtype=numpy.float64))
+    degree = numpy.maximum(numpy.bincount(sources, minlength=count) + numpy.bincount(targets, minlength=count), 1)
+    for _ in range(sweeps):
+        barycenter = (
+            numpy.bincount(sources, weights=x[targets], minlength=count)
+            + numpy.bincount(targets, weights=x[sources], minlength=count)
+        ) / degree
+        x = rank_within_layers(layers, numpy.where(degree > 0, barycenter, x))
+    return numpy.column_stack([x * SPACING, (layers.max(initial=0) - layers) * SPACING])
+
+
+def force_layout(count: int, sources, targets, initial=None, movable=None, iterations: int = 60, seed: int = 0):
+    """
+    Fruchterman-Reingold with whole-array updates. Repulsion is exact up to EXACT_REPULSION_LIMIT nodes and
+    estimated from a random sample of nodes above that. Only movable nodes are moved (and have forces computed).
+    """
+    random = numpy.random.default_rng(seed)
+    k = SPACING
+    if initial is None:
+        positions = random.uniform(0, k * numpy.sqrt(max(count, 1)), size=(count, 2))
+    else:
+        positions = initial.astype(numpy.float64, copy=True)
+    moving = numpy.arange(count) if movable is None else numpy.flatnonzero(movable)
+    if not moving.size:
+        return positions
+    row = numpy.full(count, -1, dtype=numpy.int64)
+    row[moving] = numpy.arange(moving.size)
+    pulled = (row[sources] >= 0) | (row[targets] >= 0)
+    sources, targets = sources[pulled], targets[pulled]
+    temperature = k * numpy.sqrt(moving.size) / 10
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        if count <= EXACT_REPULSION_LIMIT:
+            others, scale = positions, 1.0
+        else:
+            others, scale = positions[random.choice(count, REPULSION_SAMPLES, replace=False)], count / REPULSION_SAMPLES
+        delta = positions[moving, None, :] - others[None, :, :]
+        distance2 = numpy.maximum((delta**2).sum(axis=2), 1e-6)
+        displacement = (delta * (k * k / distance2)[:, :, None]).sum(axis=1) * scale
+        delta = positions[sources] - positions[targets]
+        pull = delta * (numpy.sqrt((delta**2).sum(axis=1)) / k)[:, None]
+        source_rows, target_rows = row[sources], row[targets]
+        numpy.subtract.at(displacement, source_rows[source_rows >= 0], pull[source_rows >= 0])
+        numpy.add.at(displacement, target_rows[target_rows >= 0], pull[target_rows >= 0])
+        length = numpy.maximum(numpy.sqrt((displacement**2).sum(axis=1)), 1e-3)
+        positions[moving] += displacement * (numpy.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return positions
+
+
+def compute_layout(count: int, sources, targets, initial=None, known=None):
+    """
+    Lays out nodes 0..count-1 with edges sources[i] -> targets[i]. Runs in a worker process.
+    initial/known are the previous positions and which of them are still valid, for incremental re-layout.
+    """
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    targets = numpy.asarray(targets, dtype=numpy.int64)
+    if count == 0:
+        return numpy.zeros((0, 2))
+    if (positions := layered_layout(count, sources, targets, initial if known is not None else None)) is not None:
+        return positions
+    if known is None:
+        return force_layout(count, sources, targets)
+    # Place new nodes next to their laid out neighbours and only let them (and their neighbours) settle.
+    positions = numpy.where(known[:, None], initial, 0.0)
+    neighbour_sum = numpy.zeros((count, 2))
+    neighbour_count = numpy.zeros(count)
+    for a, b in ((sources, targets), (targets, sources)):
+        numpy.add.at(neighbour_sum, a, numpy.where(known[b, None], positions[b], 0.0))
+        numpy.add.at(neighbour_count, a, known[b])
+    jitter = numpy.random.default_rng(0).uniform(-SPACING / 2, SPACING / 2, size=(count, 2))
+    centre = positions[known].mean(axis=0) if known.any() else numpy.zeros(2)
+    placed = numpy.where(
+        (neighbour_count > 0)[:, None], neighbour_sum / numpy.maximum(neighbour_count, 1)[:, None], centre
+    )
+    positions = numpy.where(known[:, None], positions, placed + jitter)
+    movable = ~known
+    movable[sources[~known[targets]]] = True
+    movable[targets[~known[sources]]] = True
+    return force_layout(count, sources, targets, positions, movable, iterations=30)
@@ -0,0 +1,91 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy
+
+ENCODER = json.JSONEncoder()
+HASH_BATCH = 4096
+INCREMENTAL_FRACTION = 0.9
+
+
+def structural_hash(graph) -> str:
+    """
+    Hash of the node ids and edges (not the attributes) of graph, in iteration order.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{graph.is_directed()} {graph.is_multigraph()}".encode())
+    batch = []
+    for item in graph.nodes:
+        batch.append(ENCODER.encode(item))
+        if len(batch) >= HASH_BATCH:
+            digest.update("\0".join(batch).encode())
+            batch.clear()
+    batch.append("\1")
+    for item in graph.edges:
+        batch.append(ENCODER.encode(item))
+        if len(batch) >= HASH_BATCH:
+            digest.update("\0".join(batch).encode())
+            batch.clear()
+    digest.update("\0".join(batch).encode())
+    return digest.hexdigest()
+
+
+class GraphArrays:
+    """
+    Node list plus edge index arrays, which is all the layout algorithms need (and cheap to send to a process).
+    """
+
+    def __init__(self, graph):
+        self.nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(self.nodes)}
+        count = graph.number_of_edges()
+        self.sources = numpy.fromiter((index[u] for u, *_ in graph.edges), dtype=numpy.int64, count=count)
+        self.targets = numpy.fromiter((index[v] for _, v, *_ in graph.edges), dtype=numpy.int64, count=count)
+
+
+class Layout:
+    def __init__(self, nodes, coordinates):
+        self.nodes = nodes
+        self.coordinates = coordinates
+        self._positions = None
+
+    def positions(self):
+        if self._positions is None and self.coordinates is not None:
+            self._positions = dict(zip(self.nodes, self.coordinates.tolist()))
+        return self._positions
+
+
+class LayoutCache:
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self.layouts = OrderedDict()
+
+    def get(self, key: str):
+        if (layout := self.layouts.get(key)) is not None:
+            self.layouts.move_to_end(key)
+        return layout
+
+    def put(self, key: str, layout: Layout):
+        self.layouts[key] = layout
+        self.layouts.move_to_end(key)
+        while len(self.layouts) > self.max_entries:
+            self.layouts.popitem(last=False)
+
+    def seed(self, arrays: GraphArrays):
+        """
+        Returns (initial, known) positions from the most recent layout if it covers most of the nodes,
+        so only the changed part of the graph has to be laid out again, otherwise (None, None).
+        """
+        for layout in reversed(self.layouts.values()):
+            if layout.coordinates is None:
+                continue
+            previous = {node: i for i, node in enumerate(layout.nodes)}
+            rows = numpy.fromiter((previous.get(node, -1) for node in arrays.nodes), numpy.int64, len(arrays.nodes))
+            known = rows >= 0
+            if known.sum() < INCREMENTAL_FRACTION * len(arrays.nodes):
+                return None, None
+            initial = numpy.zeros((len(arrays.nodes), 2))
+            initial[known] = layout.coordinates[rows[known]]
+            return initial, known
+        return None, None
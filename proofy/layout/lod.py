@@ -0,0 +1,169 @@
+import networkx
+import numpy
+
+from layout.algorithms import longest_path_layers
+from layout.cache import GraphArrays
+
+LOD_THRESHOLD = 5000
+DETAIL_SCALE = 0.3
+MAX_VISIBLE = 2000
+MAX_CLUSTER = 64
+CLUSTER = "⋯cluster"
+REGION = "⋯region"
+
+
+def unique_pairs(sources, targets):
+    if not sources.size:
+        return sources, targets
+    pairs = numpy.unique(numpy.column_stack([sources, targets]), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def sub_proof_clusters(graph, arrays: GraphArrays, max_size: int = MAX_CLUSTER):
+    """
+    Cluster id per node. In directed graphs strongly connected components are condensed first; then every step
+    whose result is used by exactly one other step joins that step's cluster (a sub-proof or lemma), as long as
+    the cluster stays below max_size. Undirected graphs use label propagation communities.
+    """
+    count = len(arrays.nodes)
+    if not graph.is_directed():
+        index = {node: i for i, node in enumerate(arrays.nodes)}
+        clusters = numpy.empty(count, dtype=numpy.int64)
+        for k, members in enumerate(networkx.algorithms.community.label_propagation_communities(graph)):
+            clusters[[index[member] for member in members]] = k
+        return clusters
+
+    components = numpy.arange(count)
+    sources, targets = arrays.sources, arrays.targets
+    units = count
+    if (layers := longest_path_layers(count, targets, sources)) is None:
+        index = {node: i for i, node in enumerate(arrays.nodes)}
+        for units, members in enumerate(networkx.strongly_connected_components(graph)):
+            components[[index[member] for member in members]] = units
+        units += 1
+        keep = components[sources] != components[targets]
+        sources, targets = components[sources][keep], components[targets][keep]
+    sources, targets = unique_pairs(sources, targets)
+    if layers is None or units != count:
+        layers = longest_path_layers(units, targets, sources)
+
+    sizes = numpy.bincount(components, minlength=units)
+    out_degree = numpy.bincount(sources, minlength=units)
+    successor = numpy.full(units, -1, dtype=numpy.int64)
+    single = out_degree[sources] == 1
+    successor[sources[single]] = targets[single]
+
+    cluster_of = list(range(units))
+    cluster_size = sizes.tolist()
+    successor = successor.tolist()
+    # Conclusions first, so a step's cluster is settled before its premises look at it.
+    for unit in numpy.argsort(layers, kind="stable").tolist():
+        if (parent := successor[unit]) >= 0:
+            root = cluster_of[parent]
+            if cluster_size[root] + cluster_size[unit] <= max_size:
+                cluster_of[unit] = root
+                cluster_size[root] += cluster_size[unit]
+    return numpy.unique(numpy.asarray(cluster_of)[components], return_inverse=True)[1].reshape(-1)
+
+
+class LevelOfDetail:
+    """
+    Decides which part of a large graph is sent to the page: nodes in the viewport when zoomed in (and few enough),
+    otherwise one summary node per sub-proof cluster, or per grid region if there are still too many clusters.
+    Clusters in expanded are always shown node by node.
+    """
+
+    def __init__(self, graph, layout):
+        self.graph = graph
+        self.layout = layout
+        arrays = GraphArrays(graph)
+        self.nodes = arrays.nodes
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.sources, self.targets = arrays.sources, arrays.targets
+        self.coordinates = layout.coordinates
+        self.clusters = sub_proof_clusters(graph, arrays)
+        self.cluster_count = int(self.clusters.max(initial=-1)) + 1
+        self.cluster_sizes = numpy.bincount(self.clusters, minlength=self.cluster_count)
+        self.representatives = numpy.zeros(self.cluster_count, dtype=numpy.int64)
+        # The last member in node order stands for the cluster, which is the conclusion for proofs built top down.
+        self.representatives[self.clusters] = numpy.arange(len(self.nodes))
+        self.expanded = set()
+
+    def cluster_of(self, node):
+        return int(self.clusters[self.index[node]])
+
+    def groups(self, members, group_ids, kind):
+        """
+        Summary node id, attributes and position for each group of (non individual) member nodes.
+        """
+        group_ids, inverse = numpy.unique(group_ids, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        sizes = numpy.bincount(inverse)
+        centroids = numpy.column_stack(
+            [numpy.bincount(inverse, weights=self.coordinates[members, axis]) / sizes for axis in (0, 1)]
+        )
+        representatives = numpy.zeros(len(group_ids), dtype=numpy.int64)
+        representatives[inverse] = members
+        items = []
+        for group, size, centroid, representative in zip(
+            group_ids.tolist(), sizes.tolist(), centroids.tolist(), representatives.tolist()
+        ):
+            if kind == CLUSTER:
+                size = int(self.cluster_sizes[group])
+                representative = int(self.representatives[group])
+            label = f"{self.nodes[representative]} (+{size - 1})"
+            items.append(((kind, group), {"__label": label, "__summary": kind, "size": size}, centroid))
+        return inverse, items
+
+    def view(self, viewport=None, scale: float = 0.0):
+        """
+        Returns the graph to render and the positions of its nodes.
+        viewport is (x0, y0, x1, y1) in layout coordinates and scale the zoom factor of the page.
+        """
+        x, y = self.coordinates[:, 0], self.coordinates[:, 1]
+        if viewport is None:
+            inside = numpy.ones(len(self.nodes), dtype=bool)
+        else:
+            x0, y0, x1, y1 = viewport
+            inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        expanded = self.cluster_sizes[self.clusters] == 1
+        if self.expanded:
+            expanded |= numpy.isin(self.clusters, list(self.expanded))
+        individual = inside & expanded
+        if scale >= DETAIL_SCALE and inside.sum() <= MAX_VISIBLE:
+            individual = inside
+        if individual.sum() > MAX_VISIBLE:
+            individual &= numpy.cumsum(individual) <= MAX_VISIBLE
+
+        members = numpy.flatnonzero(inside & ~individual)
+        kind, group_ids = CLUSTER, self.clusters[members]
+        if len(numpy.unique(group_ids)) > MAX_VISIBLE:
+            kind = REGION
+            extent = numpy.ptp(self.coordinates[members], axis=0).max() + 1
+            cell = extent / numpy.sqrt(MAX_VISIBLE)
+            cells = numpy.floor(self.coordinates[members] / cell).astype(numpy.int64)
+            cells -= cells.min(axis=0)
+            group_ids = cells[:, 0] * (cells[:, 1].max() + 1) + cells[:, 1]
+        inverse, items = self.groups(members, group_ids, kind) if members.size else (members, [])
+
+        count = len(self.nodes)
+        node_items = numpy.full(count, -1, dtype=numpy.int64)
+        individuals = numpy.flatnonzero(individual)
+        node_items[individuals] = individuals
+        node_items[members] = count + inverse
+        sources, targets = node_items[self.sources], node_items[self.targets]
+        keep = (sources >= 0) & (targets >= 0) & (sources != targets)
+        sources, targets = unique_pairs(sources[keep], targets[keep])
+
+        view = networkx.DiGraph() if self.graph.is_directed() else networkx.Graph()
+        positions = {}
+        for i in individuals.tolist():
+            node = self.nodes[i]
+            view.add_node(node, **self.graph.nodes[node])
+            positions[node] = self.coordinates[i].tolist()
+        for item, attributes, position in items:
+            view.add_node(item, **attributes)
+            positions[item] = position
+        ids = self.nodes + [item for item, _, _ in items]
+        view.add_edges_from((ids[u], ids[v]) for u, v in zip(sources.tolist(), targets.tolist()))
+        return view, positions
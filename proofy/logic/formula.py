@@ -0,0 +1,422 @@
+import hashlib
+import threading
+import weakref
+
+from logic.symbols import MetalogicSymbols, PropositionalLogicSymbols, QuantifierSymbols
+
+TABLE = weakref.WeakValueDictionary()
+TABLE_LOCK = threading.Lock()
+
+
+class Node:
+    """
+    Hash-consed syntax tree node: constructing a node equal to a live one returns that same object, so equality is
+    identity and the hash is computed once. Children are shared between every formula that contains them.
+    """
+
+    __slots__ = ("args", "hash", "text", "fingerprint", "__weakref__")
+    precedence = 5
+
+    def __new__(cls, *args):
+        key = (cls, args)
+        if (node := TABLE.get(key)) is None:
+            node = object.__new__(cls)
+            node.args = args
+            node.hash = hash(key)
+            node.text = None
+            node.fingerprint = None
+            with TABLE_LOCK:
+                node = TABLE.setdefault(key, node)
+        return node
+
+    def __hash__(self):
+        return self.hash
+
+    def __reduce__(self):
+        return self.__class__, self.args
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __str__(self):
+        if self.text is None:
+            # Bottom-up so that deeply nested formulas never recurse.
+            for node in subterms(self, skip=lambda node: node.text is not None):
+                node.text = node.format()
+        return self.text
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self)!r})"
+
+    def format(self):
+        raise NotImplementedError()
+
+    def child(self, node, precedence):
+        return f"({node})" if node.precedence < precedence else str(node)
+
+
+class Term(Node):
+    __slots__ = ()
+
+
+class Var(Term):
+    __slots__ = ()
+
+    def __new__(cls, name: str):
+        return Node.__new__(cls, name)
+
+    @property
+    def name(self):
+        return self.args[0]
+
+    def format(self):
+        return self.name
+
+
+class Func(Term):
+    __slots__ = ()
+
+    def __new__(cls, name: str, arguments):
+        return Node.__new__(cls, name, tuple(arguments))
+
+    @property
+    def name(self):
+        return self.args[0]
+
+    @property
+    def arguments(self):
+        return self.args[1]
+
+    def format(self):
+        return f"{self.name}({', '.join(map(str, self.arguments))})"
+
+
+class Formula(Node):
+    __slots__ = ()
+
+
+class Top(Formula):
+    __slots__ = ()
+
+    def __new__(cls):
+        return Node.__new__(cls)
+
+    def format(self):
+        return PropositionalLogicSymbols.TRUE.value
+
+
+class Bottom(Formula):
+    __slots__ = ()
+
+    def __new__(cls):
+        return Node.__new__(cls)
+
+    def format(self):
+        return PropositionalLogicSymbols.FALSE.value
+
+
+class Meta(Formula):
+    """
+    Schematic variable, written ?A, that substitution and unification can replace by any formula or term.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, name: str):
+        return Node.__new__(cls, name)
+
+    @property
+    def name(self):
+        return self.args[0]
+
+    def format(self):
+        return f"?{self.name}"
+
+
+class Predicate(Formula):
+    """
+    Atomic formula; a propositional variable is a predicate without arguments.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, name: str, arguments=()):
+        return Node.__new__(cls, name, tuple(arguments))
+
+    @property
+    def name(self):
+        return self.args[0]
+
+    @property
+    def arguments(self):
+        return self.args[1]
+
+    def format(self):
+        return f"{self.name}({', '.join(map(str, self.arguments))})" if self.arguments else self.name
+
+
+class Not(Formula):
+    __slots__ = ()
+    precedence = 4
+
+    def __new__(cls, operand: Formula):
+        return Node.__new__(cls, operand)
+
+    @property
+    def operand(self):
+        return self.args[0]
+
+    def format(self):
+        return PropositionalLogicSymbols.NOT.value + self.child(self.operand, self.precedence)
+
+
+class Binary(Formula):
+    __slots__ = ()
+    symbol = None
+    # Minimum precedence of the left and right operands that can be printed without parentheses.
+    operand_precedence = (5, 5)
+
+    def __new__(cls, left: Formula, right: Formula):
+        return Node.__new__(cls, left, right)
+
+    @property
+    def left(self):
+        return self.args[0]
+
+    @property
+    def right(self):
+        return self.args[1]
+
+    def format(self):
+        left, right = self.operand_precedence
+        return f"{self.child(self.left, left)} {self.symbol} {self.child(self.right, right)}"
+
+
+class And(Binary):
+    __slots__ = ()
+    symbol = PropositionalLogicSymbols.AND.value
+    precedence = 3
+    operand_precedence = (3, 4)
+
+
+class Or(Binary):
+    __slots__ = ()
+    symbol = PropositionalLogicSymbols.OR.value
+    precedence = 2
+    operand_precedence = (2, 3)
+
+
+class Implies(Binary):
+    __slots__ = ()
+    symbol = PropositionalLogicSymbols.IMPLIES.value
+    precedence = 1
+    operand_precedence = (2, 1)
+
+
+class Quantifier(Formula):
+    __slots__ = ()
+    symbol = None
+    precedence = 4
+
+    def __new__(cls, variable: Var, body: Formula):
+        return Node.__new__(cls, variable, body)
+
+    @property
+    def variable(self):
+        return self.args[0]
+
+    @property
+    def body(self):
+        return self.args[1]
+
+    def format(self):
+        return f"{self.symbol}{self.variable} {self.child(self.body, self.precedence)}"
+
+
+class ForAll(Quantifier):
+    __slots__ = ()
+    symbol = QuantifierSymbols.FORALL.value
+
+
+class Exists(Quantifier):
+    __slots__ = ()
+    symbol = QuantifierSymbols.EXISTS.value
+
+
+class Sequent(Node):
+    """
+    Γ ⊢ Δ with Γ and Δ as sets of formulas.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, antecedent=(), succedent=()):
+        return Node.__new__(cls, frozenset(antecedent), frozenset(succedent))
+
+    @property
+    def antecedent(self):
+        return self.args[0]
+
+    @property
+    def succedent(self):
+        return self.args[1]
+
+    def format(self):
+        antecedent = ", ".join(sorted(map(str, self.antecedent)))
+        succedent = ", ".join(sorted(map(str, self.succedent)))
+        return " ".join(filter(None, [antecedent, MetalogicSymbols.ENTAILS_SYNTACTICALLY.value, succedent]))
+
+
+def subterms(node: Node, skip=None):
+    """
+    Distinct nodes of node (each shared subformula once), children before parents. Nodes for which skip returns True are
+    left out together with their children.
+    """
+    seen, order, stack = set(), [], [(node, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if expanded:
+            order.append(current)
+        elif current not in seen:
+            seen.add(current)
+            if skip is not None and skip(current):
+                continue
+            stack.append((current, True))
+            stack.extend((child, False) for child in children(current) if child not in seen)
+    return order
+
+
+def children(node: Node):
+    if isinstance(node, Sequent):
+        return [*node.antecedent, *node.succedent]
+    result = []
+    for arg in node.args:
+        if isinstance(arg, Node):
+            result.append(arg)
+        elif isinstance(arg, tuple):
+            result.extend(arg)
+    return result
+
+
+def tree_size(node: Node) -> int:
+    """
+    Number of nodes the formula would have without sharing.
+    """
+    sizes = {}
+    for current in subterms(node):
+        sizes[current] = 1 + sum(sizes[child] for child in children(current))
+    return sizes[node]
+
+
+def fingerprint(node: Node) -> bytes:
+    """
+    16 byte digest of node that, unlike its hash, is the same in every process. It is computed once per node from the
+    fingerprints of its children, so a sequent costs only its new subformulas.
+    """
+    if node.fingerprint is None:
+        if any(child.fingerprint is None for child in children(node)):
+            for current in subterms(node, skip=lambda n: n.fingerprint is not None):
+                current.fingerprint = own_fingerprint(current)
+        else:
+            node.fingerprint = own_fingerprint(node)
+    return node.fingerprint
+
+
+def own_fingerprint(node: Node) -> bytes:
+    digest = hashlib.blake2b(type(node).__name__.encode(), digest_size=16)
+    for arg in node.args:
+        if isinstance(arg, Node):
+            digest.update(b"n" + arg.fingerprint)
+        elif isinstance(arg, tuple):
+            digest.update(b"t%d" % len(arg) + b"".join(child.fingerprint for child in arg))
+        elif isinstance(arg, frozenset):
+            # Sorted, since the order of a set follows the hashes.
+            digest.update(b"s%d" % len(arg) + b"".join(sorted(child.fingerprint for child in arg)))
+        else:
+            text = str(arg).encode()
+            digest.update(b"a%d:" % len(text) + text)
+    return digest.digest()
+
+
+FREE_VARIABLES = weakref.WeakKeyDictionary()
+
+
+def free_variables(node: Node) -> frozenset:
+    if (result := FREE_VARIABLES.get(node)) is not None:
+        return result
+    for current in subterms(node, skip=lambda n: n in FREE_VARIABLES):
+        if isinstance(current, Var):
+            result = frozenset([current])
+        elif isinstance(current, Quantifier):
+            result = FREE_VARIABLES[current.body] - {current.variable}
+        else:
+            result = frozenset().union(*(FREE_VARIABLES[child] for child in children(current)))
+        FREE_VARIABLES[current] = result
+    return FREE_VARIABLES[node]
+
+
+METAVARIABLES = weakref.WeakKeyDictionary()
+
+
+def metavariables(node: Node) -> frozenset:
+    if (result := METAVARIABLES.get(node)) is not None:
+        return result
+    for current in subterms(node, skip=lambda n: n in METAVARIABLES):
+        if isinstance(current, Meta):
+            result = frozenset([current])
+        else:
+            result = frozenset().union(*(METAVARIABLES[child] for child in children(current)))
+        METAVARIABLES[current] = result
+    return METAVARIABLES[node]
+
+
+def fresh_variable(avoid, prefix="a"):
+    names = {variable.name for variable in avoid}
+    index = 0
+    while f"{prefix}{index}" in names:
+        index += 1
+    return Var(f"{prefix}{index}")
+
+
+def substitute(node: Node, mapping: dict, memo=None):
+    """
+    Capture-avoiding simultaneous substitution of the free variables in mapping; bound variables are renamed when a
+    substituted term would be captured.
+    """
+    if memo is None:
+        memo = {}
+    mapping = {variable: term for variable, term in mapping.items() if variable in free_variables(node)}
+    if not mapping:
+        return node
+    key = (node, frozenset(mapping.items()))
+    if (result := memo.get(key)) is not None:
+        return result
+    if isinstance(node, Var):
+        result = mapping[node]
+    elif isinstance(node, Quantifier):
+        variable = node.variable
+        mapping.pop(variable, None)
+        captured = frozenset().union(*(free_variables(term) for term in mapping.values()))
+        if variable in captured:
+            renamed = fresh_variable(captured | free_variables(node.body), variable.name)
+            mapping[variable] = renamed
+            variable = renamed
+        result = type(node)(variable, substitute(node.body, mapping, memo))
+    elif isinstance(node, (Func, Predicate)):
+        result = type(node)(node.name, [substitute(argument, mapping, memo) for argument in node.arguments])
+    elif isinstance(node, Sequent):
+        result = Sequent(
+            [substitute(f, mapping, memo) for f in node.antecedent],
+            [substitute(f, mapping, memo) for f in node.succedent],
+        )
+    else:
+        result = type(node)(*(substitute(child, mapping, memo) for child in node.args))
+    memo[key] = result
+    return result
+
+
+def instantiate(quantifier: Quantifier, term: Term) -> Formula:
+    return substitute(quantifier.body, {quantifier.variable: term})
@@ -0,0 +1,225 @@
+import collections
+import hashlib
+import json
+import sqlite3
+
+from logic.formula import Func, Node, Predicate, Quantifier, Sequent, Var, children, free_variables
+from logic.parallel import flatten, unflatten
+from logic.parser import parse_sequent
+from logic.prover import Derivation
+
+# Derivations kept in memory, the least recently used are dropped first.
+CACHE_SIZE = 256
+SEARCH_LIMIT = 100
+# Items indexed between two progress reports.
+PROGRESS_INTERVAL = 1 << 14
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lemmas (
+    hash TEXT PRIMARY KEY,
+    canonical TEXT NOT NULL,
+    sequent TEXT NOT NULL,
+    proof TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (trigram, hash)
+) WITHOUT ROWID;
+"""
+
+
+def alpha_normal(node: Node):
+    """
+    node with every bound variable renamed after the number of quantifiers around its binder, so formulas that only
+    differ in the names of bound variables become the same node. The names ("#0", "#1", ...) cannot be parsed, so
+    they never clash with a free variable.
+    """
+    memo = {}
+
+    def key(current, context, level):
+        return current, level, frozenset((v, context[v]) for v in free_variables(current) if v in context)
+
+    stack = [(node, {}, 0, False)]
+    while stack:
+        current, context, level, expanded = stack.pop()
+        if not expanded and key(current, context, level) in memo:
+            continue
+        if isinstance(current, Quantifier):
+            inner = {**context, current.variable: Var(f"#{level}")}
+            frames = [(current.body, inner, level + 1)]
+        else:
+            frames = [(child, context, level) for child in children(current)]
+        if not expanded:
+            stack.append((current, context, level, True))
+            stack.extend((child, child_context, child_level, False) for child, child_context, child_level in frames)
+            continue
+        result = [memo[key(*frame)] for frame in frames]
+        if isinstance(current, Var):
+            normal = context.get(current, current)
+        elif isinstance(current, Quantifier):
+            normal = type(current)(Var(f"#{level}"), result[0])
+        elif isinstance(current, (Func, Predicate)):
+            normal = type(current)(current.name, result)
+        elif isinstance(current, Sequent):
+            normal = Sequent(result[: len(current.antecedent)], result[len(current.antecedent) :])
+        elif result:
+            normal = type(current)(*result)
+        else:
+            normal = current
+        memo[key(current, context, level)] = normal
+    return memo[key(node, {}, 0)]
+
+
+def canonical(sequent: Sequent) -> str:
+    return str(alpha_normal(sequent))
+
+
+def lemma_hash(sequent: Sequent) -> str:
+    return hashlib.blake2b(canonical(sequent).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def trigrams(text: str):
+    text = text.casefold()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Texts by key and the keys of the texts that contain each trigram. A fragment is found by intersecting the
+    posting sets of its trigrams, smallest first, and checking only the texts that are left.
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.postings = collections.defaultdict(set)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, key, text: str):
+        self.remove(key)
+        self.texts[key] = text.casefold()
+        for trigram in trigrams(text):
+            self.postings[trigram].add(key)
+
+    def remove(self, key):
+        if (text := self.texts.pop(key, None)) is not None:
+            for trigram in trigrams(text):
+                self.postings[trigram].discard(key)
+
+    def search(self, fragment: str, limit: int = SEARCH_LIMIT):
+        """
+        Keys of at most limit texts that contain fragment, ignoring case.
+        """
+        fragment = fragment.casefold()
+        if grams := trigrams(fragment):
+            postings = sorted((self.postings.get(trigram, set()) for trigram in grams), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            # Shorter than a trigram: every text is a candidate, but the first matches end the search.
+            candidates = self.texts
+        result = []
+        for key in candidates:
+            if fragment in self.texts[key]:
+                result.append(key)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+def index_texts(items, progress=None):
+    """
+    TrigramIndex of (key, text) items. progress(fraction) may raise to cancel.
+    """
+    items = list(items)
+    index = TrigramIndex()
+    for i, (key, text) in enumerate(items):
+        index.add(key, text)
+        if progress is not None and i % PROGRESS_INTERVAL == 0:
+            progress(i / len(items))
+    return index
+
+
+class LemmaStore:
+    """
+    Proved sequents and their derivations in SQLite, keyed by the hash of their alpha-normal form, so a lemma is
+    found again whatever its bound variables are called. The most recently used derivations are kept in memory, and
+    a trigram table finds lemmas by a fragment of their text.
+    """
+
+    def __init__(self, path, cache_size: int = CACHE_SIZE):
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(SCHEMA)
+        self.cache = collections.OrderedDict()
+        self.cache_size = cache_size
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM lemmas").fetchone()[0]
+
+    def remember(self, key: str, derivation: Derivation):
+        self.cache[key] = derivation
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def get(self, sequent: Sequent):
+        """
+        The stored derivation of sequent (of the lemma as it was stored, up to bound variable names), or None.
+        """
+        key = lemma_hash(sequent)
+        if (derivation := self.cache.get(key)) is not None:
+            self.cache.move_to_end(key)
+            return derivation
+        row = self.connection.execute("SELECT canonical, proof FROM lemmas WHERE hash = ?", (key,)).fetchone()
+        if row is None or row[0] != canonical(sequent):
+            return None
+        rows = [(parse_sequent(text), rule, premises) for text, rule, premises in json.loads(row[1])]
+        derivation = unflatten(rows)[-1]
+        self.remember(key, derivation)
+        return derivation
+
+    def add(self, derivation: Derivation):
+        """
+        Stores the derivation of a proved sequent, unless the lemma is already stored. Returns its hash.
+        """
+        sequent = derivation.sequent
+        key = lemma_hash(sequent)
+        text = str(sequent)
+        proof = json.dumps([[str(s), rule, premises] for s, rule, premises in flatten(derivation)], ensure_ascii=False)
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO lemmas (hash, canonical, sequent, proof) VALUES (?, ?, ?, ?)",
+                (key, canonical(sequent), text, proof),
+            )
+            if cursor.rowcount:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO trigrams (trigram, hash) VALUES (?, ?)",
+                    [(trigram, key) for trigram in trigrams(text)],
+                )
+        self.remember(key, derivation)
+        return key
+
+    def search(self, fragment: str, limit: int = SEARCH_LIMIT):
+        """
+        The text of at most limit lemmas that contain fragment, ignoring case.
+        """
+        folded = fragment.casefold()
+        if grams := sorted(trigrams(fragment)):
+            rows = self.connection.execute(
+                "SELECT sequent FROM lemmas WHERE hash IN ("
+                f"SELECT hash FROM trigrams WHERE trigram IN ({', '.join('?' * len(grams))}) "
+                "GROUP BY hash HAVING COUNT(*) = ?)",
+                (*grams, len(grams)),
+            )
+        else:
+            rows = self.connection.execute("SELECT sequent FROM lemmas")
+        result = []
+        for (text,) in rows:
+            if folded in text.casefold():
+                result.append(text)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,400 @@
+import collections
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy
+
+from logic.formula import Sequent, fingerprint
+from logic.prover import MAX_ENTRIES, MAX_ROUNDS, REFUTED, Derivation, Prover, expand, is_gamma
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+CACHE_SLOTS = 1 << 20
+PROBES = 32
+# Tasks per worker the coordinator aims for when it splits the frontier.
+SPLIT_FACTOR = 8
+# Sequents a task explores before it gives up and has the coordinator split it further.
+TASK_LIMIT = 1 << 14
+# Sequents the coordinator expands itself per split before handing the rest out regardless.
+SPLIT_LIMIT = 1 << 12
+REPORT_INTERVAL = 1.0
+# Rule of a placeholder for a sequent proved in another task.
+CACHED = "↺"
+PROVED, FAILED, SPLIT, ABANDONED = range(4)
+PROVED_STATUS, REFUTED_STATUS = 1, 2
+
+
+def digest(sequent: Sequent):
+    value = fingerprint(sequent)
+    return int.from_bytes(value[:8], "little") | 1, int.from_bytes(value[8:], "little")
+
+
+class SharedCache:
+    """
+    Sequents proved or refuted by any process, as an open addressing table of 128 bit digests in shared memory,
+    followed by a generation word that abandons running tasks when it changes and per-worker progress counters.
+    Writers are serialized by lock and write a slot's key last, so readers can probe without locking.
+    """
+
+    def __init__(self, slots, workers, lock, name=None):
+        self.slots = slots
+        self.workers = workers
+        self.lock = lock
+        self.header = 1 + 2 * workers
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=8 * (self.header + 3 * slots))
+        self.array = numpy.ndarray((self.header + 3 * slots,), dtype=numpy.uint64, buffer=self.memory.buf)
+        if name is None:
+            self.array[:] = 0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @property
+    def generation(self):
+        return int(self.array[0])
+
+    @generation.setter
+    def generation(self, value):
+        self.array[0] = value
+
+    def report(self, index, explored, depth):
+        self.array[1 + index] = explored
+        self.array[1 + self.workers + index] = depth
+
+    def explored(self):
+        return int(self.array[1 : 1 + self.workers].sum())
+
+    def depth(self):
+        return int(self.array[1 + self.workers : self.header].max())
+
+    def probe(self, key):
+        high, low = key
+        for i in range(PROBES):
+            offset = self.header + 3 * ((low + i) % self.slots)
+            if (stored := self.array[offset]) == 0 or (stored == high and self.array[offset + 1] == low):
+                yield offset
+
+    def get(self, key):
+        for offset in self.probe(key):
+            return int(self.array[offset + 2])
+        return 0
+
+    def put(self, key, status):
+        with self.lock:
+            for offset in self.probe(key):
+                if self.array[offset] == 0:
+                    self.array[offset + 2] = status
+                    self.array[offset + 1] = key[1]
+                    self.array[offset] = key[0]
+                return
+
+    def close(self, unlink=False):
+        del self.array
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+class SharedProver(Prover):
+    """
+    Prover that also consults and extends the shared cache, so that every sequent one task proves or refutes is reused
+    by the others. A sequent proved elsewhere becomes a CACHED placeholder that the coordinator replaces with the
+    derivation it received; the derivations published since the last task finished are kept in published until they
+    are sent to it.
+    """
+
+    def __init__(self, cache: SharedCache, max_entries=MAX_ENTRIES):
+        super(SharedProver, self).__init__(max_entries)
+        self.cache = cache
+        self.published = []
+
+    def lookup(self, sequent: Sequent, budget):
+        if (result := super(SharedProver, self).lookup(sequent, budget)) is not None:
+            return result
+        status = self.cache.get(digest(sequent))
+        if status == PROVED_STATUS:
+            result = Derivation(sequent, CACHED)
+        elif status == REFUTED_STATUS:
+            result = REFUTED
+        else:
+            return None
+        self.store(sequent, result)
+        return result if isinstance(result, Derivation) else False
+
+    def store(self, sequent: Sequent, entry):
+        if isinstance(entry, Derivation):
+            if entry.rule != CACHED and not isinstance(self.table.get(sequent), Derivation):
+                self.cache.put(digest(sequent), PROVED_STATUS)
+                self.published.append(entry)
+        elif entry == REFUTED and self.table.get(sequent) != REFUTED:
+            self.cache.put(digest(sequent), REFUTED_STATUS)
+        super(SharedProver, self).store(sequent, entry)
+
+    def take_published(self):
+        """
+        Rows of the derivations published since the last call, for the coordinator.
+        """
+        rows = flatten(*self.published)
+        self.published = []
+        return rows
+
+
+class Abandoned(Exception):
+    pass
+
+
+class Split(Exception):
+    pass
+
+
+# Worker process state, set by initialize.
+PROVER = None
+INDEX = None
+
+
+def initialize(name, slots, workers, lock, counter, max_entries):
+    global PROVER, INDEX
+    with counter.get_lock():
+        INDEX = counter.value
+        counter.value += 1
+    PROVER = SharedProver(SharedCache(slots, workers, lock, name), max_entries)
+
+
+def flatten(*derivations: Derivation):
+    """
+    Derivations as rows (sequent, rule, premise row indices) with premises first, each sequent once, which pickles
+    without recursing along the height of the derivations. The row of a single derivation comes last.
+    """
+    rows, index, stack = [], {}, list(derivations)
+    while stack:
+        current = stack[-1]
+        if current.sequent in index:
+            stack.pop()
+            continue
+        if waiting := [premise for premise in current.premises if premise.sequent not in index]:
+            stack.extend(waiting)
+            continue
+        stack.pop()
+        index[current.sequent] = len(rows)
+        rows.append((current.sequent, current.rule, [index[premise.sequent] for premise in current.premises]))
+    return rows
+
+
+def unflatten(rows):
+    derivations = []
+    for sequent, rule, premises in rows:
+        derivations.append(Derivation(sequent, rule, [derivations[i] for i in premises]))
+    return derivations
+
+
+def solve(sequent: Sequent, budget, generation, limit):
+    """
+    Searches one task in a worker process. Returns (status, failure or None, rows of the derivations published
+    meanwhile): these are sent whatever the status, so that every sequent the cache calls proved reaches the
+    coordinator, and the work of a task that is split is kept.
+    """
+    status, value = search_task(sequent, budget, generation, limit)
+    return status, value, PROVER.take_published()
+
+
+def search_task(sequent: Sequent, budget, generation, limit):
+    cache = PROVER.cache
+    start = PROVER.explored
+
+    def hook(prover):
+        cache.report(INDEX, prover.explored, prover.depth)
+        if cache.generation != generation:
+            raise Abandoned()
+        if prover.explored - start > limit:
+            raise Split()
+
+    if cache.generation != generation:
+        return ABANDONED, None
+    try:
+        derivation = PROVER.search(sequent, budget, hook)
+    except Abandoned:
+        return ABANDONED, None
+    except Split:
+        return SPLIT, None
+    finally:
+        cache.report(INDEX, PROVER.explored, PROVER.depth)
+    if derivation is None:
+        return FAILED, PROVER.table.get(sequent, budget)
+    return PROVED, None
+
+
+def resolve(sequent: Sequent, derivations):
+    """
+    Derivation of sequent with every CACHED placeholder replaced by the derivation of its sequent.
+    """
+    done, stack = {}, [sequent]
+    while stack:
+        current = stack[-1]
+        if current in done:
+            stack.pop()
+            continue
+        derivation = derivations[current]
+        if waiting := [premise.sequent for premise in derivation.premises if premise.sequent not in done]:
+            stack.extend(waiting)
+            continue
+        stack.pop()
+        done[current] = Derivation(current, derivation.rule, [done[premise.sequent] for premise in derivation.premises])
+    return done[sequent]
+
+
+class ParallelProver:
+    """
+    Runs the prover over a process pool. The coordinator applies rules itself until the open premises are enough to
+    keep every worker busy, then hands each out as a task; workers pull tasks from the pool's shared queue, and a task
+    that grows past task_limit is handed back, split further and requeued. All rules are invertible, so the root is
+    proved once every task is and fails as soon as any task fails.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        max_rounds=MAX_ROUNDS,
+        max_entries=MAX_ENTRIES,
+        task_limit=TASK_LIMIT,
+        cache_slots=CACHE_SLOTS,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_rounds = max_rounds
+        self.max_entries = max_entries
+        self.task_limit = task_limit
+        self.cache_slots = cache_slots
+        # Derivations by sequent from the rows of every finished task, and the rules the coordinator applied itself in
+        # the current round (with placeholder premises).
+        self.derivations = {}
+        self.steps = {}
+        self.explored = 0
+        self.depth = 0
+
+    def split(self, items, target):
+        """
+        Expands (sequent, budget) items breadth first into at least target open premises where possible.
+        Returns the open premises with their budgets, or the failure if a sequent cannot be expanded within its budget.
+        """
+        queue = collections.deque(items)
+        for _ in range(SPLIT_LIMIT):
+            if not queue or len(queue) >= target:
+                break
+            sequent, budget = queue.popleft()
+            if sequent in self.derivations or sequent in self.steps:
+                continue
+            if (expansion := expand(sequent)) is None:
+                return REFUTED
+            rule, premises = expansion
+            if is_gamma(rule) and budget == 0:
+                return 0
+            self.steps[sequent] = Derivation(sequent, rule, [Derivation(premise, CACHED) for premise in premises])
+            queue.extend((premise, budget - is_gamma(rule)) for premise in premises)
+        leaves = {}
+        for sequent, budget in queue:
+            if sequent not in self.derivations and sequent not in self.steps:
+                leaves[sequent] = max(budget, leaves.get(sequent, 0))
+        return leaves
+
+    def search(self, sequent: Sequent, budget, executor, cache, progress):
+        """
+        One iterative deepening round. Returns True if sequent was proved, otherwise the failure.
+        """
+        cache.generation += 1
+        generation = cache.generation
+        futures = {}
+        finished = 0
+        last_report = time.perf_counter()
+
+        def submit(leaves, limit):
+            if not isinstance(leaves, dict):
+                return leaves
+            for leaf, leaf_budget in leaves.items():
+                future = executor.submit(solve, leaf, leaf_budget, generation, limit)
+                futures[future] = (leaf, leaf_budget, limit)
+            return None
+
+        try:
+            if (
+                failure := submit(self.split([(sequent, budget)], self.workers * SPLIT_FACTOR), self.task_limit)
+            ) is not None:
+                return failure
+            while futures:
+                done, _ = wait(futures, timeout=REPORT_INTERVAL, return_when=FIRST_COMPLETED)
+                if (now := time.perf_counter()) - last_report >= REPORT_INTERVAL:
+                    self.report(budget, len(futures), now - last_report, cache)
+                    last_report = now
+                if progress is not None:
+                    progress((budget + finished / (finished + len(futures))) / (self.max_rounds + 1))
+                for future in done:
+                    leaf, leaf_budget, limit = futures.pop(future)
+                    finished += 1
+                    status, value, rows = future.result()
+                    self.receive(rows)
+                    if status == FAILED:
+                        return value
+                    elif status == SPLIT:
+                        if (failure := submit(self.split([(leaf, leaf_budget)], self.workers), 2 * limit)) is not None:
+                            return failure
+            return True
+        finally:
+            for future in futures:
+                future.cancel()
+            # Abandon the tasks still running, and receive what they proved: the cache already says so.
+            cache.generation += 1
+            for future in wait(futures).done:
+                if not future.cancelled() and future.exception() is None:
+                    self.receive(future.result()[2])
+            self.report(budget, 0, time.perf_counter() - last_report, cache)
+
+    def receive(self, rows):
+        """
+        Keeps the derivations a worker proved and published to the cache.
+        """
+        for derivation in unflatten(rows):
+            if derivation.rule != CACHED and derivation.sequent not in self.derivations:
+                self.derivations[derivation.sequent] = derivation
+
+    def report(self, budget, pending, elapsed, cache):
+        explored, self.explored = self.explored, cache.explored()
+        self.depth = max(self.depth, cache.depth())
+        logger.info(
+            f"Round {budget}: {self.explored} sequents explored ({(self.explored - explored) / max(elapsed, 1e-9):.0f}/s), "
+            f"depth {self.depth}, {pending} tasks pending"
+        )
+
+    def prove(self, sequent: Sequent, progress=None):
+        """
+        Iterative deepening over the number of ∀L/∃R rounds, as Prover.prove. progress, if given, is called with the
+        fraction of rounds done and may raise to cancel the search.
+        """
+        context = multiprocessing.get_context("spawn")
+        lock = context.Lock()
+        cache = SharedCache(self.cache_slots, self.workers, lock)
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=initialize,
+            initargs=(cache.name, self.cache_slots, self.workers, lock, context.Value("i", 0), self.max_entries),
+        )
+        try:
+            for budget in range(self.max_rounds + 1):
+                self.steps = {}
+                result = self.search(sequent, budget, executor, cache, progress)
+                if result is True:
+                    return resolve(sequent, collections.ChainMap(self.derivations, self.steps))
+                if result == REFUTED:
+                    return None
+            return None
+        finally:
+            executor.shutdown(wait=True)
+            cache.close(unlink=True)
+
+
+def parallel_prove(sequent: Sequent, workers=None, max_rounds=MAX_ROUNDS, progress=None):
+    return ParallelProver(workers, max_rounds).prove(sequent, progress)
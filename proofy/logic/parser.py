@@ -0,0 +1,272 @@
+import re
+
+from logic.formula import And, Bottom, Exists, ForAll, Func, Implies, Meta, Not, Or, Predicate, Sequent, Top, Var
+from logic.symbols import MetalogicSymbols, PropositionalLogicSymbols, QuantifierSymbols
+
+ALIASES = {
+    "~": PropositionalLogicSymbols.NOT.value,
+    "!": PropositionalLogicSymbols.NOT.value,
+    "&": PropositionalLogicSymbols.AND.value,
+    "/\\": PropositionalLogicSymbols.AND.value,
+    "\\/": PropositionalLogicSymbols.OR.value,
+    "|": PropositionalLogicSymbols.OR.value,
+    "->": PropositionalLogicSymbols.IMPLIES.value,
+    "=>": PropositionalLogicSymbols.IMPLIES.value,
+    "|-": MetalogicSymbols.ENTAILS_SYNTACTICALLY.value,
+    "|=": MetalogicSymbols.ENTAILS_SEMANTICALLY.value,
+}
+SYMBOLS = [e.value for e in (*PropositionalLogicSymbols, *QuantifierSymbols, *MetalogicSymbols)] + [
+    "(",
+    ")",
+    ",",
+    ".",
+    ":=",
+]
+TOKEN = re.compile(
+    r"\s*(?:(?P<symbol>{})|(?P<meta>\?[^\W\d]\w*'*)|(?P<name>[^\W\d]\w*'*)|(?P<error>\S))".format(
+        "|".join(re.escape(s) for s in sorted([*ALIASES, *SYMBOLS], key=len, reverse=True))
+    )
+)
+TURNSTILES = {e.value for e in MetalogicSymbols}
+# Binary operators by symbol, as (precedence, class); → is right associative, ∨ and ∧ left associative.
+BINARY = {
+    PropositionalLogicSymbols.IMPLIES.value: (1, Implies),
+    PropositionalLogicSymbols.OR.value: (2, Or),
+    PropositionalLogicSymbols.AND.value: (3, And),
+}
+NOT = "not"
+QUANTIFIER = "quantifier"
+DOT = "dot"
+
+
+class FormulaSyntaxError(ValueError):
+    def __init__(self, message, text, position):
+        super(FormulaSyntaxError, self).__init__(
+            f"{message} at position {position}: {text[:position]}⏵{text[position:]}"
+        )
+        self.text = text
+        self.position = position
+
+
+def tokenize(text: str):
+    tokens = []
+    for match in TOKEN.finditer(text):
+        if match.group("error") is not None:
+            raise FormulaSyntaxError("Unexpected character", text, match.start("error"))
+        if (symbol := match.group("symbol")) is not None:
+            tokens.append((ALIASES.get(symbol, symbol), None, match.start("symbol")))
+        elif (meta := match.group("meta")) is not None:
+            tokens.append(("meta", meta[1:], match.start("meta")))
+        elif (name := match.group("name")) is not None:
+            tokens.append(("name", name, match.start("name")))
+    tokens.append(("end", None, len(text)))
+    return tokens
+
+
+class Parser:
+    """
+    Operator precedence parser, loosest binding first: → (right associative), ∨, ∧, then ¬ and quantifiers.
+    A quantifier scopes over the following unary formula, or over everything up to the closing parenthesis when its
+    variable is followed by a dot. Pending operators and groups are kept on a stack instead of the call stack, so
+    deeply nested formulas and terms parse too.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    @property
+    def kind(self):
+        return self.tokens[self.index][0]
+
+    def error(self, message):
+        return FormulaSyntaxError(message, self.text, self.tokens[self.index][2])
+
+    def accept(self, kind):
+        if self.kind == kind:
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, kind):
+        if not self.accept(kind):
+            raise self.error(f"Expected {kind!r}")
+        return self.tokens[self.index - 1]
+
+    def end(self):
+        if self.kind != "end":
+            raise self.error("Unexpected trailing input")
+
+    def formulas(self):
+        if self.kind in TURNSTILES or self.kind == "end":
+            return []
+        result = [self.formula()]
+        while self.accept(","):
+            result.append(self.formula())
+        return result
+
+    def sequent(self):
+        antecedent = self.formulas()
+        if self.kind not in TURNSTILES:
+            raise self.error("Expected a turnstile")
+        self.index += 1
+        return Sequent(antecedent, self.formulas())
+
+    def formula(self):
+        # Pending operators, innermost last: (NOT,), (QUANTIFIER, class, variable), (DOT, class, variable) for a
+        # quantifier that scopes up to the end of the group, ("(",) and (BINARY, precedence, class, left operand).
+        stack = []
+        while True:
+            while True:
+                if self.accept(PropositionalLogicSymbols.NOT.value):
+                    stack.append((NOT,))
+                elif self.accept("("):
+                    stack.append(("(",))
+                elif quantifier := self.quantifier():
+                    variable = Var(self.expect("name")[1])
+                    stack.append((DOT if self.accept(".") else QUANTIFIER, quantifier, variable))
+                else:
+                    break
+            operand = self.atom()
+            while True:
+                operand = unary(stack, operand)
+                if (binary := BINARY.get(self.kind)) is not None:
+                    precedence, operator = binary
+                    while stack and stack[-1][0] == BINARY and (
+                        stack[-1][1] > precedence or stack[-1][1] == precedence and operator is not Implies
+                    ):
+                        operand = reduce(stack.pop(), operand)
+                    self.index += 1
+                    stack.append((BINARY, precedence, operator, operand))
+                    break
+                # The group ends here: everything up to its parenthesis applies.
+                while stack and stack[-1][0] in (BINARY, DOT):
+                    operand = reduce(stack.pop(), operand)
+                    operand = unary(stack, operand)
+                if not stack:
+                    return operand
+                self.expect(")")
+                stack.pop()
+
+    def quantifier(self):
+        for symbol, quantifier in ((QuantifierSymbols.FORALL, ForAll), (QuantifierSymbols.EXISTS, Exists)):
+            if self.accept(symbol.value):
+                return quantifier
+        return None
+
+    def atom(self):
+        if self.accept(PropositionalLogicSymbols.TRUE.value):
+            return Top()
+        if self.accept(PropositionalLogicSymbols.FALSE.value):
+            return Bottom()
+        if self.kind == "meta":
+            return Meta(self.expect("meta")[1])
+        if self.kind != "name":
+            raise self.error("Expected a formula")
+        name = self.expect("name")[1]
+        return Predicate(name, self.arguments())
+
+    def arguments(self):
+        if not self.accept("("):
+            return ()
+        result = [self.term()]
+        while self.accept(","):
+            result.append(self.term())
+        self.expect(")")
+        return result
+
+    def term(self):
+        # The functions whose arguments are being read, innermost last, with the arguments read so far.
+        stack = []
+        while True:
+            if self.kind == "meta":
+                result = Meta(self.expect("meta")[1])
+            else:
+                name = self.expect("name")[1]
+                if self.accept("("):
+                    stack.append((name, []))
+                    continue
+                result = Var(name)
+            while stack:
+                stack[-1][1].append(result)
+                if self.accept(","):
+                    break
+                self.expect(")")
+                name, arguments = stack.pop()
+                result = Func(name, arguments)
+            else:
+                return result
+
+
+def unary(stack, operand):
+    """
+    Applies the negations and undotted quantifiers on top of stack, which bind tighter than any binary operator.
+    """
+    while stack and stack[-1][0] in (NOT, QUANTIFIER):
+        operand = reduce(stack.pop(), operand)
+    return operand
+
+
+def reduce(pending, operand):
+    kind = pending[0]
+    if kind == NOT:
+        return Not(operand)
+    if kind == BINARY:
+        return pending[2](pending[3], operand)
+    return pending[1](pending[2], operand)
+
+
+def parse_formula(text: str):
+    parser = Parser(text)
+    result = parser.formula()
+    parser.end()
+    return result
+
+
+def parse_sequent(text: str):
+    parser = Parser(text)
+    result = parser.sequent()
+    parser.end()
+    return result
+
+
+def parse_substitution(text: str):
+    """
+    Parses "?A := formula, x := term, ..." into a list of (Meta or Var, replacement) pairs.
+    """
+    parser = Parser(text)
+    result = []
+    while True:
+        if parser.kind == "meta":
+            key = Meta(parser.expect("meta")[1])
+            parser.expect(":=")
+            result.append((key, parser.formula()))
+        else:
+            key = Var(parser.expect("name")[1])
+            parser.expect(":=")
+            result.append((key, parser.term()))
+        if not parser.accept(","):
+            break
+    parser.end()
+    return result
+
+
+def turnstile(text: str):
+    """
+    The turnstile text uses, or None if it is a single formula.
+    """
+    return next((kind for kind, _, _ in tokenize(text) if kind in TURNSTILES), None)
+
+
+def parse(text: str):
+    """
+    Parse a formula, or a sequent if the text contains a turnstile.
+    """
+    parser = Parser(text)
+    if any(kind in TURNSTILES for kind, _, _ in parser.tokens):
+        result = parser.sequent()
+    else:
+        result = parser.formula()
+    parser.end()
+    return result
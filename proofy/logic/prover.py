@@ -0,0 +1,293 @@
+import collections
+
+import networkx
+
+from logic.formula import (
+    And,
+    Bottom,
+    Exists,
+    ForAll,
+    Func,
+    Implies,
+    Not,
+    Or,
+    Sequent,
+    Top,
+    Var,
+    free_variables,
+    fresh_variable,
+    instantiate,
+    subterms,
+)
+
+MAX_ENTRIES = 1 << 20
+MAX_ROUNDS = 8
+PROGRESS_INTERVAL = 1 << 10
+# Failure that no larger instantiation budget can turn into a proof.
+REFUTED = float("inf")
+
+
+class Derivation:
+    __slots__ = ("sequent", "rule", "premises")
+
+    def __init__(self, sequent: Sequent, rule: str, premises=()):
+        self.sequent = sequent
+        self.rule = rule
+        self.premises = tuple(premises)
+
+    def __repr__(self):
+        return f"Derivation({str(self.sequent)!r}, {self.rule!r})"
+
+
+def replace(formulas: frozenset, old, *new):
+    return formulas.difference([old]).union(new)
+
+
+def universe(sequent: Sequent):
+    """
+    Terms available to the ∀L and ∃R rules: every term of the sequent built only from its free variables.
+    """
+    free = free_variables(sequent)
+    if not free:
+        return [fresh_variable(free, "c")]
+    return [node for node in subterms(sequent) if isinstance(node, (Var, Func)) and free_variables(node) <= free]
+
+
+def decompose(sequent: Sequent, formula, left: bool, variable=None):
+    """
+    Premises of the G3c rule with principal formula on the left (antecedent) or right (succedent) of sequent, as
+    (rule, premises), or None if formula is atomic or only has the ∀L/∃R rule. ∃L and ∀R use variable as eigenvariable,
+    by default a fresh one.
+    """
+    antecedent, succedent = sequent.antecedent, sequent.succedent
+    if isinstance(formula, (Exists, ForAll)) and isinstance(formula, Exists) == left:
+        variable = variable or fresh_variable(free_variables(sequent))
+        if left:
+            return "∃L", [Sequent(replace(antecedent, formula, instantiate(formula, variable)), succedent)]
+        return "∀R", [Sequent(antecedent, replace(succedent, formula, instantiate(formula, variable)))]
+    if left:
+        if isinstance(formula, Not):
+            return "¬L", [Sequent(replace(antecedent, formula), succedent | {formula.operand})]
+        if isinstance(formula, And):
+            return "∧L", [Sequent(replace(antecedent, formula, formula.left, formula.right), succedent)]
+        if isinstance(formula, Or):
+            return "∨L", [
+                Sequent(replace(antecedent, formula, formula.left), succedent),
+                Sequent(replace(antecedent, formula, formula.right), succedent),
+            ]
+        if isinstance(formula, Implies):
+            return "→L", [
+                Sequent(replace(antecedent, formula), succedent | {formula.left}),
+                Sequent(replace(antecedent, formula, formula.right), succedent),
+            ]
+        return None
+    if isinstance(formula, Not):
+        return "¬R", [Sequent(antecedent | {formula.operand}, replace(succedent, formula))]
+    if isinstance(formula, Or):
+        return "∨R", [Sequent(antecedent, replace(succedent, formula, formula.left, formula.right))]
+    if isinstance(formula, Implies):
+        return "→R", [Sequent(antecedent | {formula.left}, replace(succedent, formula, formula.right))]
+    if isinstance(formula, And):
+        return "∧R", [
+            Sequent(antecedent, replace(succedent, formula, formula.left)),
+            Sequent(antecedent, replace(succedent, formula, formula.right)),
+        ]
+    return None
+
+
+def axiom(sequent: Sequent):
+    """
+    Name of the axiom sequent is an instance of, or None.
+    """
+    if Top() in sequent.succedent:
+        return "R⊤"
+    if Bottom() in sequent.antecedent:
+        return "L⊥"
+    if not sequent.antecedent.isdisjoint(sequent.succedent):
+        return "Ax"
+    return None
+
+
+def principal(formulas, kinds):
+    """
+    The formula of kinds among formulas that comes first by its text, or None. Iterating the frozenset would follow the
+    hashes, which differ between processes, so the search and its cost would too.
+    """
+    return min((formula for formula in formulas if isinstance(formula, kinds)), key=str, default=None)
+
+
+def closing(sequent: Sequent, formula, left: bool):
+    """
+    The number of premises of the branching rule on formula (∨L, →L or ∧R) that are axioms at once, when sequent
+    itself is not one.
+    """
+    if isinstance(formula, Or):
+        added = [(formula.left, True), (formula.right, True)]
+    elif isinstance(formula, Implies):
+        added = [(formula.left, False), (formula.right, True)]
+    else:
+        added = [(formula.left, False), (formula.right, False)]
+    # isinstance rather than Top() and Bottom(), which build a node whenever none is alive.
+    return sum(
+        (part in sequent.succedent or isinstance(part, Bottom))
+        if to_left
+        else (part in sequent.antecedent or isinstance(part, Top))
+        for part, to_left in added
+    )
+
+
+def expand(sequent: Sequent):
+    """
+    Chooses the rule to apply backwards to sequent in G3c, returning (rule, premises), or None if no rule applies.
+    Every rule is invertible, so the choice never needs to be revisited; ∀L and ∃R keep their principal formula and are
+    applied together to every available term, so the only bounded resource is the number of such rounds.
+    """
+    if (rule := axiom(sequent)) is not None:
+        return rule, []
+    antecedent, succedent = sequent.antecedent, sequent.succedent
+    # Rules with a single premise first, then the branching ones.
+    if (formula := principal(antecedent, (Not, And, Exists))) is not None:
+        return decompose(sequent, formula, True)
+    if (formula := principal(succedent, (Not, Or, Implies, ForAll))) is not None:
+        return decompose(sequent, formula, False)
+    branching = [(formula, True) for formula in antecedent if isinstance(formula, (Or, Implies))]
+    branching.extend((formula, False) for formula in succedent if isinstance(formula, And))
+    if branching:
+        # The most premises that are axioms at once, then left rules before ∧R, then the text.
+        formula, left = min(branching, key=lambda item: (-closing(sequent, *item), not item[1], str(item[0])))
+        return decompose(sequent, formula, left)
+    terms = universe(sequent)
+    left = {instantiate(f, t) for f in antecedent if isinstance(f, ForAll) for t in terms} - antecedent
+    right = {instantiate(f, t) for f in succedent if isinstance(f, Exists) for t in terms} - succedent
+    if left or right:
+        rule = ", ".join(name for name, added in (("∀L", left), ("∃R", right)) if added)
+        return rule, [Sequent(antecedent | left, succedent | right)]
+    return None
+
+
+def is_gamma(rule: str):
+    return "∀L" in rule or "∃R" in rule
+
+
+class Prover:
+    """
+    Backward proof search with a transposition table keyed on the interned sequent: a sequent that recurs anywhere in
+    the search is proved (or refuted within the current budget) once. The table is an LRU bounded to max_entries;
+    evicted entries are simply searched again. Iterative deepening raises the number of ∀L/∃R rounds allowed per
+    branch until the root is proved, refuted outright, or max_rounds is exhausted.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_rounds=MAX_ROUNDS):
+        self.max_entries = max_entries
+        self.max_rounds = max_rounds
+        self.table = collections.OrderedDict()
+        self.explored = 0
+        self.hits = 0
+        self.depth = 0
+
+    def lookup(self, sequent: Sequent, budget):
+        """
+        Returns a Derivation, False if the sequent is known to fail within budget, or None if the search must continue.
+        """
+        if (entry := self.table.get(sequent)) is None:
+            return None
+        if isinstance(entry, Derivation) or entry >= budget:
+            self.table.move_to_end(sequent)
+            self.hits += 1
+            return entry if isinstance(entry, Derivation) else False
+        return None
+
+    def store(self, sequent: Sequent, entry):
+        self.table[sequent] = entry
+        self.table.move_to_end(sequent)
+        while len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+
+    def enter(self, sequent: Sequent, budget, stack, hook):
+        """
+        Pushes the frame [sequent, remaining budget, rule, premises, derivations of the premises proved so far], or
+        returns the failure to record if sequent cannot be expanded within budget.
+        """
+        self.explored += 1
+        if hook is not None and self.explored % PROGRESS_INTERVAL == 0:
+            hook(self)
+        if (expansion := expand(sequent)) is None:
+            self.store(sequent, REFUTED)
+            return REFUTED
+        rule, premises = expansion
+        if is_gamma(rule) and budget == 0:
+            self.store(sequent, 0)
+            return 0
+        stack.append([sequent, budget - is_gamma(rule), rule, premises, []])
+        self.depth = max(self.depth, len(stack))
+        return None
+
+    def search(self, sequent: Sequent, budget, hook=None):
+        """
+        Depth first search within budget ∀L/∃R rounds per branch, using an explicit stack so deep formulas do not
+        exhaust the interpreter stack. Returns a Derivation or None. hook, if given, is called with the prover every
+        PROGRESS_INTERVAL sequents and may raise to abort the search.
+        """
+        if (cached := self.lookup(sequent, budget)) is not None:
+            return cached or None
+        stack = []
+        failure = self.enter(sequent, budget, stack, hook)
+        while failure is None:
+            sequent, budget, rule, premises, proved = stack[-1]
+            if len(proved) == len(premises):
+                stack.pop()
+                derivation = Derivation(sequent, rule, proved)
+                self.store(sequent, derivation)
+                if not stack:
+                    return derivation
+                stack[-1][4].append(derivation)
+            elif (cached := self.lookup(premises[len(proved)], budget)) is None:
+                failure = self.enter(premises[len(proved)], budget, stack, hook)
+            elif cached:
+                proved.append(cached)
+            else:
+                failure = self.table[premises[len(proved)]]
+        # Every rule is invertible, so a failed premise fails every sequent below it on the stack.
+        while stack:
+            sequent, budget, rule, premises, proved = stack.pop()
+            failure = failure if failure == REFUTED else failure + is_gamma(rule)
+            self.store(sequent, failure)
+        return None
+
+    def prove(self, sequent: Sequent, progress=None):
+        """
+        Iterative deepening over the number of ∀L/∃R rounds. progress, if given, is called with the fraction of rounds
+        done and may raise to abort the search.
+        """
+        for budget in range(self.max_rounds + 1):
+            hook = None if progress is None else lambda prover: progress(budget / (self.max_rounds + 1))
+            if (derivation := self.search(sequent, budget, hook)) is not None:
+                return derivation
+            if self.table.get(sequent) == REFUTED:
+                return None
+        return None
+
+
+def prove(sequent: Sequent, max_rounds=MAX_ROUNDS, max_entries=MAX_ENTRIES, progress=None):
+    return Prover(max_entries, max_rounds).prove(sequent, progress)
+
+
+def derivation_graph(derivation: Derivation) -> networkx.DiGraph:
+    """
+    Derivation as a graph from premises to conclusions, with one node per distinct sequent so that shared
+    sub-derivations appear once. Node ids are the printed sequents, so the graph can be saved as JSON.
+    """
+    graph = networkx.DiGraph()
+    seen = set()
+    stack = [derivation]
+    while stack:
+        current = stack.pop()
+        if current.sequent in seen:
+            continue
+        seen.add(current.sequent)
+        conclusion = str(current.sequent)
+        graph.add_node(conclusion, rule=current.rule)
+        for premise in current.premises:
+            graph.add_edge(str(premise.sequent), conclusion, rule=current.rule)
+            stack.append(premise)
+    return graph
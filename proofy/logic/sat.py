@@ -0,0 +1,210 @@
+import heapq
+
+RESTART_BASE = 100
+ACTIVITY_DECAY = 0.95
+RESCALE_LIMIT = 1e100
+
+
+def luby(i):
+    """
+    i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class Solver:
+    """
+    CDCL SAT solver: two watched literals, first UIP clause learning with non-chronological backjumping, VSIDS
+    decisions with phase saving and Luby restarts. Variables are 1..count and literals are ±variable, as in DIMACS.
+    """
+
+    def __init__(self, count: int, clauses):
+        self.count = count
+        self.value = [0] * (count + 1)
+        self.level = [0] * (count + 1)
+        self.reason = [None] * (count + 1)
+        self.phase = [-1] * (count + 1)
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+        self.heap = [(0.0, v) for v in range(1, count + 1)]
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.clauses = []
+        self.watches = {}
+        self.conflicts = 0
+        self.ok = all(self.add(clause) for clause in clauses)
+
+    def literal_value(self, literal):
+        value = self.value[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add(self, clause):
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            return True
+        if not clause:
+            return False
+        if len(clause) == 1:
+            value = self.literal_value(clause[0])
+            if value == 0:
+                self.assign(clause[0], None)
+            return value >= 0
+        self.attach(clause)
+        return True
+
+    def attach(self, clause):
+        self.clauses.append(clause)
+        self.watches.setdefault(-clause[0], []).append(clause)
+        self.watches.setdefault(-clause[1], []).append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.value[variable] = 1 if literal > 0 else -1
+        self.level[variable] = len(self.limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Unit propagation of the trail from head. Watch lists are keyed by the literal whose truth makes a watcher
+        false. Returns a conflicting clause or None.
+        """
+        while self.head < len(self.trail):
+            literal = self.trail[self.head]
+            self.head += 1
+            watchers = self.watches.get(literal, [])
+            kept = []
+            for i, clause in enumerate(watchers):
+                if clause[0] == -literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.literal_value(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+                for j in range(2, len(clause)):
+                    if self.literal_value(clause[j]) != -1:
+                        clause[1], clause[j] = clause[j], clause[1]
+                        self.watches.setdefault(-clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.literal_value(clause[0]) == -1:
+                        kept.extend(watchers[i + 1 :])
+                        self.watches[literal] = kept
+                        return clause
+                    self.assign(clause[0], clause)
+            self.watches[literal] = kept
+        return None
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > RESCALE_LIMIT:
+            self.activity = [a / RESCALE_LIMIT for a in self.activity]
+            self.increment /= RESCALE_LIMIT
+            self.heap = [(-self.activity[v], v) for v in range(1, self.count + 1) if self.value[v] == 0]
+            heapq.heapify(self.heap)
+        elif self.value[variable] == 0:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def analyze(self, conflict):
+        """
+        First UIP learnt clause (asserting literal first) and the level to backjump to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable in seen or self.level[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.level[variable] == level:
+                    pending += 1
+                else:
+                    learnt.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(literal)]
+        learnt[0] = -literal
+        self.increment /= ACTIVITY_DECAY
+        if len(learnt) == 1:
+            return learnt, 0
+        # The literal of the highest remaining level becomes the second watch.
+        best = max(range(1, len(learnt)), key=lambda i: self.level[abs(learnt[i])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def backjump(self, level):
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level] :]:
+            variable = abs(literal)
+            self.phase[variable] = self.value[variable]
+            self.value[variable] = 0
+            self.reason[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[self.limits[level] :]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if self.value[variable] == 0:
+                self.limits.append(len(self.trail))
+                self.assign(variable * self.phase[variable], None)
+                return True
+        return False
+
+    def solve(self, progress=None):
+        """
+        Returns a satisfying assignment as a list of booleans indexed by variable (index 0 unused), or None if the
+        clauses are unsatisfiable. progress, if given, is called with the conflict count at every restart.
+        """
+        if not self.ok:
+            return None
+        restarts = 1
+        budget = RESTART_BASE * luby(restarts)
+        while True:
+            if (conflict := self.propagate()) is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    self.ok = False
+                    return None
+                learnt, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.attach(learnt)
+                    self.assign(learnt[0], learnt)
+                budget -= 1
+            elif budget <= 0:
+                restarts += 1
+                budget = RESTART_BASE * luby(restarts)
+                self.backjump(0)
+                if progress is not None:
+                    progress(self.conflicts)
+            elif not self.decide():
+                return [value > 0 for value in self.value]
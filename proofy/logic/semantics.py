@@ -0,0 +1,220 @@
+import numpy
+
+from logic.formula import (
+    And,
+    Bottom,
+    Formula,
+    Implies,
+    Meta,
+    Not,
+    Or,
+    Predicate,
+    Quantifier,
+    Sequent,
+    Term,
+    Top,
+    subterms,
+)
+from logic.parser import parse
+from logic.sat import Solver
+
+# Above this many atoms a truth table (2**atoms bits per subformula) is replaced by the SAT solver.
+TRUTH_TABLE_LIMIT = 24
+# Memory kept for truth tables of subformulas shared between the sequents of one batch.
+MEMO_BYTES = 1 << 28
+ONES = numpy.uint64(0xFFFFFFFFFFFFFFFF)
+# Bit patterns of the first six variables within a 64 bit word: bit r is set if bit i of the row number r is.
+PATTERNS = [sum(1 << r for r in range(64) if r >> i & 1) for i in range(6)]
+
+
+def as_sequent(formula):
+    return formula if isinstance(formula, Sequent) else Sequent([], [formula])
+
+
+def atoms(sequent: Sequent):
+    """
+    Atomic formulas of sequent in a fixed order, counting metavariables as atoms (a schema valid this way has only
+    valid instances). Quantified formulas have no truth table.
+    """
+    result = set()
+    for node in subterms(sequent, skip=lambda node: isinstance(node, Term)):
+        if isinstance(node, Quantifier):
+            raise ValueError("Only propositional formulas can be checked semantically!")
+        if isinstance(node, (Predicate, Meta)):
+            result.add(node)
+    return tuple(sorted(result, key=str))
+
+
+class TruthTable:
+    """
+    Truth tables over a fixed tuple of atoms, packed 64 rows to a uint64 word so that connectives are whole array
+    bitwise operations. Row r assigns atom i the value of bit i of r.
+    """
+
+    def __init__(self, variables):
+        self.variables = variables
+        self.rows = 1 << len(variables)
+        self.words = max(1, self.rows >> 6)
+        self.memo = {}
+        self.memo_bytes = 0
+        index = numpy.arange(self.words, dtype=numpy.uint64)
+        for i, atom in enumerate(variables):
+            if i < 6:
+                self.memo[atom] = numpy.full(self.words, PATTERNS[i], dtype=numpy.uint64)
+            else:
+                self.memo[atom] = numpy.where(index >> numpy.uint64(i - 6) & numpy.uint64(1), ONES, numpy.uint64(0))
+        # Rows past 2**atoms in the single word of a small table.
+        self.valid = numpy.full(self.words, ONES if self.rows >= 64 else (1 << self.rows) - 1, dtype=numpy.uint64)
+
+    def evaluate(self, formulas):
+        """
+        Truth tables of formulas. Subformulas are computed once; intermediates are released after their last use
+        unless they fit in the memo shared with later calls.
+        """
+        order = subterms(Sequent(formulas), skip=lambda node: node in self.memo)[:-1]
+        # Each requested formula holds a use that is never released.
+        uses = {formula: 1 for formula in formulas}
+        for node in order:
+            for child in node.args:
+                if isinstance(child, Formula):
+                    uses[child] = uses.get(child, 0) + 1
+        tables = {}
+
+        def table(node):
+            return self.memo[node] if node in self.memo else tables[node]
+
+        for node in order:
+            if isinstance(node, Top):
+                result = numpy.full(self.words, ONES)
+            elif isinstance(node, Bottom):
+                result = numpy.zeros(self.words, dtype=numpy.uint64)
+            elif isinstance(node, Not):
+                result = numpy.invert(table(node.operand))
+            elif isinstance(node, And):
+                result = numpy.bitwise_and(table(node.left), table(node.right))
+            elif isinstance(node, Or):
+                result = numpy.bitwise_or(table(node.left), table(node.right))
+            elif isinstance(node, Implies):
+                result = numpy.bitwise_or(numpy.invert(table(node.left)), table(node.right))
+            else:
+                raise ValueError(f"Unexpected formula {node!r}!")
+            if self.memo_bytes + result.nbytes <= MEMO_BYTES:
+                self.memo[node] = result
+                self.memo_bytes += result.nbytes
+            else:
+                tables[node] = result
+            for child in node.args:
+                if child in tables:
+                    uses[child] -= 1
+                    if uses[child] == 0:
+                        del tables[child]
+        return [table(formula) for formula in formulas]
+
+    def counterexample(self, sequent: Sequent):
+        """
+        Valuation making every antecedent true and every succedent false, or None if sequent is valid.
+        """
+        antecedent, succedent = list(sequent.antecedent), list(sequent.succedent)
+        tables = self.evaluate(antecedent + succedent)
+        rows = self.valid.copy()
+        for table in tables[: len(antecedent)]:
+            rows &= table
+        for table in tables[len(antecedent) :]:
+            rows &= ~table
+        if (words := numpy.flatnonzero(rows)).size == 0:
+            return None
+        word = int(rows[words[0]])
+        row = int(words[0]) * 64 + (word & -word).bit_length() - 1
+        return {str(atom): bool(row >> i & 1) for i, atom in enumerate(self.variables)}
+
+
+def tseitin(sequent: Sequent):
+    """
+    Clauses satisfiable exactly by the counterexamples of sequent, with one variable per distinct subformula.
+    Returns (clauses, variable count, atom variables).
+    """
+    variables = {}
+    clauses = []
+    for node in subterms(sequent, skip=lambda node: isinstance(node, Term))[:-1]:
+        v = variables[node] = len(variables) + 1
+        if isinstance(node, Top):
+            clauses.append([v])
+        elif isinstance(node, Bottom):
+            clauses.append([-v])
+        elif isinstance(node, Not):
+            a = variables[node.operand]
+            clauses += [[-v, -a], [v, a]]
+        elif isinstance(node, (And, Or, Implies)):
+            a, b = variables[node.left], variables[node.right]
+            if isinstance(node, Implies):
+                a = -a
+            if isinstance(node, And):
+                clauses += [[-v, a], [-v, b], [v, -a, -b]]
+            else:
+                clauses += [[-v, a, b], [v, -a], [v, -b]]
+        elif isinstance(node, Quantifier):
+            raise ValueError("Only propositional formulas can be checked semantically!")
+    clauses += [[variables[formula]] for formula in sequent.antecedent]
+    clauses += [[-variables[formula]] for formula in sequent.succedent]
+    return clauses, len(variables), {node: v for node, v in variables.items() if isinstance(node, (Predicate, Meta))}
+
+
+def solve_counterexample(sequent: Sequent, progress=None):
+    clauses, count, variables = tseitin(sequent)
+    if (assignment := Solver(count, clauses).solve(progress)) is None:
+        return None
+    return {str(atom): assignment[v] for atom, v in sorted(variables.items(), key=lambda item: str(item[0]))}
+
+
+def counterexample(formula, limit=TRUTH_TABLE_LIMIT):
+    """
+    Valuation of the atoms that falsifies formula (⊨ formula) or sequent (Γ ⊨ Δ), or None if it is valid.
+    """
+    return check_all([formula], limit)[0]
+
+
+def is_valid(formula, limit=TRUTH_TABLE_LIMIT):
+    return counterexample(formula, limit) is None
+
+
+def check_all(formulas, limit=TRUTH_TABLE_LIMIT, progress=None):
+    """
+    counterexample for each of formulas. Sequents over the same atoms share one truth table and the tables of their
+    common subformulas. progress, if given, is called with the fraction checked after each group of sequents.
+    """
+    sequents = [as_sequent(formula) for formula in formulas]
+    results = [None] * len(sequents)
+    groups = {}
+    checked = 0
+    for i, sequent in enumerate(sequents):
+        groups.setdefault(atoms(sequent), []).append(i)
+    for variables, indices in groups.items():
+        if len(variables) > limit:
+            for i in indices:
+                results[i] = solve_counterexample(sequents[i])
+        else:
+            table = TruthTable(variables)
+            for i in indices:
+                results[i] = table.counterexample(sequents[i])
+        checked += len(indices)
+        if progress is not None:
+            progress(checked / len(sequents))
+    return results
+
+
+def check_graph(graph, progress=None):
+    """
+    counterexample for every node of graph whose id is a propositional formula or sequent, checked in one batch.
+    """
+    nodes, formulas = [], []
+    for node in graph.nodes:
+        if not isinstance(node, str):
+            continue
+        try:
+            formula = parse(node)
+            atoms(as_sequent(formula))
+        except ValueError:
+            continue
+        nodes.append(node)
+        formulas.append(formula)
+    return dict(zip(nodes, check_all(formulas, progress=progress)))
@@ -0,0 +1,20 @@
+from enum import Enum
+
+
+class PropositionalLogicSymbols(Enum):
+    TRUE = "⊤"
+    FALSE = "⊥"
+    NOT = "¬"
+    AND = "∧"
+    OR = "∨"
+    IMPLIES = "→"
+
+
+class QuantifierSymbols(Enum):
+    FORALL = "∀"
+    EXISTS = "∃"
+
+
+class MetalogicSymbols(Enum):
+    ENTAILS_SYNTACTICALLY = "⊢"
+    ENTAILS_SEMANTICALLY = "⊨"
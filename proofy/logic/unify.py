@@ -0,0 +1,324 @@
+import collections
+
+import networkx
+
+from logic.formula import Meta, Node, Sequent, children, metavariables, substitute, subterms
+from logic.parser import parse
+
+MISSING = object()
+# Suffix of renamed rule metavariables, which the parser cannot produce.
+RENAMED = "#"
+
+
+class Mismatch(Exception):
+    pass
+
+
+class Substitution:
+    """
+    Triangular substitution: a binding may mention other bound metavariables, so binding is O(1) and chains are
+    followed (and compressed) on lookup. Application rebuilds only the nodes that contain metavariables and memoizes
+    every result until the next binding, so unchanged subtrees are shared and applying to many formulas is linear in
+    the size of the results.
+    """
+
+    def __init__(self, bindings=None):
+        self.bindings = dict(bindings or {})
+        self.memo = {}
+        # Changes made by the unification in progress as (metavariable, previous binding), for rolling back.
+        self.trail = None
+
+    def copy(self):
+        return Substitution(self.bindings)
+
+    def set(self, meta: Meta, node):
+        if self.trail is not None:
+            self.trail.append((meta, self.bindings.get(meta, MISSING)))
+        self.bindings[meta] = node
+
+    def walk(self, node):
+        """
+        What node stands for one binding deep, compressing the chain of metavariables that led there.
+        """
+        path = []
+        while isinstance(node, Meta) and (bound := self.bindings.get(node)) is not None:
+            path.append(node)
+            node = bound
+        for meta in path[:-1]:
+            self.set(meta, node)
+        return node
+
+    def bind(self, meta: Meta, node):
+        self.set(meta, node)
+        self.memo.clear()
+
+    def apply(self, node: Node):
+        if not metavariables(node):
+            return node
+        memo = self.memo
+        for current in subterms(node, skip=lambda n: n in memo or not metavariables(n)):
+            if isinstance(current, Meta):
+                value = self.walk(current)
+                memo[current] = current if value is current else self.apply(value)
+            elif isinstance(current, Sequent):
+                memo[current] = Sequent(
+                    [memo.get(f, f) for f in current.antecedent], [memo.get(f, f) for f in current.succedent]
+                )
+            else:
+                memo[current] = type(current)(
+                    *(
+                        tuple(memo.get(a, a) for a in arg) if isinstance(arg, tuple) else memo.get(arg, arg)
+                        for arg in current.args
+                    )
+                )
+        return memo[node]
+
+    def occurs(self, meta: Meta, node):
+        seen, stack = set(), [node]
+        while stack:
+            current = self.walk(stack.pop())
+            if current is meta:
+                return True
+            if current in seen or not metavariables(current):
+                continue
+            seen.add(current)
+            for arg in current.args:
+                if isinstance(arg, Node):
+                    stack.append(arg)
+                elif isinstance(arg, tuple):
+                    stack.extend(arg)
+        return False
+
+    def solve(self, left, right, bindable=None):
+        """
+        Extends the substitution so that left and right become equal, binding only the metavariables in bindable
+        (all if None). On failure every change is rolled back and False returned.
+        """
+        self.trail = []
+        stack = [(left, right)]
+        try:
+            while stack:
+                a, b = stack.pop()
+                a, b = self.walk(a), self.walk(b)
+                if a is b:
+                    continue
+                if isinstance(a, Meta) and (bindable is None or a in bindable) and not self.occurs(a, b):
+                    self.bind(a, b)
+                elif isinstance(b, Meta) and (bindable is None or b in bindable) and not self.occurs(b, a):
+                    self.bind(b, a)
+                elif type(a) is type(b) and not isinstance(a, (Meta, Sequent)) and len(a.args) == len(b.args):
+                    for x, y in zip(a.args, b.args):
+                        if isinstance(x, Node):
+                            stack.append((x, y))
+                        elif isinstance(x, tuple) and len(x) == len(y):
+                            stack.extend(zip(x, y))
+                        elif x != y:
+                            raise Mismatch()
+                else:
+                    raise Mismatch()
+            return True
+        except Mismatch:
+            for meta, previous in reversed(self.trail):
+                if previous is MISSING:
+                    del self.bindings[meta]
+                else:
+                    self.bindings[meta] = previous
+            self.memo.clear()
+            return False
+        finally:
+            self.trail = None
+
+    def unify(self, left: Node, right: Node):
+        return self.solve(left, right)
+
+    def match(self, pattern: Node, node: Node, variables=None):
+        """
+        One way unification binding only variables, by default the metavariables of pattern; any others, such as
+        those of node, are constants.
+        """
+        return self.solve(pattern, node, metavariables(pattern) if variables is None else variables)
+
+
+def unify(left: Node, right: Node, substitution=None):
+    """
+    Most general unifier of left and right extending substitution, or None.
+    """
+    substitution = substitution.copy() if substitution is not None else Substitution()
+    return substitution if substitution.unify(left, right) else None
+
+
+def match(pattern: Node, node: Node, substitution=None, variables=None):
+    substitution = substitution.copy() if substitution is not None else Substitution()
+    return substitution if substitution.match(pattern, node, variables) else None
+
+
+def graph_formulas(graph):
+    """
+    Formulas of the nodes of graph whose ids parse, by node id.
+    """
+    result = {}
+    for node in graph.nodes:
+        if isinstance(node, str):
+            try:
+                result[node] = parse(node)
+            except ValueError:
+                pass
+    return result
+
+
+def substitute_graph(graph, pairs):
+    """
+    Copy of graph with the (Meta or Var, replacement) pairs applied to every node that parses.
+    """
+    return networkx.relabel_nodes(graph, substitution_mapping(graph, pairs))
+
+
+def substitution_mapping(graph, pairs):
+    """
+    The new ids of the nodes of graph that the (Meta or Var, replacement) pairs change. Metavariables are replaced
+    first, then free variables without capture; both passes share their memos across all nodes.
+    """
+    substitution = Substitution({key: value for key, value in pairs if isinstance(key, Meta)})
+    variables = {key: value for key, value in pairs if not isinstance(key, Meta)}
+    memo = {}
+    mapping = {}
+    for node, formula in graph_formulas(graph).items():
+        result = substitution.apply(formula)
+        if variables:
+            result = substitute(result, variables, memo)
+        if result is not formula:
+            mapping[node] = str(result)
+    return mapping
+
+
+def rename_apart(schemas):
+    """
+    schemas with their metavariables renamed to names the parser cannot produce, the renamed metavariables, and the
+    substitution that renames them back.
+    """
+    renaming = Substitution({meta: Meta(f"{meta.name}{RENAMED}") for meta in metavariables(Sequent(schemas))})
+    restoring = Substitution({renamed: meta for meta, renamed in renaming.bindings.items()})
+    return [renaming.apply(schema) for schema in schemas], set(restoring.bindings), restoring
+
+
+def head(node: Node):
+    """
+    Constructor, symbol and arity at the top of node, which any formula it matches has too (unless node is a
+    metavariable).
+    """
+    return type(node), tuple(arg for arg in node.args if isinstance(arg, str)), len(children(node))
+
+
+class FormulaIndex:
+    """
+    Formulas by their head and by each (head, position, child), so a pattern is matched only against the formulas
+    that agree with it at the top and at its most selective child without metavariables.
+    """
+
+    def __init__(self, formulas):
+        self.formulas = list(formulas)
+        self.buckets = collections.defaultdict(list)
+        for formula in self.formulas:
+            key = head(formula)
+            self.buckets[key].append(formula)
+            for position, child in enumerate(children(formula)):
+                self.buckets[key, position, child].append(formula)
+
+    def candidates(self, pattern: Node, variables):
+        if isinstance(pattern, Meta) and pattern in variables:
+            return self.formulas
+        key = head(pattern)
+        buckets = [self.buckets.get(key, [])]
+        for position, child in enumerate(children(pattern)):
+            if metavariables(child).isdisjoint(variables):
+                buckets.append(self.buckets.get((key, position, child), []))
+        return min(buckets, key=len)
+
+
+def premise_cost(premise: Node, variables, bound):
+    """
+    Orders premises by how many formulas matching them may have to be tried once the metavariables in bound are
+    bound: none (it is ground and looked up), those agreeing at a child, those agreeing at the top, or all of them.
+    Fewer unbound metavariables break ties.
+    """
+    unbound = (metavariables(premise) & variables) - bound
+    if not unbound:
+        rank = 0
+    elif isinstance(premise, Meta):
+        rank = 3
+    elif any((metavariables(child) & variables) <= bound for child in children(premise)):
+        rank = 1
+    else:
+        rank = 2
+    return rank, len(unbound)
+
+
+def match_premises(premises, formulas, variables, matches):
+    """
+    Extensions of the substitutions in matches under which every premise is among formulas. The most constrained
+    premise left is matched next; one that the matches so far make ground is looked up, and any other is matched
+    only against the formulas of its index bucket, so the order of premises does not change the cost.
+    """
+    candidates = formulas if isinstance(formulas, (set, frozenset, dict)) else set(formulas)
+    index = None
+    premises = list(premises)
+    bound = set(variables).intersection(*(substitution.bindings for substitution in matches))
+    while premises and matches:
+        premise = min(premises, key=lambda p: premise_cost(p, variables, bound))
+        premises.remove(premise)
+        bound |= metavariables(premise) & variables
+        extended = []
+        for substitution in matches:
+            instance = substitution.apply(premise)
+            if metavariables(instance).isdisjoint(variables):
+                if instance in candidates:
+                    extended.append(substitution)
+                continue
+            if index is None:
+                index = FormulaIndex(candidates)
+            for formula in index.candidates(instance, variables):
+                if (result := match(instance, formula, substitution, variables)) is not None:
+                    extended.append(result)
+        matches = extended
+    return matches
+
+
+def rule_instances(premises, conclusion: Node, formulas):
+    """
+    Instances of the rule premises / conclusion whose premises are all among formulas, as (premises, conclusion).
+    Metavariables of the rule are renamed apart from those of formulas, and any the premises leave unbound keep their
+    names in the conclusion.
+    """
+    (conclusion, *premises), variables, restoring = rename_apart([conclusion, *premises])
+    return [
+        ([substitution.apply(premise) for premise in premises], restoring.apply(substitution.apply(conclusion)))
+        for substitution in match_premises(premises, formulas, variables, [Substitution()])
+    ]
+
+
+def derives(premises, conclusion: Node, formulas, formula: Node):
+    """
+    Whether formula follows from formulas by an instance of the rule premises / conclusion.
+    """
+    (conclusion, *premises), variables, _ = rename_apart([conclusion, *premises])
+    if (substitution := match(conclusion, formula, variables=variables)) is None:
+        return False
+    return bool(match_premises(premises, formulas, variables, [substitution]))
+
+
+def apply_rule(graph, premises, conclusion: Node, rule: str):
+    """
+    Adds every conclusion of the rule that follows from nodes of graph, with edges from its premises labelled rule.
+    Returns the number of conclusions that were not already in the graph.
+    """
+    nodes = {formula: node for node, formula in graph_formulas(graph).items()}
+    added = 0
+    for instance_premises, instance_conclusion in rule_instances(premises, conclusion, nodes):
+        target = nodes.get(instance_conclusion)
+        if target is None:
+            target = nodes[instance_conclusion] = str(instance_conclusion)
+            graph.add_node(target, rule=rule)
+            added += 1
+        for premise in instance_premises:
+            graph.add_edge(nodes[premise], target, rule=rule)
+    return added
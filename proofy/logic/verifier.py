@@ -0,0 +1,248 @@
+import heapq
+
+import networkx
+
+from logic.formula import (
+    And,
+    Bottom,
+    Exists,
+    ForAll,
+    Implies,
+    Meta,
+    Or,
+    Sequent,
+    Top,
+    free_variables,
+    instantiate,
+)
+from logic.parser import parse
+from logic.prover import axiom, decompose
+from logic.semantics import atoms, check_all
+from logic.unify import derives, match
+
+VALID = "valid"
+INVALID = "invalid"
+# A valid step with a premise that is not valid.
+DEPENDS = "depends"
+UNCHECKED = "unchecked"
+# A node without premises or rule, taken as given.
+ASSUMED = "assumed"
+RULES = {
+    "¬L": True,
+    "∧L": True,
+    "∨L": True,
+    "→L": True,
+    "∃L": True,
+    "¬R": False,
+    "∧R": False,
+    "∨R": False,
+    "→R": False,
+    "∀R": False,
+}
+GAMMA_RULES = {"∀L", "∃R", "∀L, ∃R"}
+TERM = Meta("term#")
+
+
+def sequent_formula(node):
+    """
+    ⋀Γ → ⋁Δ for a sequent, and node itself for a formula.
+    """
+    if not isinstance(node, Sequent):
+        return node
+    antecedent = sorted(node.antecedent, key=str)
+    succedent = sorted(node.succedent, key=str)
+    left = antecedent[0] if antecedent else Top()
+    for formula in antecedent[1:]:
+        left = And(left, formula)
+    right = succedent[0] if succedent else Bottom()
+    for formula in succedent[1:]:
+        right = Or(right, formula)
+    return Implies(left, right)
+
+
+def is_instance(quantifier, formula):
+    substitution = match(instantiate(quantifier, TERM), formula, variables={TERM})
+    if substitution is None:
+        return False
+    term = substitution.apply(TERM)
+    return term is TERM or instantiate(quantifier, term) is formula
+
+
+def check_rule(conclusion, premises, rule):
+    """
+    Whether conclusion follows from premises by the named G3c rule.
+    """
+    if not isinstance(conclusion, Sequent) or not all(isinstance(premise, Sequent) for premise in premises):
+        return False
+    if rule in ("Ax", "L⊥", "R⊤"):
+        return not premises and axiom(conclusion) is not None
+    premises = set(premises)
+    if rule in GAMMA_RULES:
+        if len(premises) != 1:
+            return False
+        (premise,) = premises
+        if not (premise.antecedent >= conclusion.antecedent and premise.succedent >= conclusion.succedent):
+            return False
+        universal = [f for f in conclusion.antecedent if isinstance(f, ForAll)]
+        existential = [f for f in conclusion.succedent if isinstance(f, Exists)]
+        return all(
+            any(is_instance(q, f) for q in universal) for f in premise.antecedent - conclusion.antecedent
+        ) and all(any(is_instance(q, f) for q in existential) for f in premise.succedent - conclusion.succedent)
+    left = RULES[rule]
+    # Eigenvariables a premise may have introduced.
+    variables = [None]
+    if rule in ("∃L", "∀R"):
+        variables = set().union(*(free_variables(premise) for premise in premises)) - free_variables(conclusion)
+    for formula in conclusion.antecedent if left else conclusion.succedent:
+        for variable in variables:
+            if (result := decompose(conclusion, formula, left, variable)) is not None:
+                name, expected = result
+                if name == rule and set(expected) == premises:
+                    return True
+    return False
+
+
+class Verifier:
+    """
+    Verdicts for the nodes of a proof graph whose node ids are formulas or sequents and whose edges go from premises to
+    conclusions. The local verdict of a node only depends on it and its premises and is cached; its status also
+    depends on the statuses of its premises. After an edit only the edited node and its successors are checked again,
+    and statuses are recomputed in topological order only as far as they change.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.formulas = {}
+        self.local = {}
+        self.status = {}
+        self.rank = None
+
+    def formula(self, node):
+        if node not in self.formulas:
+            try:
+                self.formulas[node] = parse(node) if isinstance(node, str) else None
+            except ValueError:
+                self.formulas[node] = None
+        return self.formulas[node]
+
+    def rule(self, node):
+        """
+        The rule attribute of node, or else the one its incoming edges agree on.
+        """
+        if (rule := self.graph.nodes[node].get("rule")) is not None:
+            return rule
+        rules = {rule for _, _, rule in self.graph.in_edges(node, data="rule")}
+        return rules.pop() if len(rules) == 1 else None
+
+    def ranks(self):
+        """
+        Topological position of each node (the dependency order), rebuilt only after the edges change.
+        """
+        if self.rank is None:
+            try:
+                self.rank = {node: i for i, node in enumerate(networkx.topological_sort(self.graph))}
+            except networkx.NetworkXUnfeasible:
+                raise ValueError("A proof graph cannot have cycles!")
+        return self.rank
+
+    def check_nodes(self, nodes, progress=None):
+        """
+        Local verdicts of nodes. Steps without a known rule are checked semantically, all in one batch.
+        """
+        semantic = []
+        for node in nodes:
+            conclusion = self.formula(node)
+            premises = [self.formula(premise) for premise in self.graph.predecessors(node)]
+            rule = self.rule(node)
+            if conclusion is None or any(premise is None for premise in premises):
+                self.local[node] = UNCHECKED
+            elif not premises and rule is None:
+                self.local[node] = ASSUMED
+            elif rule in RULES or rule in GAMMA_RULES or rule in ("Ax", "L⊥", "R⊤"):
+                self.local[node] = VALID if check_rule(conclusion, premises, rule) else INVALID
+            elif isinstance(schema := self.formula(rule), Sequent) and len(schema.succedent) == 1:
+                valid = derives(list(schema.antecedent), *schema.succedent, premises, conclusion)
+                self.local[node] = VALID if valid else INVALID
+            else:
+                semantic.append((node, Sequent([sequent_formula(p) for p in premises], [sequent_formula(conclusion)])))
+        checkable = []
+        for node, sequent in semantic:
+            try:
+                atoms(sequent)
+            except ValueError:
+                self.local[node] = UNCHECKED
+                continue
+            checkable.append((node, sequent))
+        for (node, _), counterexample in zip(
+            checkable, check_all([sequent for _, sequent in checkable], progress=progress)
+        ):
+            self.local[node] = VALID if counterexample is None else INVALID
+
+    def propagate(self, nodes):
+        """
+        Recomputes the statuses of nodes and, as long as they change, of their descendants.
+        Returns the changed statuses, which are not written to the graph: verify runs on a worker thread, so the caller
+        shows them on the GUI thread.
+        """
+        rank = self.ranks()
+        heap = [(rank[node], node) for node in set(nodes)]
+        heapq.heapify(heap)
+        queued = set(nodes)
+        changed = {}
+        while heap:
+            _, node = heapq.heappop(heap)
+            queued.discard(node)
+            status = self.local[node]
+            if status in (VALID, ASSUMED):
+                if any(self.status[premise] not in (VALID, ASSUMED) for premise in self.graph.predecessors(node)):
+                    status = DEPENDS
+            if self.status.get(node) == status:
+                continue
+            self.status[node] = changed[node] = status
+            for successor in self.graph.successors(node):
+                if successor not in queued:
+                    queued.add(successor)
+                    heapq.heappush(heap, (rank[successor], successor))
+        return changed
+
+    def verify(self, progress=None):
+        """
+        Checks every node. Returns the statuses that changed.
+        """
+        order = list(self.ranks())
+        self.check_nodes([node for node in order if node not in self.local], progress)
+        return self.propagate(order)
+
+    def edited(self, nodes):
+        """
+        Rechecks after the premises or rules of nodes changed. Returns the statuses that changed. A verifier that has
+        not verified yet checks every node, since the statuses of the premises are not known.
+        """
+        if not self.status:
+            return self.verify()
+        nodes = [node for node in nodes if node in self.graph]
+        self.check_nodes(nodes)
+        return self.propagate(nodes)
+
+    def replace_node(self, old, new):
+        """
+        Renames node old to new (an edited formula) keeping its edges. Returns the statuses that changed.
+        """
+        if new in self.graph:
+            raise ValueError(f"{new} is already in the graph!")
+        networkx.relabel_nodes(self.graph, {old: new}, copy=False)
+        for cache in (self.local, self.status, self.formulas):
+            cache.pop(old, None)
+        if self.rank is not None:
+            self.rank[new] = self.rank.pop(old)
+        return self.edited([new, *self.graph.successors(new)])
+
+    def add_edge(self, premise, conclusion):
+        self.graph.add_edge(premise, conclusion)
+        self.rank = None
+        return self.edited([premise, conclusion])
+
+    def remove_edge(self, premise, conclusion):
+        self.graph.remove_edge(premise, conclusion)
+        self.rank = None
+        return self.edited([conclusion])
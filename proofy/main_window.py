@@ -2,7 +2,7 @@ import logging
 import pathlib
 
 from PySide2 import QtWidgets
-from PySide2.QtCore import Slot, Qt, QSettings, QByteArray
+from PySide2.QtCore import Slot, Qt, QSettings, QByteArray, QThreadPool
 from PySide2.QtGui import QKeySequence, QCloseEvent
 from PySide2.QtWidgets import (
     QMainWindow,
@@ -13,12 +13,16 @@ from PySide2.QtWidgets import (
     QMessageBox,
     QToolBar,
     QMenu,
+    QProgressDialog,
 )
 
+import startup
 from __init__ import __version__
 from widgets.graphwidget import GraphWidget
-from widgets.logconsolewidget import LogConsoleWidget
+from widgets.logviewerwidget import LogViewerWidget
+from widgets.performancewidget import PerformanceWidget
 from widgets.toolswidget import ToolsWidget
+from widgets.worker import Worker
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -29,17 +33,25 @@ class MainWindow(QMainWindow):
         super().__init__()
 
         self.current_file = None
+        self.loading_file = None
+
+        self.loader: Worker = None
+        self.preloader: Worker = None
+        self.progress_dialog: QProgressDialog = None
 
         self.console_dock: QDockWidget = None
         self.tools_dock: QDockWidget = None
+        self.performance_dock: QDockWidget = None
 
         self.toolbar: QToolBar = None
 
         self.graph_widget: GraphWidget = None
-        self.log_console_widget: LogConsoleWidget = None
+        self.log_console_widget: LogViewerWidget = None
         self.tools_widget: ToolsWidget = None
+        self.performance_widget: PerformanceWidget = None
 
         self.file_menu: QMenu = None
+        self.edit_menu: QMenu = None
         self.help_menu: QMenu = None
         self.view_menu: QMenu = None
         self.docks_menu: QMenu = None
@@ -47,11 +59,17 @@ class MainWindow(QMainWindow):
         self.about_action: QAction = None
         self.new_action: QAction = None
         self.open_action: QAction = None
+        self.open_files_action: QAction = None
+        self.open_directory_action: QAction = None
         self.save_action: QAction = None
         self.save_as_action: QAction = None
         self.exit_action: QAction = None
+        self.undo_action: QAction = None
+        self.redo_action: QAction = None
         self.toggle_tools_dock: QAction = None
         self.toggle_console_dock: QAction = None
+        self.toggle_performance_dock: QAction = None
+        self.write_debug_html_action: QAction = None
 
         self.create_actions(app)
         self.create_widgets()
@@ -63,6 +81,9 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.graph_widget)
         self.addDockWidget(Qt.BottomDockWidgetArea, self.console_dock)
         self.addDockWidget(Qt.RightDockWidgetArea, self.tools_dock)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.performance_dock)
+        self.tabifyDockWidget(self.console_dock, self.performance_dock)
+        self.console_dock.raise_()
         self.addToolBar(self.toolbar)
         self.setWindowTitle(self.tr("Proofy"))
 
@@ -78,6 +99,9 @@ class MainWindow(QMainWindow):
         self.tools_dock = QDockWidget(self.tr("Tools"))
         self.tools_dock.setWidget(self.tools_widget)
 
+        self.performance_dock = QDockWidget(self.tr("Performance"))
+        self.performance_dock.setWidget(self.performance_widget)
+
     def create_toolbar(self):
         self.toolbar = QToolBar(self.tr("Tools"), self)
         self.toolbar.setStatusTip(self.tr("Tools"))
@@ -85,26 +109,45 @@ class MainWindow(QMainWindow):
             [self.new_action, self.open_action, self.save_action, self.save_as_action, self.exit_action,]
         )
         self.toolbar.addSeparator()
+        self.toolbar.addActions([self.undo_action, self.redo_action])
+        self.toolbar.addSeparator()
         self.toolbar.addAction(self.about_action)
 
     def create_widgets(self):
-        self.log_console_widget = LogConsoleWidget()
-        self.log_console_widget.add_loggers(logger)
+        self.log_console_widget = LogViewerWidget()
+        self.log_console_widget.add_loggers(logger, startup.logger)
+        self.performance_widget = PerformanceWidget(log_console=self.log_console_widget)
         self.graph_widget = GraphWidget(self.log_console_widget)
-        self.tools_widget = ToolsWidget(graph_widget=self.graph_widget)
+        self.write_debug_html_action.toggled.connect(self.graph_widget.set_write_debug_html)
+        self.graph_widget.history_changed.connect(self.history_changed)
+        self.tools_widget = ToolsWidget(graph_widget=self.graph_widget, log_console=self.log_console_widget)
 
     def create_menus(self):
         self.file_menu = self.menuBar().addMenu("File")
         self.file_menu.setStatusTip(self.tr("File operations"))
         self.file_menu.addActions(
-            [self.new_action, self.open_action, self.save_action, self.save_as_action, self.exit_action,]
+            [
+                self.new_action,
+                self.open_action,
+                self.open_files_action,
+                self.open_directory_action,
+                self.save_action,
+                self.save_as_action,
+                self.exit_action,
+            ]
         )
 
+        self.edit_menu = self.menuBar().addMenu("Edit")
+        self.edit_menu.setStatusTip(self.tr("Edit operations"))
+        self.edit_menu.addActions([self.undo_action, self.redo_action])
+
         self.view_menu = self.menuBar().addMenu("View")
         self.view_menu.setStatusTip(self.tr("View settings"))
         self.docks_menu = self.view_menu.addMenu("Docks")
         self.docks_menu.addAction(self.toggle_tools_dock)
         self.docks_menu.addAction(self.toggle_console_dock)
+        self.docks_menu.addAction(self.toggle_performance_dock)
+        self.view_menu.addAction(self.write_debug_html_action)
 
         self.help_menu = self.menuBar().addMenu("Help")
         self.help_menu.setStatusTip(self.tr("Help"))
@@ -126,6 +169,14 @@ class MainWindow(QMainWindow):
         self.open_action.setShortcuts(QKeySequence.Open)
         self.open_action.triggered.connect(self.open)
 
+        self.open_files_action = QAction("Open Files...", self)
+        self.open_files_action.setStatusTip(self.tr("Open several files merged into one graph"))
+        self.open_files_action.triggered.connect(self.open_files)
+
+        self.open_directory_action = QAction("Open Directory...", self)
+        self.open_directory_action.setStatusTip(self.tr("Open every graph file in a directory merged into one graph"))
+        self.open_directory_action.triggered.connect(self.open_directory)
+
         self.save_action = QAction(app.style().standardIcon(QtWidgets.QStyle.SP_DialogSaveButton), "Save...", self,)
         self.save_action.setStatusTip(self.tr("Save file"))
         self.save_action.setShortcuts(QKeySequence.Save)
@@ -141,16 +192,40 @@ class MainWindow(QMainWindow):
         self.exit_action.setShortcuts(QKeySequence.Quit)
         self.exit_action.triggered.connect(self.exit)
 
+        self.undo_action = QAction(app.style().standardIcon(QtWidgets.QStyle.SP_ArrowBack), "Undo", self)
+        self.undo_action.setStatusTip(self.tr("Undo the last edit of the graph"))
+        self.undo_action.setShortcuts(QKeySequence.Undo)
+        self.undo_action.setEnabled(False)
+        self.undo_action.triggered.connect(self.undo)
+
+        self.redo_action = QAction(app.style().standardIcon(QtWidgets.QStyle.SP_ArrowForward), "Redo", self)
+        self.redo_action.setStatusTip(self.tr("Redo the last undone edit of the graph"))
+        self.redo_action.setShortcuts(QKeySequence.Redo)
+        self.redo_action.setEnabled(False)
+        self.redo_action.triggered.connect(self.redo)
+
         self.toggle_console_dock = QAction("Toggle Console Dock", self)
         self.toggle_console_dock.setStatusTip("Toggle visibility of the console dock")
         self.toggle_console_dock.triggered.connect(
             lambda _: self.console_dock.setVisible(not self.console_dock.isVisible())
         )
 
+        self.toggle_performance_dock = QAction("Toggle Performance Dock", self)
+        self.toggle_performance_dock.setStatusTip("Toggle visibility of the performance dock")
+        self.toggle_performance_dock.triggered.connect(
+            lambda _: self.performance_dock.setVisible(not self.performance_dock.isVisible())
+        )
+
         self.toggle_tools_dock = QAction("Toggle Tools Dock", self)
         self.toggle_tools_dock.setStatusTip("Toggle visibility of the tools dock")
         self.toggle_tools_dock.triggered.connect(lambda _: self.tools_dock.setVisible(not self.tools_dock.isVisible()))
 
+        self.write_debug_html_action = QAction("Write Debug HTML", self)
+        self.write_debug_html_action.setStatusTip(
+            "Also write the drawn graph page to index.html in the app data folder"
+        )
+        self.write_debug_html_action.setCheckable(True)
+
     @Slot()
     def about(self):
         logger.debug(locals())
@@ -171,9 +246,20 @@ class MainWindow(QMainWindow):
             ),
         )
 
+    @Slot()
+    def started(self):
+        logger.debug(locals())
+        startup.finished()
+        self.preloader = Worker(startup.preload)
+        QThreadPool.globalInstance().start(self.preloader)
+
     def closeEvent(self, event: QCloseEvent):
         logger.debug(locals())
         if self.unsaved_check():
+            if self.loader:
+                self.loader.cancel()
+            self.tools_widget.shutdown()
+            self.graph_widget.shutdown()
             self.write_settings()
             event.accept()
         else:
@@ -183,6 +269,7 @@ class MainWindow(QMainWindow):
     def exit(self):
         logger.debug(locals())
         if self.unsaved_check():
+            self.graph_widget.close_journal()
             QApplication.quit()
 
     @Slot()
@@ -190,6 +277,7 @@ class MainWindow(QMainWindow):
         logger.debug(locals())
         if self.unsaved_check():
             self.current_file = None
+            self.graph_widget.close_journal()
 
     def set_file_status(self, *, modified: bool):
         if self.current_file:
@@ -200,25 +288,179 @@ class MainWindow(QMainWindow):
             self.setWindowTitle(f"Proofy[*]")
             self.setWindowModified(modified)
 
+    @Slot()
+    def history_changed(self):
+        history = self.graph_widget.history
+        self.set_file_status(modified=history.modified)
+        self.undo_action.setEnabled(history.can_undo)
+        self.undo_action.setText(f"Undo {history.undo_text}" if history.can_undo else "Undo")
+        self.redo_action.setEnabled(history.can_redo)
+        self.redo_action.setText(f"Redo {history.redo_text}" if history.can_redo else "Redo")
+
+    @Slot()
+    def undo(self):
+        logger.debug(locals())
+        if self.tools_widget.reading_graph():
+            self.statusBar().showMessage("The graph is being checked, undo when the check has finished")
+        else:
+            self.graph_widget.undo()
+
+    @Slot()
+    def redo(self):
+        logger.debug(locals())
+        if self.tools_widget.reading_graph():
+            self.statusBar().showMessage("The graph is being checked, redo when the check has finished")
+        else:
+            self.graph_widget.redo()
+
     @Slot()
     def open(self):
         logger.debug(locals())
-        if self.unsaved_check():
+        if self.tools_widget.reading_graph():
+            self.statusBar().showMessage("The graph is being checked, open a file when the check has finished")
+        elif self.unsaved_check():
             if (
                 path := QFileDialog.getOpenFileName(
                     self, caption=self.tr("Open File"), filter=self.graph_widget.get_open_file_extensions(),
                 )
-            ) :
-                try:
-                    QApplication.setOverrideCursor(Qt.WaitCursor)
-                    self.graph_widget.open_file(*path)
-                    self.statusBar().showMessage(f"Opened {path} successfully")
-                    self.current_file = path
-                    self.set_file_status(modified=False)
-                except Exception as e:
-                    logger.error(e)
-                finally:
-                    QApplication.restoreOverrideCursor()
+            ) and path[0]:
+                self.start_loading(path)
+
+    @Slot()
+    def open_files(self):
+        logger.debug(locals())
+        if self.tools_widget.reading_graph():
+            self.statusBar().showMessage("The graph is being checked, open files when the check has finished")
+        elif self.unsaved_check():
+            paths, file_type = QFileDialog.getOpenFileNames(
+                self, caption=self.tr("Open Files"), filter=self.graph_widget.get_open_file_extensions()
+            )
+            if paths:
+                self.start_merging(paths, file_type)
+
+    @Slot()
+    def open_directory(self):
+        logger.debug(locals())
+        if self.tools_widget.reading_graph():
+            self.statusBar().showMessage("The graph is being checked, open a directory when the check has finished")
+        elif self.unsaved_check():
+            if directory := QFileDialog.getExistingDirectory(self, caption=self.tr("Open Directory")):
+                from formats.merge import graph_files
+
+                if paths := graph_files(directory):
+                    self.start_merging(paths)
+                else:
+                    self.statusBar().showMessage(f"No graph files found in {directory}")
+
+    def start_loading(self, path):
+        logger.debug(locals())
+        self.loading_file = path
+        self.start_loader(Worker(GraphWidget.read_file, *path), self.loading_finished, pathlib.Path(path[0]).name)
+
+    def start_merging(self, paths, file_type=None):
+        """
+        Reads paths concurrently and opens them merged into one unsaved graph.
+        """
+        logger.debug(locals())
+        from formats.merge import merge_files
+
+        self.loading_file = f"{len(paths)} files"
+        self.start_loader(Worker(merge_files, paths, file_type), self.merging_finished, self.loading_file)
+
+    def start_loader(self, loader: Worker, finished, name: str):
+        self.loader = loader
+        self.loader.signals.progress.connect(self.loading_progress)
+        self.loader.signals.finished.connect(finished)
+        self.loader.signals.failed.connect(self.loading_failed)
+        self.loader.signals.cancelled.connect(self.loading_cancelled)
+
+        self.progress_dialog = QProgressDialog(self.tr(f"Opening {name}..."), self.tr("Cancel"), 0, 1000, self)
+        self.progress_dialog.setWindowTitle(self.tr("Open File"))
+        self.progress_dialog.canceled.connect(self.loader.cancel)
+        self.set_file_actions_enabled(False)
+        self.statusBar().showMessage(f"Opening {self.loading_file}...")
+
+        QThreadPool.globalInstance().start(self.loader)
+
+    @Slot(float)
+    def loading_progress(self, fraction):
+        if self.progress_dialog:
+            self.progress_dialog.setValue(int(fraction * 1000))
+
+    @Slot(object)
+    def loading_finished(self, graph):
+        logger.debug(locals())
+        self.current_file = self.loading_file
+        path = self.current_file[0]
+        self.graph_widget.close_journal()
+        from journal import recoverable, replay
+
+        journaled = True
+        recovered = False
+        if (steps := recoverable(path)) and QMessageBox.question(
+            self,
+            self.tr("Recover Edits"),
+            self.tr(f"{steps} edits of {path} were not saved in an earlier session. Do you want to recover them?"),
+        ) == QMessageBox.Yes:
+            try:
+                # A copy, so that a journal that does not fit leaves the file as it was read.
+                graph = replay(path, graph.copy())
+                recovered = True
+                logger.info(f"Recovered {steps} edits of {path}")
+            except Exception as e:
+                logger.error(f"Could not recover the edits of {path}: {e}")
+                # The journal is kept until the next save.
+                journaled = False
+        self.graph_widget.set_graph(graph, saved=not recovered)
+        if journaled:
+            self.graph_widget.start_journal(path, resume=recovered)
+        self.statusBar().showMessage(f"Opened {self.loading_file} successfully")
+        self.stop_loading()
+
+    @Slot(object)
+    def merging_finished(self, result):
+        logger.debug(locals())
+        graph, report = result
+        for path, error in report.failed:
+            logger.error(f"Could not open {path}: {error}")
+        logger.info(str(report))
+        self.current_file = None
+        self.graph_widget.set_graph(graph, saved=False)
+        self.statusBar().showMessage(str(report))
+        self.stop_loading()
+
+    @Slot(object)
+    def loading_failed(self, e):
+        logger.error(e)
+        self.statusBar().showMessage(f"Failed to open {self.loading_file}")
+        self.stop_loading()
+
+    @Slot()
+    def loading_cancelled(self):
+        logger.info(f"Cancelled opening {self.loading_file}")
+        self.statusBar().showMessage(f"Cancelled opening {self.loading_file}")
+        self.stop_loading()
+
+    def stop_loading(self):
+        if self.progress_dialog:
+            self.progress_dialog.canceled.disconnect(self.loader.cancel)
+            self.progress_dialog.reset()
+            self.progress_dialog.deleteLater()
+        self.progress_dialog = None
+        self.loader = None
+        self.loading_file = None
+        self.set_file_actions_enabled(True)
+
+    def set_file_actions_enabled(self, enabled: bool):
+        for action in [
+            self.new_action,
+            self.open_action,
+            self.open_files_action,
+            self.open_directory_action,
+            self.save_action,
+            self.save_as_action,
+        ]:
+            action.setEnabled(enabled)
 
     def read_settings(self):
         logger.debug(locals())
@@ -241,7 +483,7 @@ class MainWindow(QMainWindow):
             path := QFileDialog.getSaveFileName(
                 self, caption=self.tr("Save File"), filter=self.graph_widget.get_save_file_extensions(),
             )
-        ) :
+        )[0]:
             self.current_file = path
             self.save_file()
 
@@ -257,26 +499,26 @@ class MainWindow(QMainWindow):
 
     def unsaved_check(self):
         logger.debug(locals())
-        if self.current_file:
-            if any([self.isWindowModified(), self.graph_widget.isWindowModified()]):
-                ret = QMessageBox.warning(
-                    self,
-                    self.tr("Application"),
-                    self.tr(
-                        f"Do you want to save your current work on [{self.current_file if self.current_file else '*'}]?"
-                    ),
-                    QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
-                )
-                logger.debug(ret)
-                if ret == QMessageBox.Save:
-                    self.save()
-                    return True
-                elif ret == QMessageBox.Discard:
-                    return True
-                elif ret == QMessageBox.Cancel:
-                    return False
-                else:
-                    raise NotImplementedError()
+        if self.graph_widget.history.modified:
+            ret = QMessageBox.warning(
+                self,
+                self.tr("Application"),
+                self.tr(
+                    f"Do you want to save your current work on [{self.current_file if self.current_file else '*'}]?"
+                ),
+                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
+            )
+            logger.debug(ret)
+            if ret == QMessageBox.Save:
+                self.save()
+                # A save that failed or was cancelled keeps the work, and its journal.
+                return not self.graph_widget.history.modified
+            elif ret == QMessageBox.Discard:
+                return True
+            elif ret == QMessageBox.Cancel:
+                return False
+            else:
+                raise NotImplementedError()
         else:
             return True
 
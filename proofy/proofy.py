@@ -1,16 +1,26 @@
+import startup  # First, so that the startup timing includes every other import.
 import sys
 
-from PySide2 import QtWebEngine
+from PySide2.QtCore import QCoreApplication, Qt, QTimer
 from PySide2.QtWidgets import QApplication
 
+startup.mark("Qt imported")
+
 from main_window import MainWindow
 
+startup.mark("main window imported")
+
 if __name__ == "__main__":
-    QtWebEngine.QtWebEngine.initialize()
+    # The web engine starts with the first drawn graph instead of here, which needs shared OpenGL contexts.
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
 
     app = QApplication(sys.argv)
+    startup.mark("application created")
 
     window = MainWindow(app)
+    startup.mark("main window created")
     window.show()
+    startup.mark("main window shown")
+    QTimer.singleShot(0, window.started)
 
     sys.exit(app.exec_())
@@ -0,0 +1,65 @@
+import importlib
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Time of the first import of this module, which proofy.py does before anything else.
+START = time.perf_counter()
+MARKS = []
+# Modules that are imported on first use, loaded in the background once the window is up so that first use is quick.
+PRELOAD = [
+    "networkx",
+    "formats.registry",
+    "layout.lod",
+    "logic.prover",
+    "logic.semantics",
+    "logic.unify",
+    "logic.verifier",
+    "logic.parallel",
+    "logic.lemmas",
+    "journal",
+]
+# Set to print the startup report to stderr as well.
+REPORT_VARIABLE = "PROOFY_STARTUP_TIMING"
+
+
+def mark(name: str):
+    MARKS.append((name, time.perf_counter()))
+
+
+def report():
+    """
+    Time spent between consecutive marks and in total, in milliseconds.
+    """
+    lines = ["Startup timing:"]
+    previous = START
+    for name, moment in MARKS:
+        lines.append(f"{(moment - previous) * 1000:9.1f} ms  {name}")
+        previous = moment
+    lines.append(f"{(previous - START) * 1000:9.1f} ms  total")
+    return "\n".join(lines)
+
+
+def finished():
+    """
+    Called from the event loop once the first window is shown.
+    """
+    mark("event loop started")
+    text = report()
+    logger.info(text)
+    if os.environ.get(REPORT_VARIABLE):
+        print(text, file=sys.stderr)
+
+
+def preload(progress=None):
+    start = time.perf_counter()
+    for name in PRELOAD:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"Could not preload {name}: {e}")
+    logger.debug(f"Preloaded {len(PRELOAD)} modules in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,181 @@
+import collections
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+# Spans kept; older ones are dropped.
+RING_SIZE = 1 << 16
+# Functions listed in a captured profile.
+PROFILE_LINES = 40
+
+SPANS = collections.deque(maxlen=RING_SIZE)
+THREAD_NAMES = {}
+# Name of the span to run under cProfile the next time it starts, and the last captured profile.
+PROFILE = {"target": None, "profile": None, "stats": None}
+PROFILE_LOCK = threading.Lock()
+
+
+class Span:
+    """
+    Context manager that records (name, category, start ns, duration ns, thread id, args) in SPANS on exit.
+    Appending to a bounded deque is atomic, so spans may end on any thread without a lock.
+    """
+
+    __slots__ = ("name", "category", "args", "start", "profile")
+
+    def __init__(self, name: str, category: str = "", **args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+        self.profile = None
+
+    def __enter__(self):
+        if PROFILE["target"] == self.name:
+            self.profile = start_profile(self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        record(self.name, self.start, end - self.start, self.category, **self.args)
+        if self.profile is not None:
+            stop_profile(self.profile)
+        return False
+
+
+def span(name: str, category: str = "", **args):
+    return Span(name, category, **args)
+
+
+def traced(name: str, category: str = ""):
+    """
+    Decorator recording every call of a function as a span.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name, category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(name: str, start: int, duration: int, category: str = "", **args):
+    """
+    Adds a span measured elsewhere (e.g. in the page), with times in perf_counter nanoseconds.
+    """
+    thread = threading.get_ident()
+    if thread not in THREAD_NAMES:
+        THREAD_NAMES[thread] = threading.current_thread().name
+    SPANS.append((name, category, start, duration, thread, args))
+
+
+def spans():
+    return list(SPANS)
+
+
+def clear():
+    SPANS.clear()
+
+
+def summary(items=None):
+    """
+    (name, count, total ns, max ns, last ns) per span name, in order of first appearance.
+    """
+    result = {}
+    for name, _, _, duration, _, _ in spans() if items is None else items:
+        if (row := result.get(name)) is None:
+            result[name] = [name, 1, duration, duration, duration]
+        else:
+            row[1] += 1
+            row[2] += duration
+            row[3] = max(row[3], duration)
+            row[4] = duration
+    return [tuple(row) for row in result.values()]
+
+
+def chrome_trace(items=None):
+    """
+    The spans in the Chrome trace event format, for chrome://tracing or https://ui.perfetto.dev.
+    """
+    pid = os.getpid()
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread, "args": {"name": name}}
+        for thread, name in list(THREAD_NAMES.items())
+    ]
+    for name, category, start, duration, thread, args in spans() if items is None else items:
+        event = {"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": pid, "tid": thread}
+        if category:
+            event["cat"] = category
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+        events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path, items=None):
+    from formats.jsonstream import atomic_writer
+
+    with atomic_writer(path) as file_p:
+        json.dump(chrome_trace(items), file_p)
+
+
+def profile_next(name):
+    """
+    Runs the next span called name under cProfile (None to stop waiting).
+    """
+    with PROFILE_LOCK:
+        PROFILE["target"] = name
+
+
+def start_profile(name):
+    with PROFILE_LOCK:
+        if PROFILE["target"] != name:
+            return None
+        PROFILE["target"] = None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already active on this thread.
+        return None
+    return profile
+
+
+def stop_profile(profile):
+    profile.disable()
+    with PROFILE_LOCK:
+        PROFILE["profile"] = profile
+        PROFILE["stats"] = None
+
+
+def last_profile():
+    """
+    The functions of the last captured profile by cumulative time, as text, or None.
+    """
+    with PROFILE_LOCK:
+        profile, text = PROFILE["profile"], PROFILE["stats"]
+    if profile is None or text is not None:
+        return text
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_LINES)
+    with PROFILE_LOCK:
+        PROFILE["stats"] = stream.getvalue()
+    return PROFILE["stats"]
+
+
+def save_profile(path):
+    with PROFILE_LOCK:
+        profile = PROFILE["profile"]
+    if profile is None:
+        raise ValueError("No profile has been captured!")
+    profile.dump_stats(str(path))
@@ -0,0 +1,33 @@
+from PySide2.QtCore import QObject, Signal, Slot
+
+
+class GraphBridge(QObject):
+    """
+    Exposed to the graph page over QWebChannel as "proofy", so the page can tell what the user is looking at.
+    """
+
+    viewport_changed = Signal(float, float, float, float, float)
+    expand_requested = Signal(str)
+    collapse_requested = Signal(str)
+    select_requested = Signal(str)
+    render_measured = Signal(float, int)
+
+    @Slot(float, float, float, float, float)
+    def set_viewport(self, x0, y0, x1, y1, scale):
+        self.viewport_changed.emit(x0, y0, x1, y1, scale)
+
+    @Slot(str)
+    def expand(self, key):
+        self.expand_requested.emit(key)
+
+    @Slot(str)
+    def collapse(self, key):
+        self.collapse_requested.emit(key)
+
+    @Slot(str)
+    def select(self, key):
+        self.select_requested.emit(key)
+
+    @Slot(float, int)
+    def rendered(self, milliseconds, nodes):
+        self.render_measured.emit(milliseconds, nodes)
@@ -0,0 +1,92 @@
+import json
+
+from tracing import span
+
+ENCODER = json.JSONEncoder()
+KEY = "__key"
+POSITION = "__position"
+EMPTY_DIFF = (
+    '{"addNodes": [], "updateNodes": [], "removeNodes": [], "addLinks": [], "updateLinks": [], "removeLinks": []}'
+)
+
+
+class RenderedGraph:
+    """
+    Remembers what has been sent to the page, so only added, removed and changed nodes/links are sent on redraw.
+    Nodes and links are identified on the page by the JSON text of their id (and key) under KEY.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.links = {}
+
+    def clear(self):
+        self.nodes.clear()
+        self.links.clear()
+
+    @staticmethod
+    def node_items(graph, positions=None):
+        for node, attributes in graph.nodes(data=True):
+            key = ENCODER.encode(node)
+            if positions and (position := positions.get(node)) is not None:
+                yield key, ENCODER.encode({**attributes, "id": node, KEY: key, POSITION: position})
+            else:
+                yield key, ENCODER.encode({**attributes, "id": node, KEY: key})
+
+    @staticmethod
+    def link_items(graph):
+        if graph.is_multigraph():
+            edges = graph.edges(keys=True, data=True)
+        else:
+            edges = ((u, v, None, attributes) for u, v, attributes in graph.edges(data=True))
+        for u, v, k, attributes in edges:
+            source, target = ENCODER.encode(u), ENCODER.encode(v)
+            key = f"[{source}, {target}]" if k is None else f"[{source}, {target}, {ENCODER.encode(k)}]"
+            link = {**attributes, "source": source, "target": target, KEY: key}
+            if k is not None:
+                link["key"] = k
+            yield key, ENCODER.encode(link)
+
+    @staticmethod
+    def update(rendered: dict, items):
+        added, updated = [], []
+        seen = set()
+        for key, text in items:
+            seen.add(key)
+            if (previous := rendered.get(key)) is None:
+                added.append(text)
+            elif previous != text:
+                updated.append(text)
+            else:
+                continue
+            rendered[key] = text
+        removed = [key for key in rendered if key not in seen]
+        for key in removed:
+            del rendered[key]
+        return added, updated, removed
+
+    def diff(self, graph, positions=None):
+        """
+        Returns the changes since the previous call as JSON text for proofy.applyDiff, or None if nothing changed.
+        Precomputed positions (node -> [x, y]) are sent along with the nodes under POSITION.
+        """
+        with span("serialize", "draw", nodes=0 if graph is None else len(graph)):
+            return self.serialize(graph, positions)
+
+    def serialize(self, graph, positions):
+        if graph is None:
+            nodes = links = ()
+        else:
+            nodes, links = self.node_items(graph, positions), self.link_items(graph)
+        added_nodes, updated_nodes, removed_nodes = self.update(self.nodes, nodes)
+        added_links, updated_links, removed_links = self.update(self.links, links)
+        if not any([added_nodes, updated_nodes, removed_nodes, added_links, updated_links, removed_links]):
+            return None
+        return (
+            f'{{"addNodes": [{", ".join(added_nodes)}], '
+            f'"updateNodes": [{", ".join(updated_nodes)}], '
+            f'"removeNodes": {ENCODER.encode(removed_nodes)}, '
+            f'"addLinks": [{", ".join(added_links)}], '
+            f'"updateLinks": [{", ".join(updated_links)}], '
+            f'"removeLinks": {ENCODER.encode(removed_links)}}}'
+        )
@@ -1,36 +1,147 @@
+import contextlib
+import functools
 import importlib.resources
 import json
 import logging
 import pathlib
+import time
 
-import networkx
-from PySide2.QtCore import Slot, QStandardPaths
-from PySide2.QtWebEngineWidgets import (
-    QWebEngineView,
-    QWebEnginePage,
-    QWebEngineSettings,
-)
+from PySide2.QtCore import Signal, Slot, QStandardPaths
 from PySide2.QtWidgets import QWidget, QHBoxLayout
 
+# The web engine, the file formats (networkx) and the level of detail view are imported on first use, so that they
+# do not delay the first window.
+from history import History
+from tracing import record, span
+from widgets.graphbridge import GraphBridge
+from widgets.graphdiff import EMPTY_DIFF, RenderedGraph
+from widgets.layoutengine import LayoutEngine
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
+# The edit journal is imported when a file is first journaled.
+JOURNAL_LOGGER = "journal"
+
+
+@functools.lru_cache(maxsize=None)
+def read_template():
+    return importlib.resources.read_text(__package__, "index.thtml", encoding="utf-8-sig")
+
+
+def render_template(graph_diff: str, width: int, height: int):
+    return read_template().replace("$width", str(width)).replace("$height", str(height)).replace("$graph", graph_diff)
 
 
 class GraphWidget(QWidget):
+    node_selected = Signal(object)
+    # Any change of the undo history, and undo or redo changing the graph behind the back of its editors.
+    history_changed = Signal()
+    graph_restored = Signal()
+
     def __init__(self, log_console):
         logger.debug(locals())
         QWidget.__init__(self)
-        log_console.add_loggers(logger)
+        log_console.add_loggers(logger, logging.getLogger(JOURNAL_LOGGER))
 
         self.graph = None
-        self.webview = QWebEngineView(parent=self)
-        self.index = QWebEnginePage(self)
+        self.history = History()
+        self.journal = None
+        self.rendered = RenderedGraph()
+        self.page_requested = False
+        self.page_ready = False
+        self.pending_scripts = []
+        self.write_debug_html = False
+        self.drawing_pending = False
+        self.layouts = LayoutEngine(self)
+        self.layouts.finished.connect(self.layout_ready)
+        self.level_of_detail = None
+        self.viewport = None
+        self.scale = 0.0
+
+        self.webview = None
+        self.index = None
+        self.channel = None
+        self.bridge = GraphBridge(self)
+        self.bridge.viewport_changed.connect(self.set_viewport)
+        self.bridge.expand_requested.connect(self.expand)
+        self.bridge.collapse_requested.connect(self.collapse)
+        self.bridge.select_requested.connect(self.select)
+        self.bridge.render_measured.connect(self.render_measured)
 
         worklayout = QHBoxLayout(parent=self)
-        worklayout.addWidget(self.webview)
         self.setLayout(worklayout)
 
+    def create_view(self):
+        """
+        Creates the web view and page on the first draw; starting Chromium is the slowest part of a cold start.
+        """
+        if self.webview is not None:
+            return
+        from PySide2.QtWebChannel import QWebChannel
+        from PySide2.QtWebEngineWidgets import QWebEngineView, QWebEnginePage
+
+        self.webview = QWebEngineView(parent=self)
+        self.index = QWebEnginePage(self)
+        self.index.loadFinished.connect(self.page_loaded)
+        self.index.renderProcessTerminated.connect(self.page_terminated)
+        self.channel = QWebChannel(self.index)
+        self.channel.registerObject("proofy", self.bridge)
+        self.index.setWebChannel(self.channel)
+        self.layout().addWidget(self.webview)
+
+    def load_index(self, width: int, height: int):
+        logger.debug(locals())
+        from PySide2.QtWebEngineWidgets import QWebEngineSettings
+
+        self.create_view()
+        self.rendered.clear()
+        self.viewport = None
+        self.scale = 0.0
+        self.page_requested = True
+        self.page_ready = False
+        self.pending_scripts.clear()
+        with span("html", "draw"):
+            html = render_template(EMPTY_DIFF, width, height)
+        self.index.setHtml(html)
+        self.index.settings().setAttribute(QWebEngineSettings.ShowScrollBars, False)
+        self.webview.setPage(self.index)
+
+    @Slot(bool)
+    def page_loaded(self, ok: bool):
+        logger.debug(locals())
+        if not ok:
+            logger.error("Failed to load the graph page!")
+            self.page_requested = False
+            return
+        self.page_ready = True
+        for script in self.pending_scripts:
+            self.index.runJavaScript(script)
+        self.pending_scripts.clear()
+
+    @Slot()
+    def page_terminated(self, *args):
+        logger.warning(f"Graph page terminated {args}, it will be reloaded on the next draw.")
+        self.page_requested = False
+        self.page_ready = False
+
+    def run_script(self, script: str):
+        if self.page_ready:
+            self.index.runJavaScript(script)
+        else:
+            self.pending_scripts.append(script)
+
+    def write_debug_index(self, width: int, height: int, graph, positions=None):
+
+        path = pathlib.Path(QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)) / "index.html"
+        logger.info(f"""Saving html to {path.absolute()}""")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render_template(RenderedGraph().diff(graph, positions) or EMPTY_DIFF, width, height))
+
     def draw_index(self):
+        with span("draw", "draw", nodes=self.graph.number_of_nodes() if self.graph else 0):
+            self.draw_page()
+
+    def draw_page(self):
         if not self.graph:
             logger.warning("No graph to draw found!")
         width = self.contentsRect().width()
@@ -38,28 +149,118 @@ class GraphWidget(QWidget):
         pagewidth = int(width) - 10
         pageheight = int(height) - 10
         logger.info(f"{width}x{height}")
-        html = importlib.resources.read_text(__package__, "index.thtml", encoding="utf-8-sig")
-        html = (
-            html.replace(
-                "$graph",
-                "'" + json.dumps(networkx.node_link_data(self.graph)) + "'"
-                if self.graph
-                else """'{"directed":true,"multigraph":true,"graph":[],"nodes":[],"links":[]}'""",
-            )
-            .replace("$width", str(pagewidth))
-            .replace("$height", str(pageheight))
-        )
-        path = pathlib.Path(QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)) / "index.html"
-        logger.info(f"""Saving html to {path.absolute()}""")
-        path.write_text(html)
+        if self.page_requested:
+            self.run_script(f"proofy.resize({pagewidth}, {pageheight});")
+        else:
+            self.load_index(pagewidth, pageheight)
+        if (view := self.render()) is None:
+            return
+        if self.write_debug_html:
+            self.write_debug_index(pagewidth, pageheight, *view)
 
-        self.index.setHtml(html)
-        self.index.settings().setAttribute(QWebEngineSettings.ShowScrollBars, False)
-        self.webview.setPage(self.index)
         self.webview.resize(width, height)
         self.webview.show()
         self.update()
 
+    def render(self):
+        """
+        Sends what changed in the (level of detail view of the) graph to the page.
+        Returns the rendered graph and positions, or None while the layout is still being computed.
+        """
+        graph, positions = self.graph, None
+        if graph:
+            from layout.lod import LOD_THRESHOLD, LevelOfDetail
+
+            if (layout := self.layouts.layout(graph)) is None:
+                self.drawing_pending = True
+                return None
+            positions = layout.positions()
+            if graph.number_of_nodes() > LOD_THRESHOLD and layout.coordinates is not None:
+                # A graph of the same structure shares the cached layout, but its nodes and attributes are its own.
+                if (
+                    self.level_of_detail is None
+                    or self.level_of_detail.layout is not layout
+                    or self.level_of_detail.graph is not graph
+                ):
+                    self.level_of_detail = LevelOfDetail(graph, layout)
+                with span("level of detail", "draw"):
+                    graph, positions = self.level_of_detail.view(self.viewport, self.scale)
+            else:
+                self.level_of_detail = None
+        self.drawing_pending = False
+        if (diff := self.rendered.diff(graph, positions)) is not None:
+            self.run_script(f"proofy.applyDiff({diff});")
+        return graph, positions
+
+    @Slot(float, float, float, float, float)
+    def set_viewport(self, x0, y0, x1, y1, scale):
+        self.viewport = (x0, y0, x1, y1)
+        self.scale = scale
+        if self.level_of_detail is not None:
+            self.render()
+
+    @Slot(str)
+    def expand(self, key):
+        logger.debug(locals())
+        if self.level_of_detail is not None:
+            from layout.lod import CLUSTER
+
+            kind, cluster = json.loads(key)
+            if kind == CLUSTER:
+                self.level_of_detail.expanded.add(cluster)
+                self.render()
+
+    @Slot(str)
+    def collapse(self, key):
+        logger.debug(locals())
+        if self.level_of_detail is not None:
+            from formats.jsonstream import to_tuple
+
+            node = to_tuple(json.loads(key))
+            if node in self.level_of_detail.index:
+                self.level_of_detail.expanded.discard(self.level_of_detail.cluster_of(node))
+                self.render()
+
+    @Slot(float, int)
+    def render_measured(self, milliseconds, nodes):
+        """
+        Records the time the page took to apply a diff, measured in the page, as a span that ends now.
+        """
+        duration = int(milliseconds * 1e6)
+        record("web render", time.perf_counter_ns() - duration, duration, "draw", nodes=nodes)
+
+    @Slot(str)
+    def select(self, key):
+        from formats.jsonstream import to_tuple
+
+        node = to_tuple(json.loads(key))
+        if self.graph is not None and node in self.graph:
+            self.node_selected.emit(node)
+
+    def set_node_attributes(self, attributes: dict):
+        """
+        Updates the attributes of nodes (node -> {name: value}) and sends only those nodes to the page again.
+        """
+        for node, values in attributes.items():
+            self.graph.nodes[node].update(values)
+        if self.page_requested:
+            self.render()
+
+    @Slot(str)
+    def layout_ready(self, key: str):
+        logger.debug(locals())
+        if self.drawing_pending:
+            self.draw_index()
+
+    def shutdown(self):
+        self.layouts.shutdown()
+        self.close_journal()
+
+    @Slot(bool)
+    def set_write_debug_html(self, enabled: bool):
+        logger.debug(locals())
+        self.write_debug_html = enabled
+
     @Slot()
     def draw_graph(self):
         logger.debug(locals())
@@ -68,57 +269,119 @@ class GraphWidget(QWidget):
     @Slot()
     def get_open_file_extensions(self):
         logger.debug(locals())
-        return ";;".join(
-            [
-                "Node Link Graph (*.json)",
-                "Adjacency Graph (*.json)",
-                "GraphML (.graphml)",
-                "LEDA (*.gw, *.lgr, *.leda)",
-                "Pajek (*.net)",
-            ]
-        )
+        from formats.registry import open_filters
+
+        return ";;".join(open_filters())
 
     @Slot()
     def get_save_file_extensions(self):
         logger.debug(locals())
-        return ";;".join(["Node Link Graph (*.json)", "Adjacency Graph (*.json)"])
+        from formats.registry import save_filters
+
+        return ";;".join(save_filters())
 
     @Slot(str, str)
     def open_file(self, path: str, file_type: str):
         logger.debug(locals())
-        if "json" in file_type.lower():
-            if "node link graph" in file_type.lower():
-                self.graph = networkx.node_link_graph(json.loads(pathlib.Path(path).read_text()))
-            elif "adjacency graph" in file_type.lower():
-                self.graph = networkx.adjacency_graph(json.loads(pathlib.Path(path).read_text()))
-            else:
-                raise NotImplementedError()
-        elif "graphml" in file_type.lower():
-            self.graph = networkx.read_graphml(path)
-        elif "leda" in file_type.lower():
-            self.graph = networkx.read_leda(path)
-        elif "pajek" in file_type.lower():
-            self.graph = networkx.read_pajek(path)
-        else:
-            raise NotImplementedError()
+        self.set_graph(self.read_file(path, file_type))
+
+    @Slot(object)
+    def set_graph(self, graph, saved: bool = True):
+        """
+        Shows a graph that was opened (saved) or made anew (not saved) with an empty undo history.
+        """
+        logger.debug(locals())
+        self.close_journal()
+        self.graph = graph
+        self.history.clear(saved)
+        self.history_changed.emit()
+
+    def start_journal(self, path: str, resume: bool = False):
+        """
+        Journals the edits from now on next to path, the saved file of the graph.
+        """
+        from journal import Journal
+
+        self.close_journal()
+        try:
+            self.journal = Journal(path, resume)
+        except OSError as e:
+            logger.error(f"Edits will not be journaled: {e}")
+
+    def close_journal(self, remove: bool = True):
+        """
+        Stops journaling; the journal is removed unless it should still be recovered.
+        """
+        if self.journal is not None:
+            self.journal.close(remove)
+            self.journal = None
+
+    def journal_step(self, description: str, operations):
+        if self.journal is None:
+            return
+        from journal import COMPACT_SIZE
+
+        try:
+            self.journal.append(description, operations)
+            if self.journal.size > COMPACT_SIZE:
+                self.journal.compact(self.graph)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Edits will not be journaled: {e}")
+            self.close_journal()
+
+    @contextlib.contextmanager
+    def edit(self, description: str):
+        """
+        Yields a history.Edit of the graph; its changes become one undo step.
+        """
+        with self.history.edit(self.graph, description) as edit:
+            yield edit
+        self.graph = edit.graph
+        if edit.redo:
+            self.journal_step(description, edit.redo)
+        self.history_changed.emit()
+
+    @Slot()
+    def undo(self):
+        logger.debug(locals())
+        if self.history.can_undo:
+            self.graph = self.history.undo(self.graph)
+            step = self.history.redo_steps[-1]
+            self.journal_step(f"Undo {step.description}", [o for group in reversed(step.undo) for o in group])
+            self.restored()
+
+    @Slot()
+    def redo(self):
+        logger.debug(locals())
+        if self.history.can_redo:
+            self.graph = self.history.redo(self.graph)
+            step = self.history.undo_steps[-1]
+            self.journal_step(f"Redo {step.description}", step.redo)
+            self.restored()
+
+    def restored(self):
+        self.graph_restored.emit()
+        self.history_changed.emit()
+        self.draw_graph()
+
+    @staticmethod
+    def read_file(path: str, file_type: str, progress=None):
+        """
+        Parses path into a networkx graph without touching any widget state, so it can run on a worker thread.
+        """
+        from formats.registry import read_graph
+
+        return read_graph(path, file_type, progress)
 
     @Slot(str, str)
     def save_file(self, path: str, file_type: str):
         logger.debug(locals())
         if not self.graph:
             raise ValueError("No graph to save!")
-        if "json" in file_type.lower():
-            if "node link graph" in file_type.lower():
-                with pathlib.Path(path).open("w") as file_p:
-                    data = networkx.node_link_data(self.graph)
-                    json.dump(data, file_p)
-                    del data
-            elif "adjacency graph" in file_type.lower():
-                with pathlib.Path(path).open("w") as file_p:
-                    data = networkx.adjacency_data(self.graph)
-                    json.dump(data, file_p)
-                    del data
-            else:
-                raise NotImplementedError()
-        else:
-            raise NotImplementedError()
+        from formats.registry import write_graph
+
+        write_graph(self.graph, path, file_type)
+        self.history.mark_saved()
+        self.history_changed.emit()
+        # The saved file is the new snapshot, so the journal starts over.
+        self.start_journal(path)
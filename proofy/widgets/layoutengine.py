@@ -0,0 +1,63 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from PySide2.QtCore import QObject, Signal, Slot
+
+from layout.algorithms import compute_layout
+from layout.cache import GraphArrays, Layout, LayoutCache, structural_hash
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class LayoutEngine(QObject):
+    """
+    Computes node positions in a worker process and caches them by the structural hash of the graph.
+    """
+
+    computed = Signal(str, object)
+    finished = Signal(str)
+
+    def __init__(self, *args, **kwargs):
+        super(LayoutEngine, self).__init__(*args, **kwargs)
+        self.cache = LayoutCache()
+        self.pending = {}
+        self.executor = None
+        self.computed.connect(self.store)
+
+    def layout(self, graph):
+        """
+        Returns the cached Layout for graph, or None after requesting one (finished is emitted when it is ready).
+        """
+        key = structural_hash(graph)
+        if (layout := self.cache.get(key)) is not None:
+            return layout
+        if key not in self.pending:
+            arrays = GraphArrays(graph)
+            initial, known = self.cache.seed(arrays)
+            logger.info(f"Computing {'incremental ' if known is not None else ''}layout for {len(arrays.nodes)} nodes")
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            future = self.executor.submit(
+                compute_layout, len(arrays.nodes), arrays.sources, arrays.targets, initial, known
+            )
+            self.pending[key] = arrays.nodes
+            future.add_done_callback(lambda f: self.computed.emit(key, f))
+        return None
+
+    @Slot(str, object)
+    def store(self, key, future):
+        nodes = self.pending.pop(key)
+        try:
+            coordinates = future.result()
+        except Exception as e:
+            logger.error(f"Layout failed, the page will lay out the graph itself: {e}")
+            coordinates = None
+        self.cache.put(key, Layout(nodes, coordinates))
+        self.finished.emit(key)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
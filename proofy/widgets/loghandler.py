@@ -1,16 +1,70 @@
+import collections
+import copy
 import logging
+import threading
+
+from PySide2.QtCore import QTimer
 
 from widgets.logsignals import LogSignals
 
 
 class LogHandler(logging.Handler):
+    """
+    Queues records from any thread and hands them to the slots in batches on a GUI thread timer.
+    When more than MAX_PENDING records are waiting, the oldest ones are dropped and counted.
+    """
+
+    FLUSH_INTERVAL_MS = 33
+    MAX_PENDING = 10000
+
     def __init__(self, *args, **kwargs):
         super(LogHandler, self).__init__(*args, **kwargs)
         self.signals = LogSignals()
+        self.pending = collections.deque()
+        self.pending_lock = threading.Lock()
+        self.dropped = 0
+        self.timer = QTimer(self.signals)
+        self.timer.setInterval(self.FLUSH_INTERVAL_MS)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
 
     def add_slots(self, *slots):
         for slot in slots:
             self.signals.log.connect(slot)
 
+    def add_batch_slots(self, *slots):
+        for slot in slots:
+            self.signals.batch.connect(slot)
+
     def emit(self, record):
-        self.signals.log.emit(self.format(record), record)
+        # Freeze the message now, the arguments (e.g. locals()) may change before the batch is formatted. The record
+        # is shared with the other handlers, so a copy is frozen.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        with self.pending_lock:
+            if len(self.pending) >= self.MAX_PENDING:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append(record)
+
+    def flush(self):
+        with self.pending_lock:
+            records = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+        if not records and not dropped:
+            return
+        batch = []
+        for record in records:
+            try:
+                batch.append((self.format(record), record))
+            except Exception:
+                self.handleError(record)
+        self.signals.batch.emit(batch, dropped)
+        for status, record in batch:
+            self.signals.log.emit(status, record)
+
+    def close(self):
+        self.timer.stop()
+        super(LogHandler, self).close()
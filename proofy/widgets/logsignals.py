@@ -5,3 +5,4 @@ from PySide2.QtCore import QObject, Signal
 
 class LogSignals(QObject):
     log = Signal(str, logging.LogRecord)
+    batch = Signal(list, int)
@@ -0,0 +1,113 @@
+import time
+from array import array
+
+import numpy
+
+
+class LogRecordStore:
+    """
+    Column oriented log records: level, logger and timestamp arrays plus one UTF-8 blob of messages.
+    Keeps a row index per level and per logger, so filters only touch the rows they select.
+    Once MAX_RECORDS are stored the oldest half is discarded (first tells how many rows went before row 0).
+    """
+
+    MAX_RECORDS = 1_000_000
+
+    def __init__(self):
+        self.first = 0
+        self.logger_names = []
+        self.logger_ids = {}
+        self.clear()
+
+    def clear(self):
+        self.levels = array("H")
+        self.loggers = array("I")
+        self.created = array("d")
+        self.message_offsets = array("Q", [0])
+        self.messages = bytearray()
+        self.level_index = {}
+        self.logger_index = {}
+
+    def __len__(self):
+        return len(self.levels)
+
+    def append(self, levelno: int, name: str, created: float, message: str):
+        """
+        Returns True if older records had to be discarded to make room.
+        """
+        compacted = len(self.levels) >= self.MAX_RECORDS
+        if compacted:
+            self.compact(self.MAX_RECORDS // 2)
+        row = len(self.levels)
+        if (logger := self.logger_ids.get(name)) is None:
+            logger = self.logger_ids[name] = len(self.logger_names)
+            self.logger_names.append(name)
+        self.levels.append(levelno)
+        self.loggers.append(logger)
+        self.created.append(created)
+        self.messages += message.encode("utf-8", "replace")
+        self.message_offsets.append(len(self.messages))
+        self.level_index.setdefault(levelno, array("I")).append(row)
+        self.logger_index.setdefault(logger, array("I")).append(row)
+        return compacted
+
+    def compact(self, keep: int):
+        start = len(self.levels) - keep
+        levels, loggers, created = self.levels[start:], self.loggers[start:], self.created[start:]
+        offsets = self.message_offsets[start:]
+        messages = self.messages[offsets[0] :]
+        self.clear()
+        self.first += start
+        self.levels, self.loggers, self.created, self.messages = levels, loggers, created, messages
+        self.message_offsets = array("Q", (numpy.frombuffer(offsets, dtype=numpy.uint64) - offsets[0]).tobytes())
+        for row, (levelno, logger) in enumerate(zip(levels, loggers)):
+            self.level_index.setdefault(levelno, array("I")).append(row)
+            self.logger_index.setdefault(logger, array("I")).append(row)
+
+    def message(self, row: int) -> str:
+        return self.messages[self.message_offsets[row] : self.message_offsets[row + 1]].decode("utf-8")
+
+    def logger_name(self, row: int) -> str:
+        return self.logger_names[self.loggers[row]]
+
+    def time(self, row: int) -> str:
+        created = self.created[row]
+        return time.strftime("%H:%M:%S", time.localtime(created)) + f".{int(created * 1000) % 1000:03d}"
+
+    def matches(self, row: int, min_level: int = 0, loggers=None, text: str = "") -> bool:
+        return (
+            self.levels[row] >= min_level
+            and (loggers is None or self.logger_names[self.loggers[row]] in loggers)
+            and (not text or text in self.message(row))
+        )
+
+    def select(self, min_level: int = 0, loggers=None, text: str = ""):
+        """
+        Rows with at least min_level, from one of the loggers (None for all) whose message contains text.
+        """
+        mask = None
+        if min_level > min(self.level_index, default=0):
+            mask = numpy.zeros(len(self), dtype=bool)
+            for levelno, rows in self.level_index.items():
+                if levelno >= min_level:
+                    mask[numpy.frombuffer(rows, dtype=numpy.uint32)] = True
+        if loggers is not None:
+            logger_mask = numpy.zeros(len(self), dtype=bool)
+            for name in loggers:
+                if (logger := self.logger_ids.get(name)) is not None and logger in self.logger_index:
+                    logger_mask[numpy.frombuffer(self.logger_index[logger], dtype=numpy.uint32)] = True
+            mask = logger_mask if mask is None else mask & logger_mask
+        if text:
+            text_mask = numpy.zeros(len(self), dtype=bool)
+            needle = text.encode("utf-8")
+            offsets = numpy.frombuffer(self.message_offsets, dtype=numpy.uint64)
+            position = self.messages.find(needle)
+            while position >= 0:
+                row = int(numpy.searchsorted(offsets, position, side="right")) - 1
+                text_mask[row] = True
+                position = self.messages.find(needle, max(int(offsets[row + 1]), position + 1))
+            del offsets
+            mask = text_mask if mask is None else mask & text_mask
+        if mask is None:
+            return array("I", range(len(self)))
+        return array("I", numpy.flatnonzero(mask).astype(numpy.uint32).tobytes())
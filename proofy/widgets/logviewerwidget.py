@@ -0,0 +1,192 @@
+import logging
+from array import array
+
+from PySide2 import QtGui
+from PySide2.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, Slot
+from PySide2.QtWidgets import (
+    QAbstractItemView,
+    QComboBox,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from widgets.loghandler import LogHandler
+from widgets.logstore import LogRecordStore
+
+
+class LogTableModel(QAbstractTableModel):
+    COLUMNS = ["Time", "Level", "Logger", "Message"]
+    COLORS = {
+        logging.DEBUG: QtGui.QColor("black"),
+        logging.INFO: QtGui.QColor("blue"),
+        logging.WARNING: QtGui.QColor("orange"),
+        logging.ERROR: QtGui.QColor("red"),
+        logging.CRITICAL: QtGui.QColor("purple"),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super(LogTableModel, self).__init__(*args, **kwargs)
+        self.store = LogRecordStore()
+        self.min_level = 0
+        self.loggers = None
+        self.text = ""
+        self.rows = array("I")
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return self.store.time(row)
+            elif column == 1:
+                return logging.getLevelName(self.store.levels[row])
+            elif column == 2:
+                return self.store.logger_name(row)
+            else:
+                return self.store.message(row).split("\n", 1)[0]
+        elif role == Qt.ToolTipRole and index.column() == 3:
+            return self.store.message(row)
+        elif role == Qt.ForegroundRole:
+            return self.COLORS.get(self.store.levels[row])
+        return None
+
+    def set_filter(self, min_level: int, loggers, text: str):
+        self.beginResetModel()
+        self.min_level, self.loggers, self.text = min_level, loggers, text
+        self.rows = self.store.select(min_level, loggers, text)
+        self.endResetModel()
+
+    def append(self, batch):
+        added = array("I")
+        for message, record in batch:
+            if self.store.append(record.levelno, record.name, record.created, message):
+                # The oldest half was discarded, so every row number changed.
+                self.set_filter(self.min_level, self.loggers, self.text)
+                added = array("I")
+            row = len(self.store) - 1
+            if self.store.matches(row, self.min_level, self.loggers, self.text):
+                added.append(row)
+        if added:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(added) - 1)
+            self.rows.extend(added)
+            self.endInsertRows()
+
+
+class LogViewerWidget(QWidget):
+    """
+    Log console built on a table model over a LogRecordStore; the view only renders the visible rows.
+    Attach loggers with add_loggers, extra per record slots with add_slots.
+    """
+
+    LEVELS = [logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL]
+
+    def __init__(self, *args, **kwargs):
+        super(LogViewerWidget, self).__init__(*args, **kwargs)
+        self.model = LogTableModel(self)
+
+        self.level_widget = QComboBox(self)
+        self.level_widget.setStatusTip("Minimum level of the shown records")
+        for level in self.LEVELS:
+            self.level_widget.addItem(logging.getLevelName(level), level)
+        self.logger_widget = QComboBox(self)
+        self.logger_widget.setStatusTip("Logger of the shown records")
+        self.logger_widget.addItem("All loggers", None)
+        self.search_widget = QLineEdit(self)
+        self.search_widget.setPlaceholderText("Search messages")
+        self.search_widget.setStatusTip("Only show records whose message contains this text")
+        self.count_widget = QLabel(self)
+        self.count_widget.setStatusTip(
+            "Records dropped while logging too fast, and the oldest records discarded to bound memory"
+        )
+        self.dropped = 0
+
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.level_widget.currentIndexChanged.connect(self.apply_filter)
+        self.logger_widget.currentIndexChanged.connect(self.apply_filter)
+        self.search_widget.textChanged.connect(self.filter_timer.start)
+
+        font = QtGui.QFont("Consolas")
+        font.setStyleHint(font.Monospace)
+        self.table_widget = QTableView(self)
+        self.table_widget.setFont(font)
+        self.table_widget.setModel(self.model)
+        self.table_widget.setWordWrap(False)
+        self.table_widget.setShowGrid(False)
+        self.table_widget.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_widget.verticalHeader().setVisible(False)
+        self.table_widget.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_widget.verticalHeader().setDefaultSectionSize(QtGui.QFontMetrics(font).height() + 4)
+        self.table_widget.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table_widget.horizontalHeader().setStretchLastSection(True)
+
+        self.handler = LogHandler()
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        self.handler.setLevel(logging.DEBUG)
+        self.handler.add_batch_slots(self.emit_batch)
+
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(self.level_widget)
+        toolbar.addWidget(self.logger_widget)
+        toolbar.addWidget(self.search_widget)
+        toolbar.addWidget(self.count_widget)
+        layout = QVBoxLayout()
+        layout.addLayout(toolbar)
+        layout.addWidget(self.table_widget)
+        self.setLayout(layout)
+        self.update_count()
+
+    def add_slots(self, *slots):
+        self.handler.add_slots(*slots)
+
+    def add_loggers(self, *loggers):
+        for log in loggers:
+            log.addHandler(self.handler)
+
+    @Slot()
+    def apply_filter(self):
+        self.filter_timer.stop()
+        name = self.logger_widget.currentData()
+        self.model.set_filter(
+            self.level_widget.currentData() or 0, None if name is None else {name}, self.search_widget.text()
+        )
+        self.update_count()
+
+    def update_count(self):
+        text = f"{self.model.rowCount()} of {len(self.model.store)} records"
+        if self.dropped:
+            text += f", {self.dropped} dropped"
+        if self.model.store.first:
+            text += f", {self.model.store.first} discarded"
+        self.count_widget.setText(text)
+
+    @Slot(list, int)
+    def emit_batch(self, batch, dropped):
+        scrollbar = self.table_widget.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        known = len(self.model.store.logger_names)
+        self.model.append(batch)
+        for name in self.model.store.logger_names[known:]:
+            self.logger_widget.addItem(name, name)
+        self.dropped += dropped
+        self.update_count()
+        if at_bottom:
+            self.table_widget.scrollToBottom()
@@ -0,0 +1,170 @@
+import logging
+
+from PySide2 import QtGui
+from PySide2.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, Slot
+from PySide2.QtWidgets import (
+    QAbstractItemView,
+    QComboBox,
+    QFileDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QPlainTextEdit,
+    QPushButton,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+import tracing
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class SpanTableModel(QAbstractTableModel):
+    COLUMNS = ["Span", "Count", "Total ms", "Mean ms", "Max ms", "Last ms"]
+
+    def __init__(self, *args, **kwargs):
+        super(SpanTableModel, self).__init__(*args, **kwargs)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        name, count, total, longest, last = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return name
+            elif column == 1:
+                return str(count)
+            return f"{[total, total / count, longest, last][column - 2] / 1e6:.1f}"
+        elif role == Qt.TextAlignmentRole and index.column() > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def set_rows(self, rows):
+        if rows != self.rows:
+            self.beginResetModel()
+            self.rows = rows
+            self.endResetModel()
+
+
+class PerformanceWidget(QWidget):
+    """
+    Time spent per span name over the spans still in the tracing ring buffer, refreshed while the dock is visible.
+    The spans can be exported as a Chrome trace, and the next run of a chosen span can be captured with cProfile.
+    """
+
+    REFRESH_INTERVAL_MS = 500
+    PROFILED = ["open", "parse", "graph build", "save", "draw", "serialize", "html", "level of detail"]
+
+    def __init__(self, *args, log_console, **kwargs):
+        super(PerformanceWidget, self).__init__(*args, **kwargs)
+        log_console.add_loggers(logger)
+        self.model = SpanTableModel(self)
+        self.profile_text = None
+
+        self.table_widget = QTableView(self)
+        self.table_widget.setModel(self.model)
+        self.table_widget.setShowGrid(False)
+        self.table_widget.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_widget.verticalHeader().setVisible(False)
+        self.table_widget.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table_widget.horizontalHeader().setStretchLastSection(True)
+
+        self.export_button_widget = QPushButton(text="Export Chrome Trace...", parent=self)
+        self.export_button_widget.setStatusTip("Save the recorded spans for chrome://tracing or ui.perfetto.dev")
+        self.export_button_widget.clicked.connect(self.export)
+        self.clear_button_widget = QPushButton(text="Clear", parent=self)
+        self.clear_button_widget.clicked.connect(self.clear)
+        self.profile_combobox_widget = QComboBox(self)
+        self.profile_combobox_widget.setEditable(True)
+        self.profile_combobox_widget.addItems(self.PROFILED)
+        self.profile_combobox_widget.setStatusTip("Span to capture with cProfile")
+        self.profile_button_widget = QPushButton(text="Profile Next", parent=self)
+        self.profile_button_widget.setCheckable(True)
+        self.profile_button_widget.setStatusTip("Run the next span with the chosen name under cProfile")
+        self.profile_button_widget.toggled.connect(self.profile_next)
+        self.save_profile_button_widget = QPushButton(text="Save Profile...", parent=self)
+        self.save_profile_button_widget.setEnabled(False)
+        self.save_profile_button_widget.clicked.connect(self.save_profile)
+
+        font = QtGui.QFont("Consolas")
+        font.setStyleHint(font.Monospace)
+        self.profile_widget = QPlainTextEdit(self)
+        self.profile_widget.setFont(font)
+        self.profile_widget.setReadOnly(True)
+        self.profile_widget.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.profile_widget.setPlaceholderText("Captured profiles are shown here")
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_INTERVAL_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(self.export_button_widget)
+        toolbar.addWidget(self.clear_button_widget)
+        toolbar.addStretch()
+        toolbar.addWidget(self.profile_combobox_widget)
+        toolbar.addWidget(self.profile_button_widget)
+        toolbar.addWidget(self.save_profile_button_widget)
+        layout = QVBoxLayout()
+        layout.addLayout(toolbar)
+        layout.addWidget(self.table_widget)
+        layout.addWidget(self.profile_widget)
+        self.setLayout(layout)
+
+    @Slot()
+    def refresh(self):
+        if not self.isVisible():
+            return
+        self.model.set_rows(tracing.summary())
+        if (text := tracing.last_profile()) is not None and text is not self.profile_text:
+            self.profile_text = text
+            self.profile_widget.setPlainText(text)
+            self.save_profile_button_widget.setEnabled(True)
+            self.profile_button_widget.setChecked(False)
+
+    @Slot()
+    def clear(self):
+        tracing.clear()
+        self.refresh()
+
+    @Slot(bool)
+    def profile_next(self, checked: bool):
+        name = self.profile_combobox_widget.currentText() if checked else None
+        tracing.profile_next(name)
+        if name:
+            logger.info(f"The next {name} span will be profiled")
+
+    @Slot()
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, caption=self.tr("Export Chrome Trace"), filter="Chrome Trace (*.json)"
+        )
+        if path:
+            try:
+                tracing.write_chrome_trace(path)
+                logger.info(f"Wrote {len(tracing.spans())} spans to {path}")
+            except OSError as e:
+                logger.error(e)
+
+    @Slot()
+    def save_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self, caption=self.tr("Save Profile"), filter="cProfile Stats (*.prof)")
+        if path:
+            try:
+                tracing.save_profile(path)
+            except (OSError, ValueError) as e:
+                logger.error(e)
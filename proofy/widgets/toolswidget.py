@@ -1,39 +1,51 @@
-from enum import Enum
+import logging
+import pathlib
+import sqlite3
 
+from PySide2.QtCore import QStandardPaths, QThreadPool, Slot
 from PySide2.QtGui import QStandardItemModel, QStandardItem
-from PySide2.QtWidgets import QWidget, QComboBox, QPushButton, QVBoxLayout, QLineEdit, QTableView, QFrame
+from PySide2.QtWidgets import (
+    QWidget,
+    QComboBox,
+    QPushButton,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLineEdit,
+    QTableView,
+    QFrame,
+    QLabel,
+    QCheckBox,
+)
 
+from logic.formula import Sequent, subterms, tree_size
+from logic.parser import FormulaSyntaxError, parse, parse_sequent, parse_substitution, turnstile
+from logic.symbols import MetalogicSymbols, PropositionalLogicSymbols, QuantifierSymbols
 from widgets.graphwidget import GraphWidget
+from widgets.worker import Worker
 
-
-class PropositionalLogicSymbols(Enum):
-    TRUE = "⊤"
-    FALSE = "⊥"
-    NOT = "¬"
-    AND = "∧"
-    OR = "∨"
-    IMPLIES = "→"
-
-
-class QuantifierSymbols(Enum):
-    FORALL = "∀"
-    EXISTS = "∃"
-
-
-class MetalogicSymbols(Enum):
-    ENTAILS_SYNTACTICALLY = "⊢"
-    ENTAILS_SEMANTICALLY = "⊨"
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+# The provers, checkers and graph rewriting (numpy, networkx) are imported when first used, not at startup.
+PARALLEL_LOGGER = "logic.parallel"
+LEMMA_FILE = "lemmas.sqlite3"
+# Matches listed by a search.
+FOUND_LIMIT = 20
 
 
 class ToolsWidget(QWidget):
-    def __init__(self, *args, graph_widget: GraphWidget, **kwargs):
+    def __init__(self, *args, graph_widget: GraphWidget, log_console, **kwargs):
         super(ToolsWidget, self).__init__(*args, **kwargs)
+        log_console.add_loggers(logger, logging.getLogger(PARALLEL_LOGGER))
 
         self.mode_combobox_widget = QComboBox(parent=self)
         self.setStatusTip("Mode")
-        self.mode_combobox_widget.addItems(["Axiom", "Well Formed Formula", "Substitution", "Inference Rule"])
+        self.mode_combobox_widget.addItems(["Axiom", "Well Formed Formula", "Substitution", "Inference Rule", "Find"])
         self.input_widget = QLineEdit(self)
         self.input_widget.setStatusTip("Input unicode text inside in this field.")
+        self.input_widget.returnPressed.connect(self.submit)
+        self.result_widget = QLabel(self)
+        self.result_widget.setWordWrap(True)
+        self.formula = None
 
         self.character_map_model = QStandardItemModel(self)
         symbols = [
@@ -49,17 +61,445 @@ class ToolsWidget(QWidget):
 
         self.draw_graph_button_widget = QPushButton(text="Draw Graph", parent=self)
         self.draw_graph_button_widget.clicked.connect(graph_widget.draw_graph)
+        self.graph_widget = graph_widget
+
+        self.prove_button_widget = QPushButton(text="Prove", parent=self)
+        self.prove_button_widget.setStatusTip("Search for a sequent calculus derivation of the input and draw it.")
+        self.prove_button_widget.clicked.connect(self.prove)
+        self.parallel_checkbox_widget = QCheckBox(text="Parallel", parent=self)
+        self.parallel_checkbox_widget.setStatusTip("Split the proof search over one process per core.")
+        self.cancel_button_widget = QPushButton(text="Cancel", parent=self)
+        self.cancel_button_widget.setEnabled(False)
+        self.cancel_button_widget.clicked.connect(self.cancel)
+        self.prover = None
+        self.prover_worker = None
+        self.proving = None
+
+        self.check_graph_button_widget = QPushButton(text="Check Validity", parent=self)
+        self.check_graph_button_widget.setStatusTip("Check every propositional node of the graph with truth tables.")
+        self.check_graph_button_widget.clicked.connect(self.check_graph)
+        self.checker_worker = None
+
+        self.verify_button_widget = QPushButton(text="Verify", parent=self)
+        self.verify_button_widget.setStatusTip(
+            "Check every inference step of the graph. Select a node to edit it; only the steps it affects are rechecked."
+        )
+        self.verify_button_widget.clicked.connect(self.verify)
+        self.verifier = None
+        self.verifier_worker = None
+        self.selected_node = None
+        graph_widget.node_selected.connect(self.select_node)
+        graph_widget.graph_restored.connect(self.graph_restored)
+
+        self.lemmas = None
+        self.node_index = None
+        self.index_worker = None
+        # Counts the changes of the graph, so that an index of an older graph is not used.
+        self.graph_version = 0
+        self.indexed_version = None
+        self.finding = None
+        graph_widget.history_changed.connect(self.graph_changed)
 
         # Layout
         layout = QVBoxLayout()
         layout.addWidget(self.input_widget)
+        layout.addWidget(self.result_widget)
         layout.addWidget(self.get_separator_widget())
         layout.addWidget(self.mode_combobox_widget)
         layout.addWidget(self.character_map_widget)
         layout.addWidget(self.get_separator_widget())
+        prove_layout = QHBoxLayout()
+        prove_layout.addWidget(self.prove_button_widget)
+        prove_layout.addWidget(self.parallel_checkbox_widget)
+        prove_layout.addWidget(self.cancel_button_widget)
+        layout.addLayout(prove_layout)
+        layout.addWidget(self.check_graph_button_widget)
+        layout.addWidget(self.verify_button_widget)
         layout.addWidget(self.draw_graph_button_widget)
         self.setLayout(layout)
 
+    @Slot()
+    def submit(self):
+        if self.mode_combobox_widget.currentText() == "Well Formed Formula":
+            self.parse_input()
+            if self.formula is not None and self.selected_node is not None:
+                self.replace_selected()
+            elif (
+                self.formula is not None
+                and turnstile(self.input_widget.text()) == MetalogicSymbols.ENTAILS_SEMANTICALLY.value
+            ):
+                self.check_entailment()
+        elif self.mode_combobox_widget.currentText() == "Substitution":
+            self.substitute()
+        elif self.mode_combobox_widget.currentText() == "Inference Rule":
+            self.apply_rule()
+        elif self.mode_combobox_widget.currentText() == "Find":
+            self.find(self.input_widget.text())
+
+    def parse_input(self):
+        try:
+            self.formula = parse(self.input_widget.text())
+        except FormulaSyntaxError as e:
+            self.formula = None
+            self.result_widget.setText(str(e))
+            logger.warning(e)
+            return
+        self.result_widget.setText(
+            f"{self.formula}\n{tree_size(self.formula)} symbols, {len(subterms(self.formula))} distinct subformulas"
+        )
+        logger.info(f"Parsed {self.formula!r}")
+
+    def substitute(self):
+        """
+        Applies "?A := formula, x := term, ..." to every node of the graph.
+        """
+        if self.graph_widget.graph is None:
+            return
+        if self.reading_graph():
+            self.result_widget.setText("The graph is being checked, substitute when the check has finished")
+            return
+        try:
+            pairs = parse_substitution(self.input_widget.text())
+        except FormulaSyntaxError as e:
+            self.result_widget.setText(str(e))
+            return
+        from logic.unify import substitution_mapping
+
+        with self.graph_widget.edit("Substitution") as edit:
+            edit.relabel(substitution_mapping(edit.graph, pairs))
+        self.graph_widget.draw_graph()
+        self.result_widget.setText(", ".join(f"{key} := {value}" for key, value in pairs))
+
+    def apply_rule(self):
+        """
+        Adds the conclusions of the rule "premises ⊢ conclusion" that follow from nodes of the graph.
+        """
+        if self.graph_widget.graph is None:
+            return
+        try:
+            rule = parse_sequent(self.input_widget.text())
+        except FormulaSyntaxError as e:
+            self.result_widget.setText(str(e))
+            return
+        if len(rule.succedent) != 1:
+            self.result_widget.setText("An inference rule has exactly one conclusion")
+            return
+        (conclusion,) = rule.succedent
+        if self.reading_graph():
+            self.result_widget.setText("The graph is being checked, apply the rule when the check has finished")
+            return
+        from logic.unify import apply_rule
+
+        with self.graph_widget.edit(f"Apply {rule}") as edit:
+            added = apply_rule(edit, list(rule.antecedent), conclusion, str(rule))
+        self.graph_widget.draw_graph()
+        self.result_widget.setText(f"Added {added} conclusions of {rule}")
+
+    def check_entailment(self):
+        from logic.semantics import counterexample
+
+        try:
+            valuation = counterexample(self.formula)
+        except ValueError as e:
+            self.result_widget.setText(str(e))
+            return
+        if valuation is None:
+            self.result_widget.setText(f"{self.formula} holds")
+        else:
+            values = ", ".join(f"{atom} = {int(value)}" for atom, value in valuation.items())
+            self.result_widget.setText(f"{self.formula} fails for {values}")
+
+    @Slot()
+    def check_graph(self):
+        if self.checker_worker is not None or self.graph_widget.graph is None:
+            return
+        from logic.semantics import check_graph
+
+        self.checker_worker = Worker(check_graph, self.graph_widget.graph)
+        self.checker_worker.signals.finished.connect(self.checking_finished)
+        self.checker_worker.signals.failed.connect(self.checking_failed)
+        self.check_graph_button_widget.setEnabled(False)
+        QThreadPool.globalInstance().start(self.checker_worker)
+
+    @Slot(object)
+    def checking_finished(self, results):
+        invalid = {node: valuation for node, valuation in results.items() if valuation is not None}
+        for node, valuation in invalid.items():
+            logger.warning(f"{node} fails for {valuation}")
+        self.result_widget.setText(f"{len(results) - len(invalid)} of {len(results)} checked nodes are valid")
+        self.checker_worker = None
+        self.check_graph_button_widget.setEnabled(True)
+
+    @Slot(object)
+    def checking_failed(self, e):
+        logger.error(e)
+        self.checker_worker = None
+        self.check_graph_button_widget.setEnabled(True)
+
+    def current_verifier(self):
+        """
+        The verifier of the graph on display, made anew when the graph was replaced.
+        """
+        if self.verifier is None or self.verifier.graph is not self.graph_widget.graph:
+            from logic.verifier import Verifier
+
+            self.verifier = Verifier(self.graph_widget.graph)
+            self.selected_node = None
+        return self.verifier
+
+    @Slot()
+    def verify(self):
+        if self.verifier_worker is not None or self.graph_widget.graph is None:
+            return
+        self.verifier_worker = Worker(self.current_verifier().verify)
+        self.verifier_worker.signals.finished.connect(self.verifying_finished)
+        self.verifier_worker.signals.failed.connect(self.verifying_failed)
+        self.verify_button_widget.setEnabled(False)
+        QThreadPool.globalInstance().start(self.verifier_worker)
+
+    @Slot(object)
+    def verifying_finished(self, changed):
+        self.verifier_worker = None
+        self.verify_button_widget.setEnabled(True)
+        if self.verifier is None or self.verifier.graph is not self.graph_widget.graph:
+            # Another graph was opened or proved meanwhile, which does not have these nodes.
+            self.result_widget.setText("The graph was replaced while it was verified, verify it again")
+            return
+        self.show_statuses(changed)
+
+    @Slot(object)
+    def verifying_failed(self, e):
+        logger.error(e)
+        self.result_widget.setText(f"Verification failed: {e}")
+        self.verifier_worker = None
+        self.verify_button_widget.setEnabled(True)
+
+    def show_statuses(self, changed):
+        self.graph_widget.set_node_attributes({node: {"status": status} for node, status in changed.items()})
+        counts = {}
+        for status in self.verifier.status.values():
+            counts[status] = counts.get(status, 0) + 1
+        self.result_widget.setText(", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+
+    @Slot(object)
+    def select_node(self, node):
+        self.selected_node = node
+        self.input_widget.setText(str(node))
+        self.mode_combobox_widget.setCurrentText("Well Formed Formula")
+        self.result_widget.setText(f"Editing {node}")
+
+    def replace_selected(self):
+        """
+        Replaces the selected node by the input and rechecks only the steps that depend on it.
+        """
+        new = str(self.formula)
+        if self.graph_widget.graph is None or self.selected_node not in self.graph_widget.graph:
+            self.selected_node = None
+            return
+        if new == self.selected_node:
+            return
+        if self.reading_graph():
+            self.result_widget.setText("The graph is being checked, edit it when the check has finished")
+            return
+        if new in self.graph_widget.graph:
+            self.result_widget.setText(f"{new} is already in the graph!")
+            return
+        verifier = self.current_verifier()
+        old, self.selected_node = self.selected_node, None
+        try:
+            with self.graph_widget.edit(f"Edit {old}") as edit:
+                # Recorded before the verifier renames the node, so that the renaming is rolled back if checking fails.
+                edit.record(("relabel", {old: new}), ("relabel", {new: old}))
+                changed = verifier.replace_node(old, new)
+        except ValueError as e:
+            self.verifier = None
+            self.result_widget.setText(str(e))
+            return
+        # The edit dropped the verifier, but this one has followed it.
+        self.verifier = verifier
+        self.selected_node = new
+        self.graph_widget.draw_graph()
+        self.show_statuses(changed)
+
+    def lemma_store(self):
+        """
+        The store of proved sequents in the app data folder, opened on first use, or None if it cannot be opened.
+        """
+        if self.lemmas is None:
+            from logic.lemmas import LemmaStore
+
+            path = pathlib.Path(QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)) / LEMMA_FILE
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.lemmas = LemmaStore(path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not open the lemma store {path}: {e}")
+        return self.lemmas
+
+    @Slot()
+    def graph_changed(self):
+        """
+        Every edit, undo and redo changes the graph in place or replaces it, so the caches of the verifier and the
+        index of the nodes no longer hold.
+        """
+        self.verifier = None
+        self.node_index = None
+        self.graph_version += 1
+
+    def find(self, fragment: str):
+        """
+        Lists the nodes of the graph and the stored lemmas whose text contains fragment. The nodes are indexed on a
+        worker thread after every change of the graph, and the search runs when the index is ready.
+        """
+        if not (fragment := fragment.strip()):
+            return
+        if self.node_index is None and self.graph_widget.graph is not None:
+            self.finding = fragment
+            if self.index_worker is None:
+                from logic.lemmas import index_texts
+
+                self.indexed_version = self.graph_version
+                self.index_worker = Worker(index_texts, [(node, str(node)) for node in self.graph_widget.graph])
+                self.index_worker.signals.finished.connect(self.indexing_finished)
+                self.index_worker.signals.failed.connect(self.indexing_failed)
+                self.result_widget.setText(f"Indexing {self.graph_widget.graph.number_of_nodes()} nodes...")
+                QThreadPool.globalInstance().start(self.index_worker)
+            return
+        nodes = self.node_index.search(fragment, FOUND_LIMIT) if self.node_index is not None else []
+        lemmas = []
+        if (store := self.lemma_store()) is not None:
+            try:
+                lemmas = store.search(fragment, FOUND_LIMIT)
+            except sqlite3.Error as e:
+                logger.error(e)
+        lines = [f"{len(nodes)} nodes and {len(lemmas)} lemmas contain {fragment}"]
+        lines.extend(f"Node: {node}" for node in nodes)
+        lines.extend(f"Lemma: {lemma}" for lemma in lemmas)
+        self.result_widget.setText("\n".join(lines))
+
+    @Slot(object)
+    def indexing_finished(self, index):
+        self.index_worker = None
+        # After an edit while indexing the index is stale already, and find indexes again.
+        self.node_index = index if self.indexed_version == self.graph_version else None
+        fragment, self.finding = self.finding, None
+        if fragment is not None:
+            self.find(fragment)
+
+    @Slot(object)
+    def indexing_failed(self, e):
+        logger.error(e)
+        self.result_widget.setText(f"Indexing failed: {e}")
+        self.index_worker = None
+        self.finding = None
+
+    @Slot()
+    def graph_restored(self):
+        """
+        Undo and redo may have removed the selected node.
+        """
+        self.selected_node = None
+
+    def reading_graph(self):
+        """
+        Whether a check of the graph runs on a worker thread, so the graph must not change.
+        """
+        return self.checker_worker is not None or self.verifier_worker is not None
+
+    @Slot()
+    def prove(self):
+        if self.prover_worker is not None:
+            return
+        self.parse_input()
+        if self.formula is None:
+            return
+        self.proving = self.formula if isinstance(self.formula, Sequent) else Sequent([], [self.formula])
+        if (lemmas := self.lemma_store()) is not None:
+            try:
+                derivation = lemmas.get(self.proving)
+            except (sqlite3.Error, ValueError) as e:
+                logger.error(f"Could not read the lemma store: {e}")
+                derivation = None
+            if derivation is not None:
+                logger.info(f"Found {self.proving} in the lemma store")
+                self.show_derivation(derivation)
+                self.proving = None
+                return
+        from logic.parallel import ParallelProver
+        from logic.prover import Prover
+
+        self.prover = ParallelProver() if self.parallel_checkbox_widget.isChecked() else Prover()
+        self.prover_worker = Worker(self.prover.prove, self.proving)
+        self.prover_worker.signals.finished.connect(self.proving_finished)
+        self.prover_worker.signals.failed.connect(self.proving_failed)
+        self.prover_worker.signals.cancelled.connect(self.proving_cancelled)
+        self.prove_button_widget.setEnabled(False)
+        self.cancel_button_widget.setEnabled(True)
+        self.result_widget.setText(f"Proving {self.proving}...")
+        QThreadPool.globalInstance().start(self.prover_worker)
+
+    @Slot()
+    def cancel(self):
+        if self.prover_worker is not None:
+            self.prover_worker.cancel()
+
+    @Slot(object)
+    def proving_finished(self, derivation):
+        logger.info(f"Explored {self.prover.explored} sequents for {self.proving}")
+        if derivation is None:
+            self.result_widget.setText(f"No derivation found for {self.proving}")
+        else:
+            if (lemmas := self.lemma_store()) is not None:
+                try:
+                    lemmas.add(derivation)
+                except sqlite3.Error as e:
+                    logger.error(f"Could not store the lemma {self.proving}: {e}")
+            self.show_derivation(derivation)
+        self.stop_proving()
+
+    def show_derivation(self, derivation):
+        from logic.prover import derivation_graph
+
+        if self.reading_graph():
+            self.result_widget.setText(
+                f"Proved {derivation.sequent}, prove it again to draw it when the check of the graph has finished"
+            )
+            return
+        self.result_widget.setText(f"Proved {derivation.sequent}")
+        with self.graph_widget.edit(f"Prove {derivation.sequent}") as edit:
+            edit.replace(derivation_graph(derivation))
+        self.graph_widget.draw_graph()
+
+    @Slot(object)
+    def proving_failed(self, e):
+        logger.error(e)
+        self.result_widget.setText(f"Proof search failed: {e}")
+        self.stop_proving()
+
+    @Slot()
+    def proving_cancelled(self):
+        logger.info(f"Cancelled proving {self.proving}")
+        self.result_widget.setText(f"Cancelled proving {self.proving}")
+        self.stop_proving()
+
+    def stop_proving(self):
+        self.prover = None
+        self.prover_worker = None
+        self.proving = None
+        self.prove_button_widget.setEnabled(True)
+        self.cancel_button_widget.setEnabled(False)
+
+    def shutdown(self):
+        self.cancel()
+        if self.checker_worker is not None:
+            self.checker_worker.cancel()
+        if self.verifier_worker is not None:
+            self.verifier_worker.cancel()
+        if self.index_worker is not None:
+            self.index_worker.cancel()
+        if self.lemmas is not None:
+            self.lemmas.close()
+
     def get_separator_widget(self):
         separator = QFrame(self)
         separator.setFrameShape(QFrame.HLine)
@@ -0,0 +1,54 @@
+import threading
+
+from PySide2.QtCore import QObject, QRunnable, Signal
+
+
+class WorkerCancelled(Exception):
+    pass
+
+
+class WorkerSignals(QObject):
+    progress = Signal(float)
+    finished = Signal(object)
+    failed = Signal(object)
+    cancelled = Signal()
+
+
+class Worker(QRunnable):
+    """
+    Runs fn(*args, progress=..., **kwargs) on a QThreadPool thread.
+    The result is only handed back (through signals.finished) once fn has returned.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super(Worker, self).__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.cancel_event = threading.Event()
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report(self, fraction: float):
+        if self.cancel_event.is_set():
+            raise WorkerCancelled()
+        self.signals.progress.emit(fraction)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, progress=self.report, **self.kwargs)
+        except WorkerCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            if self.cancel_event.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# The application modules import each other relative to the proofy directory (e.g. "from widgets.x import y").
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "proofy"))
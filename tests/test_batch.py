@@ -0,0 +1,53 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+import networkx
+import pytest
+
+import batch
+from formats.registry import find_format, read_graph, write_graph
+from logic.parser import parse_sequent
+from logic.prover import derivation_graph, prove
+
+
+def test_registry_round_trip(tmp_path):
+    graph = derivation_graph(prove(parse_sequent("p ∧ q ⊢ q ∧ p")))
+    for name in ["Node Link Graph", "Adjacency Graph", "Proofy Binary Graph"]:
+        path = tmp_path / f"graph{find_format(name).extensions[0]}"
+        write_graph(graph, path, name)
+        assert networkx.utils.graphs_equal(read_graph(path, f"{name} (*)"), graph)
+    assert find_format(path=tmp_path / "graph.JSON").name == "Node Link Graph"
+
+
+def test_read_graph_tells_json_formats_apart(tmp_path):
+    graph = derivation_graph(prove(parse_sequent("p ∧ q ⊢ q ∧ p")))
+    for name in ["Node Link Graph", "Adjacency Graph"]:
+        write_graph(graph, tmp_path / "graph.json", name)
+        assert find_format(path=tmp_path / "graph.json", sniff=True).name == name
+        assert networkx.utils.graphs_equal(read_graph(tmp_path / "graph.json"), graph)
+    (tmp_path / "graph.json").write_text('{"directed": true, "nodes": [{"id": "p"}]}')
+    with pytest.raises(ValueError, match="--from"):
+        read_graph(tmp_path / "graph.json")
+
+
+def test_batch(tmp_path, capsys):
+    graph = derivation_graph(prove(parse_sequent("p ∧ q ⊢ q ∧ p")))
+    write_graph(graph, tmp_path / "good.json")
+    networkx.relabel_nodes(graph, {"p, q ⊢ p": "p, q ⊢ r"}, copy=False)
+    write_graph(graph, tmp_path / "bad.json")
+    (tmp_path / "broken.json").write_text("{")
+    paths = [str(tmp_path / name) for name in ["good.json", "bad.json", "broken.json"]]
+    assert batch.main(["verify", "-j", "1", *paths]) == 1
+    results = {pathlib.Path(r["path"]).name: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert results["good.json"]["ok"] and results["good.json"]["statuses"] == {"valid": 4}
+    assert "p, q ⊢ r" in results["bad.json"]["invalid"] and not results["bad.json"]["ok"]
+    assert "error" in results["broken.json"]
+    assert batch.main(["convert", "-j", "2", "--to", "Proofy Binary Graph", paths[0]]) == 0
+    assert networkx.utils.graphs_equal(read_graph(tmp_path / "good.pgb"), read_graph(paths[0]))
+
+
+def test_batch_does_not_import_qt():
+    code = "import sys, batch; batch.verify; assert not [m for m in sys.modules if m.startswith('PySide2')]"
+    subprocess.run([sys.executable, "-c", code], cwd=pathlib.Path(batch.__file__).parent, check=True)
@@ -0,0 +1,24 @@
+import importlib.util
+import pathlib
+
+import networkx
+
+spec = importlib.util.spec_from_file_location("run", pathlib.Path(__file__).parent.parent / "benchmarks" / "run.py")
+run = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(run)
+
+
+def test_proof_dag():
+    graph = run.proof_dag(500)
+    assert graph.number_of_nodes() == 500 and networkx.is_directed_acyclic_graph(graph)
+    assert run.proof_dag(500).edges == graph.edges
+
+
+def test_benchmarks_run(capsys):
+    results = run.run_all([200], ["read LEDA", "write Proofy Binary Graph", "draw update"], repeat=1)
+    assert set(results) == {"read LEDA/200", "write Proofy Binary Graph/200", "draw update/200"}
+    baseline = {
+        key: {"seconds": result["seconds"] / 4, "peak_bytes": result["peak_bytes"]} for key, result in results.items()
+    }
+    assert len(run.compare(results, baseline)) == 3
+    assert run.compare(results, results) == []
@@ -0,0 +1,241 @@
+import io
+import json
+import os
+import pathlib
+import stat
+
+import networkx
+import pytest
+
+from formats.binarygraph import BinaryGraph, read_binary_graph, write_binary_graph
+from formats.jsonstream import (
+    UMASK,
+    atomic_writer,
+    read_adjacency_json,
+    read_node_link_json,
+    top_level_keys,
+    write_adjacency_json,
+    write_node_link_json,
+)
+from formats.merge import graph_files, merge_files
+from logic.parser import parse_sequent
+from logic.prover import derivation_graph, prove
+from logic.verifier import VALID, Verifier
+
+
+def proof_graph(graph_class):
+    graph = graph_class(name="proof", logic="propositional")
+    graph.add_node("p", formula="p", rule="assumption")
+    graph.add_node("p → q", formula="p → q", rule="assumption")
+    graph.add_node(("q", 1), formula="q", rule="→E")
+    graph.add_node(7)
+    graph.add_edge("p", ("q", 1), weight=1.5)
+    graph.add_edge("p → q", ("q", 1))
+    if graph.is_multigraph():
+        graph.add_edge("p → q", ("q", 1), key="again", label="twice")
+    return graph
+
+
+def node_link_data(graph):
+    try:
+        return networkx.node_link_data(graph, edges="links")
+    except TypeError:
+        return networkx.node_link_data(graph)
+
+
+GRAPH_CLASSES = [networkx.Graph, networkx.DiGraph, networkx.MultiGraph, networkx.MultiDiGraph]
+
+
+@pytest.mark.parametrize("graph_class", GRAPH_CLASSES)
+def test_write_node_link_json_matches_json_dump(graph_class, tmp_path):
+    graph = proof_graph(graph_class)
+    path = tmp_path / "graph.json"
+    with atomic_writer(path) as file_p:
+        write_node_link_json(graph, file_p)
+    assert path.read_text() == json.dumps(node_link_data(graph))
+
+
+@pytest.mark.parametrize("graph_class", GRAPH_CLASSES)
+def test_write_adjacency_json_matches_json_dump(graph_class, tmp_path):
+    graph = proof_graph(graph_class)
+    path = tmp_path / "graph.json"
+    with atomic_writer(path) as file_p:
+        write_adjacency_json(graph, file_p)
+    assert path.read_text() == json.dumps(networkx.adjacency_data(graph))
+
+
+def test_atomic_writer_keeps_original_on_error(tmp_path):
+    path = tmp_path / "graph.json"
+    path.write_text("original")
+    with pytest.raises(TypeError):
+        with atomic_writer(path) as file_p:
+            graph = networkx.DiGraph()
+            graph.add_node("p", formula=object())
+            write_node_link_json(graph, file_p)
+    assert path.read_text() == "original"
+    assert [p.name for p in tmp_path.iterdir()] == ["graph.json"]
+
+
+def test_atomic_writer_keeps_permissions(tmp_path):
+    path = tmp_path / "graph.json"
+    with atomic_writer(path) as file_p:
+        file_p.write("new")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~UMASK
+    os.chmod(path, 0o640)
+    with atomic_writer(path) as file_p:
+        file_p.write("replaced")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640 and path.read_text() == "replaced"
+
+
+def assert_same_graph(graph, expected):
+    assert type(graph) is type(expected)
+    assert graph.graph == expected.graph
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+    if expected.is_multigraph():
+        assert sorted(map(repr, graph.edges(keys=True, data=True))) == sorted(
+            map(repr, expected.edges(keys=True, data=True))
+        )
+    else:
+        assert sorted(map(repr, graph.edges(data=True))) == sorted(map(repr, expected.edges(data=True)))
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 1 << 20])
+@pytest.mark.parametrize("graph_class", GRAPH_CLASSES)
+def test_read_node_link_json_round_trip(graph_class, block_size):
+    graph = proof_graph(graph_class)
+    text = json.dumps(node_link_data(graph), indent=2)
+    assert_same_graph(read_node_link_json(io.BytesIO(text.encode()), block_size), graph)
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 1 << 20])
+@pytest.mark.parametrize("graph_class", GRAPH_CLASSES)
+def test_read_adjacency_json_round_trip(graph_class, block_size):
+    graph = proof_graph(graph_class)
+    text = json.dumps(networkx.adjacency_data(graph))
+    assert_same_graph(read_adjacency_json(io.BytesIO(text.encode()), block_size), graph)
+
+
+def test_read_node_link_json_with_graph_type_after_arrays():
+    text = '\ufeff{"nodes": [{"id": 12345}, {"id": [1, [2]]}], "edges": [{"source": 12345, "target": [1, [2]]}], "directed": true}'
+    graph = read_node_link_json(io.BytesIO(text.encode()), 3)
+    assert isinstance(graph, networkx.MultiDiGraph)
+    assert list(graph.nodes) == [12345, (1, (2,))]
+    assert list(graph.edges) == [(12345, (1, (2,)), 0)]
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 5])
+def test_read_json_numbers_across_blocks(block_size):
+    text = (
+        '{"directed": true, "multigraph": false, "graph": {"w": 12.5, "e": 3e5, "n": -1.25E-3}, '
+        '"nodes": [{"id": 12.5}, {"id": 3e5}], "links": [{"source": 12.5, "target": 3e5, "weight": 1e-7}]}'
+    )
+    graph = read_node_link_json(io.BytesIO(text.encode()), block_size)
+    assert graph.graph == {"w": 12.5, "e": 3e5, "n": -1.25e-3}
+    assert list(graph.edges(data=True)) == [(12.5, 3e5, {"weight": 1e-7})]
+    text = '{"size": 12.5, "scale": 3E+5, "links": []}'
+    assert list(top_level_keys(io.BytesIO(text.encode()), block_size)) == ["size", "scale", "links"]
+
+
+def test_read_node_link_json_truncated():
+    with pytest.raises(json.JSONDecodeError):
+        read_node_link_json(io.BytesIO(b'{"directed": true, "multigraph": false, "nodes": [{"id": 1}'), 4)
+
+
+@pytest.mark.parametrize("graph_class", GRAPH_CLASSES)
+def test_binary_graph_round_trip(graph_class, tmp_path):
+    graph = proof_graph(graph_class)
+    path = tmp_path / "graph.pgb"
+    with atomic_writer(path, "wb") as file_p:
+        write_binary_graph(graph, file_p)
+    assert_same_graph(read_binary_graph(path), graph)
+
+
+def test_binary_graph_interns_and_decodes_lazily(tmp_path):
+    graph = networkx.DiGraph()
+    for i in range(100):
+        graph.add_node(i, formula="p → (q → p)", rule="axiom", depth=i % 3, premises=[i])
+        if i:
+            graph.add_edge(i - 1, i, rule="→E")
+    path = tmp_path / "graph.pgb"
+    with atomic_writer(path, "wb") as file_p:
+        write_binary_graph(graph, file_p)
+    with BinaryGraph(path) as binary_graph:
+        assert (len(binary_graph), binary_graph.edge_count) == (100, 99)
+        assert binary_graph.directed and not binary_graph.multigraph
+        # formula, rule, "→E", the attribute keys, 3 depths, 100 ids and 100 premise lists.
+        assert len(binary_graph.string_offsets) - 1 < 220
+        assert binary_graph.values == {}
+        assert binary_graph.node_attributes(5) == {
+            "formula": "p → (q → p)",
+            "rule": "axiom",
+            "depth": 2,
+            "premises": [5],
+        }
+        assert list(binary_graph.successors(5)) == [6]
+        assert binary_graph.edge_attributes(binary_graph.edges(5)[0]) == {"rule": "→E"}
+        assert binary_graph.node_attributes(5)["premises"] is not binary_graph.node_attributes(5)["premises"]
+
+
+def test_binary_graph_rejects_other_files(tmp_path):
+    path = tmp_path / "graph.pgb"
+    path.write_bytes(b"{}" * 100)
+    with pytest.raises(ValueError):
+        BinaryGraph(path)
+    with atomic_writer(path, "wb") as file_p:
+        write_binary_graph(networkx.DiGraph([("p", "q")]), file_p)
+    data = bytearray(path.read_bytes())
+    data[8:12] = (2).to_bytes(4, "little")
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="version 2"):
+        BinaryGraph(path)
+
+
+def test_merge_files(tmp_path):
+    first = networkx.DiGraph()
+    first.add_node("a", formula="p")
+    first.add_node("b", formula="p → q ∨ r")
+    first.add_edge("a", "b", rule="∨R")
+    first.add_node(7, label="not a formula")
+    second = networkx.DiGraph()
+    second.add_node("c", formula="p -> (q | r)")
+    second.add_edge("c", "s", rule="MP")
+    second.add_node(7)
+    write_node_link_json_path(first, tmp_path / "a.json")
+    write_node_link_json_path(second, tmp_path / "lemmas" / "b.json")
+    (tmp_path / "lemmas" / "broken.json").write_text("[")
+    paths = graph_files(tmp_path)
+    assert [pathlib.Path(path).name for path in paths] == ["a.json", "b.json", "broken.json"]
+    graph, report = merge_files(paths, workers=2)
+    assert set(graph.nodes) == {"a", "b", "s", 7, "7 [b]"}
+    assert set(graph.edges) == {("a", "b"), ("b", "s")}
+    assert graph.nodes[7] == {"label": "not a formula"}
+    assert (report.files, report.nodes_read, report.nodes) == (2, 6, 5)
+    assert [pathlib.Path(path).name for path, _ in report.failed] == ["broken.json"]
+
+
+def test_merge_files_keeps_plain_ids_apart(tmp_path):
+    # Plain ids parse as atoms, but only a formula attribute makes nodes of different files the same.
+    write_node_link_json_path(networkx.DiGraph([("n1", "n2")]), tmp_path / "a.json")
+    write_node_link_json_path(networkx.DiGraph([("n1", "n3")]), tmp_path / "b.json")
+    graph, report = merge_files(graph_files(tmp_path), workers=1)
+    assert set(graph.edges) == {("n1", "n2"), ("n1 [b]", "n3")}
+    assert (report.nodes_read, report.nodes) == (4, 4)
+
+
+def test_merge_proof_graphs(tmp_path):
+    # Proofy's proof graphs have sequents as ids, which are shared between files.
+    proof = derivation_graph(prove(parse_sequent("p ∧ q ⊢ q ∧ p")))
+    write_node_link_json_path(proof, tmp_path / "a.json")
+    write_node_link_json_path(proof, tmp_path / "c.json")
+    graph, report = merge_files(graph_files(tmp_path), workers=1)
+    assert set(graph.nodes) == set(proof.nodes) and set(graph.edges) == set(proof.edges)
+    assert (report.nodes_read, report.nodes) == (2 * len(proof), len(proof))
+    verifier = Verifier(graph)
+    verifier.verify()
+    assert set(verifier.status.values()) == {VALID}
+
+
+def write_node_link_json_path(graph, path):
+    path.parent.mkdir(exist_ok=True)
+    with atomic_writer(path) as file_p:
+        write_node_link_json(graph, file_p)
@@ -0,0 +1,29 @@
+import json
+
+import networkx
+
+from widgets.graphdiff import RenderedGraph
+
+
+def test_diff_sends_only_changes():
+    graph = networkx.MultiDiGraph()
+    graph.add_node("p", formula="p")
+    graph.add_node(("q", 1), formula="q")
+    graph.add_edge("p", ("q", 1))
+    rendered = RenderedGraph()
+
+    first = json.loads(rendered.diff(graph))
+    assert [node["id"] for node in first["addNodes"]] == ["p", ["q", 1]]
+    assert first["addLinks"] == [{"source": '"p"', "target": '["q", 1]', "__key": '["p", ["q", 1], 0]', "key": 0}]
+    assert rendered.diff(graph) is None
+
+    graph.nodes["p"]["formula"] = "p ∧ p"
+    graph.remove_node(("q", 1))
+    graph.add_node("r")
+    second = json.loads(rendered.diff(graph))
+    assert second["updateNodes"] == [{"formula": "p ∧ p", "id": "p", "__key": '"p"'}]
+    assert second["addNodes"] == [{"id": "r", "__key": '"r"'}]
+    assert second["removeNodes"] == ['["q", 1]']
+    assert second["removeLinks"] == ['["p", ["q", 1], 0]']
+
+    assert json.loads(rendered.diff(None))["removeNodes"] == ['"p"', '"r"']
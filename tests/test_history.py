@@ -0,0 +1,70 @@
+import networkx
+import pytest
+
+from history import History
+from logic.parser import parse
+from logic.unify import apply_rule
+
+
+def snapshot(graph):
+    return sorted(graph.nodes(data=True), key=str), sorted(graph.edges(data=True), key=str)
+
+
+def test_undo_redo():
+    graph = networkx.DiGraph()
+    graph.add_edge("p", "p ∨ q", rule="∨I")
+    history = History()
+    states = [snapshot(graph)]
+    with history.edit(graph, "Apply rule") as edit:
+        assert apply_rule(edit, [parse("?A")], parse("?A ∧ ?A"), "∧I") == 2
+    states.append(snapshot(graph))
+    with history.edit(graph, "Substitution") as edit:
+        edit.relabel({"p": "r", "p ∨ q": "r ∨ q", "p ∧ p": "p ∧ p"})
+    states.append(snapshot(graph))
+    with history.edit(graph, "Remove") as edit:
+        edit.remove_node("r")
+    states.append(snapshot(graph))
+    assert "r" not in graph and history.undo_text == "Remove"
+
+    for state in reversed(states[:-1]):
+        graph = history.undo(graph)
+        assert snapshot(graph) == state
+    assert not history.can_undo and not history.modified
+    for state in states[1:]:
+        graph = history.redo(graph)
+        assert snapshot(graph) == state
+    assert history.modified
+
+
+def test_replace_and_rollback():
+    graph = networkx.MultiDiGraph([("a", "b"), ("a", "b")])
+    history = History()
+    with history.edit(graph, "Prove") as edit:
+        edit.replace(networkx.DiGraph([("c", "d")]))
+    assert edit.graph is not graph and history.undo(edit.graph) is graph
+    with pytest.raises(KeyError):
+        with history.edit(graph, "Broken") as edit:
+            edit.add_edge("b", "c", label="x")
+            edit.relabel({"a": "b"})
+            raise KeyError("c")
+    assert edit.graph is graph and sorted(graph.edges(keys=True)) == [("a", "b", 0), ("a", "b", 1)]
+    assert history.redo_text == "Prove"
+
+
+def test_budget_and_saved():
+    graph = networkx.DiGraph()
+    history = History(budget=2000)
+    for i in range(100):
+        with history.edit(graph, f"Add {i}") as edit:
+            edit.add_node(str(i))
+    assert 0 < history.size <= 2000 and 1 < len(history.undo_steps) < 100
+    history.mark_saved()
+    graph = history.undo(graph)
+    assert history.modified and "99" not in graph
+    graph = history.redo(graph)
+    assert not history.modified
+    graph = history.undo(graph)
+    with history.edit(graph, "Other") as edit:
+        edit.add_node("x")
+    # The saved state can no longer be reached.
+    assert history.modified and history.saved is None and not history.can_redo
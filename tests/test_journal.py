@@ -0,0 +1,58 @@
+import networkx
+
+from formats.registry import read_graph, write_graph
+from history import History
+from journal import Journal, journal_path, recoverable, replay
+
+
+def edges(graph):
+    return sorted(graph.edges(data=True), key=str)
+
+
+def test_journal_replay(tmp_path):
+    path = tmp_path / "proof.json"
+    graph = networkx.DiGraph([("p", "p ∨ q")])
+    write_graph(graph, path, "Node Link Graph")
+    history = History()
+    journal = Journal(path, interval=0)
+    with history.edit(graph, "Add") as edit:
+        edit.add_edge(("t", 1), "p", rule="r")
+    journal.append("Add", edit.redo)
+    journal.compact(graph)
+    with history.edit(graph, "Rename") as edit:
+        edit.relabel({"p": "r"})
+    journal.append("Rename", edit.redo)
+    graph = history.undo(graph)
+    journal.append("Undo Rename", [o for group in reversed(history.redo_steps[-1].undo) for o in group])
+    with history.edit(graph, "Prove") as edit:
+        edit.replace(networkx.MultiDiGraph([("a", "b"), ("a", "b")]))
+    journal.append("Prove", edit.redo)
+    journal.sync()
+    # Cut off as in a crash while writing the last step.
+    with open(journal_path(path), "a", encoding="utf-8") as file_p:
+        file_p.write('{"step": "Torn", "operations": [["remove')
+    journal.close()
+
+    assert recoverable(path) == 4
+    recovered = replay(path, read_graph(path))
+    assert recovered.is_multigraph() and sorted(recovered.edges(keys=True)) == [("a", "b", 0), ("a", "b", 1)]
+
+    # Only the snapshot, which counts the steps before it, and the steps after it are kept after a compaction.
+    journal = Journal(path, resume=True, interval=0)
+    journal.compact(graph)
+    journal.close()
+    assert recoverable(path) == 4 and edges(replay(path, read_graph(path))) == edges(graph)
+
+
+def test_journal_base(tmp_path):
+    path = tmp_path / "proof.json"
+    write_graph(networkx.DiGraph([("p", "q")]), path, "Node Link Graph")
+    journal = Journal(path, interval=0)
+    journal.append("Add", [("add_node", "r", {})])
+    journal.close()
+    assert recoverable(path) == 1
+    write_graph(networkx.DiGraph([("p", "q"), ("q", "s")]), path, "Node Link Graph")
+    assert recoverable(path) == 0
+    journal = Journal(path)
+    journal.close(remove=True)
+    assert not journal_path(path).exists() and recoverable(path) == 0
@@ -0,0 +1,81 @@
+import networkx
+import numpy
+
+from layout.algorithms import compute_layout, longest_path_layers
+from layout.cache import GraphArrays, Layout, LayoutCache, structural_hash
+from layout.lod import CLUSTER, LevelOfDetail, sub_proof_clusters
+
+
+def test_layered_layout_puts_premises_above_conclusions():
+    graph = networkx.DiGraph([("p", "p ∧ q"), ("q", "p ∧ q"), ("p ∧ q", "q ∧ p"), ("r", "q ∧ p")])
+    arrays = GraphArrays(graph)
+    positions = compute_layout(len(arrays.nodes), arrays.sources, arrays.targets)
+    y = dict(zip(arrays.nodes, positions[:, 1]))
+    assert y["p"] == y["q"] < y["p ∧ q"] < y["q ∧ p"]
+    assert len({tuple(p) for p in positions}) == len(arrays.nodes)
+
+
+def test_cyclic_graphs_get_a_force_layout():
+    sources, targets = numpy.array([0, 1, 2]), numpy.array([1, 2, 0])
+    assert longest_path_layers(3, sources, targets) is None
+    positions = compute_layout(3, sources, targets)
+    assert positions.shape == (3, 2) and numpy.isfinite(positions).all()
+
+
+def test_structural_hash_ignores_attributes():
+    graph = networkx.MultiDiGraph([(1, 2), (1, 2)])
+    key = structural_hash(graph)
+    graph.nodes[1]["formula"] = "p"
+    assert structural_hash(graph) == key
+    graph.add_edge(2, 1)
+    assert structural_hash(graph) != key
+
+
+def test_cache_seeds_incremental_layouts():
+    graph = networkx.cycle_graph(20, create_using=networkx.DiGraph)
+    arrays = GraphArrays(graph)
+    cache = LayoutCache()
+    coordinates = compute_layout(len(arrays.nodes), arrays.sources, arrays.targets)
+    cache.put(structural_hash(graph), Layout(arrays.nodes, coordinates))
+
+    graph.add_edge(19, "new")
+    arrays = GraphArrays(graph)
+    initial, known = cache.seed(arrays)
+    assert known.tolist() == [True] * 20 + [False]
+    positions = compute_layout(len(arrays.nodes), arrays.sources, arrays.targets, initial, known)
+    # Only the new node and its neighbour move.
+    assert numpy.allclose(positions[:19], coordinates[:19])
+
+
+def test_sub_proof_clusters_collapse_single_use_premises():
+    # Premises point at the step that uses them; "lemma" is used twice, so it stays out of the other sub-proofs.
+    graph = networkx.DiGraph(
+        [("a", "lemma"), ("b", "lemma"), ("lemma", "x"), ("lemma", "y"), ("x", "goal"), ("y", "goal")]
+    )
+    clusters = dict(zip(graph.nodes, sub_proof_clusters(graph, GraphArrays(graph)).tolist()))
+    assert clusters["a"] == clusters["b"] == clusters["lemma"]
+    assert clusters["x"] == clusters["y"] == clusters["goal"] != clusters["lemma"]
+    cyclic = networkx.DiGraph([(0, 1), (1, 2), (2, 0), (2, 3), (4, 3)])
+    assert sub_proof_clusters(cyclic, GraphArrays(cyclic), max_size=3).tolist() == [1, 1, 1, 0, 0]
+
+
+def test_level_of_detail_view():
+    graph = networkx.DiGraph([(i, (i - 1) // 2) for i in range(1, 255)])
+    arrays = GraphArrays(graph)
+    level_of_detail = LevelOfDetail(graph, Layout(arrays.nodes, compute_layout(255, arrays.sources, arrays.targets)))
+
+    overview, positions = level_of_detail.view()
+    summaries = [node for node in overview.nodes if isinstance(node, tuple)]
+    assert all(node[0] == CLUSTER for node in summaries)
+    assert sum(overview.nodes[node]["size"] for node in summaries) + len(overview) - len(summaries) == 255
+    assert len(overview) < 255 // 3
+    assert set(positions) == set(overview.nodes)
+
+    x, y = positions[summaries[0]]
+    detail, _ = level_of_detail.view((x - 200, y - 200, x + 200, y + 200), scale=1.0)
+    assert 0 < detail.number_of_nodes() < 255
+    assert not any(isinstance(node, tuple) for node in detail.nodes)
+
+    level_of_detail.expanded.add(level_of_detail.cluster_of(0))
+    expanded, _ = level_of_detail.view()
+    assert 0 in expanded.nodes and expanded.nodes[0] == {}
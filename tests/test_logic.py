@@ -0,0 +1,354 @@
+import multiprocessing
+import os
+import pathlib
+import pickle
+import random
+import subprocess
+import sys
+
+import networkx
+import pytest
+
+from logic.formula import (
+    And,
+    Implies,
+    Meta,
+    Not,
+    Or,
+    Predicate,
+    Sequent,
+    Top,
+    Var,
+    fingerprint,
+    subterms,
+    tree_size,
+)
+from logic.lemmas import LemmaStore, canonical, index_texts
+from logic.parallel import CACHED, ParallelProver, SharedCache, digest
+from logic.parser import FormulaSyntaxError, parse, parse_formula, parse_sequent, parse_substitution
+from logic.prover import Prover, derivation_graph, prove
+from logic.semantics import check_all, check_graph, is_valid
+import logic.unify
+from logic.unify import Substitution, apply_rule, match, rule_instances, substitute_graph, unify
+from logic.verifier import ASSUMED, DEPENDS, INVALID, VALID, Verifier
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("p & q -> r", "p ∧ q → r"),
+        ("a -> b -> c", "a → b → c"),
+        ("(a -> b) -> c", "(a → b) → c"),
+        ("a | b & c", "a ∨ b ∧ c"),
+        ("~~p", "¬¬p"),
+        ("∀x. P(x) ∧ Q(f(x, y))", "∀x (P(x) ∧ Q(f(x, y)))"),
+        ("∃x P(x) → ⊥", "∃x P(x) → ⊥"),
+    ],
+)
+def test_parse_round_trip(text, expected):
+    formula = parse_formula(text)
+    assert str(formula) == expected
+    assert parse_formula(expected) is formula
+
+
+def test_hash_consing():
+    left = parse_formula("(p → q) ∧ (p → q)")
+    assert left.left is left.right
+    assert And(Implies(Predicate("p"), Predicate("q")), Implies(Predicate("p"), Predicate("q"))) is left
+    assert len(subterms(left)) == 4
+    assert tree_size(left) == 7
+    assert pickle.loads(pickle.dumps(left)) is left
+
+
+def test_deep_formula():
+    formula = Predicate("p")
+    for _ in range(10000):
+        formula = And(formula, Predicate("p"))
+    assert str(formula).count("∧") == 10000
+
+
+def test_parse_deep_nesting():
+    n = 5000
+    assert parse("(" * n + "p" + ")" * n) is Predicate("p")
+    assert str(parse("p → " * n + "q")).count("→") == n
+    assert str(parse("¬" * n + "p")).count("¬") == n
+    assert str(parse("∀x. " * n + "P(x)")).count("∀") == n
+    assert str(parse("P(" + "f(" * n + "x" + ")" * (n + 1))).count("f(") == n
+    with pytest.raises(FormulaSyntaxError):
+        parse("(" * n + "p" + ")" * (n - 1))
+
+
+def test_sequent():
+    sequent = parse_sequent("q, p |- p & q")
+    assert sequent is Sequent([Predicate("p"), Predicate("q")], [parse("p ∧ q")])
+    assert str(sequent) == "p, q ⊢ p ∧ q"
+    assert parse("⊢ p") is Sequent([], [Predicate("p")])
+    assert Var("x") is not Predicate("x")
+
+
+@pytest.mark.parametrize("text", ["p & & q", "p $ q", "(p", "p q", "∀x", "p ⊢ q ⊢ r"])
+def test_syntax_error(text):
+    with pytest.raises(FormulaSyntaxError):
+        parse(text)
+
+
+@pytest.mark.parametrize(
+    "text, provable",
+    [
+        ("⊢ ((p → q) → p) → p", True),
+        ("⊢ p ∨ ¬p", True),
+        ("p → q ⊢ q → p", False),
+        ("∀x (P(x) → Q(x)), ∀x P(x) ⊢ ∀x Q(x)", True),
+        ("⊢ ∃x (P(x) → ∀y P(y))", True),
+        ("∃x P(x) ⊢ ∀x P(x)", False),
+        ("P(c), ∀x (P(x) → P(f(x))) ⊢ P(f(f(c)))", True),
+    ],
+)
+def test_prove(text, provable):
+    derivation = prove(parse_sequent(text))
+    assert (derivation is not None) == provable
+    if provable:
+        graph = derivation_graph(derivation)
+        assert networkx.is_directed_acyclic_graph(graph)
+        assert [node for node in graph if graph.out_degree(node) == 0] == [str(parse_sequent(text))]
+
+
+def test_prover_table():
+    sequent = parse_sequent("(a ∨ b) ∧ (a ∨ b) → c, a ∨ b ⊢ c ∨ ¬c ∧ (a → c)")
+    prover = Prover()
+    assert prover.prove(sequent) is not None
+    assert prover.hits > 0
+    bounded = Prover(max_entries=2)
+    assert bounded.prove(sequent) is not None
+    assert len(bounded.table) <= 2
+
+
+def test_prover_is_deterministic():
+    code = (
+        "from logic.parser import parse_sequent; from logic.prover import Prover; prover = Prover(); "
+        "derivation = prover.prove(parse_sequent('a ∨ b, a → c ∧ d, b → c ∧ d, c ∧ d → e ∨ f ⊢ (e ∨ f) ∧ (d ∨ a)')); "
+        "print(prover.explored, derivation.rule, len(derivation.premises))"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=pathlib.Path(logic.unify.__file__).parents[1],
+            env={**os.environ, "PYTHONHASHSEED": str(seed)},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in range(4)
+    }
+    assert len(outputs) == 1
+
+
+def test_fingerprint():
+    sequent = parse_sequent("∀x P(f(x), y), p ∨ q ⊢ ¬r, ⊤")
+    assert fingerprint(sequent) is fingerprint(parse_sequent("p ∨ q, ∀x P(f(x), y) ⊢ ⊤, ¬r"))
+    texts = ["p ⊢ q", "q ⊢ p", "p, q ⊢", "⊢ p, q", "P(p) ⊢ q"]
+    assert len({fingerprint(parse_sequent(text)) for text in texts}) == 5
+    code = (
+        "from logic.formula import fingerprint; from logic.parser import parse; "
+        "print(fingerprint(parse('{}')).hex())"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", code.format(sequent)],
+            cwd=pathlib.Path(logic.unify.__file__).parents[1],
+            env={**os.environ, "PYTHONHASHSEED": str(seed)},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in range(2)
+    }
+    assert outputs == {fingerprint(sequent).hex() + "\n"}
+
+
+def test_shared_cache():
+    cache = SharedCache(64, 2, multiprocessing.Lock())
+    try:
+        keys = [digest(parse_sequent(f"p{i} ⊢ q")) for i in range(40)]
+        for i, key in enumerate(keys):
+            cache.put(key, 1 + i % 2)
+        assert [cache.get(key) for key in keys] == [1 + i % 2 for i in range(40)]
+        assert cache.get(digest(parse_sequent("⊢ r"))) == 0
+    finally:
+        cache.close(unlink=True)
+
+
+def test_parallel_prove():
+    sequent = parse_sequent("a ∨ b, a → c ∧ d, b → c ∧ d, c ∧ d → e ∨ f ⊢ (e ∨ f) ∧ (c ∨ ¬c) ∧ (d ∨ a)")
+    prover = ParallelProver(workers=2, task_limit=1, cache_slots=1 << 10)
+    derivation = prover.prove(sequent)
+    assert derivation is not None
+    graph = derivation_graph(derivation)
+    assert all(rule != CACHED for _, rule in graph.nodes(data="rule"))
+    assert [node for node in graph if graph.out_degree(node) == 0] == [str(sequent)]
+    assert ParallelProver(workers=2, cache_slots=1 << 10).prove(parse_sequent("∃x P(x) ⊢ ∀x P(x)")) is None
+
+
+def truth(formula, valuation):
+    if isinstance(formula, Predicate):
+        return valuation[str(formula)]
+    if isinstance(formula, Not):
+        return not truth(formula.operand, valuation)
+    if isinstance(formula, And):
+        return truth(formula.left, valuation) and truth(formula.right, valuation)
+    if isinstance(formula, Or):
+        return truth(formula.left, valuation) or truth(formula.right, valuation)
+    if isinstance(formula, Implies):
+        return not truth(formula.left, valuation) or truth(formula.right, valuation)
+    return isinstance(formula, Top)
+
+
+def random_formula(random, depth, atoms):
+    if depth == 0 or random.random() < 0.2:
+        return Predicate(f"p{random.randrange(atoms)}")
+    connective = random.choice([Not, And, Or, Implies])
+    if connective is Not:
+        return Not(random_formula(random, depth - 1, atoms))
+    return connective(random_formula(random, depth - 1, atoms), random_formula(random, depth - 1, atoms))
+
+
+@pytest.mark.parametrize(
+    "text, valid",
+    [("⊨ ((p → q) → p) → p", True), ("p → q ⊨ q → p", False), ("⊨ ⊤ ∧ ¬⊥", True), ("p, ¬p ⊨ q", True)],
+)
+def test_semantics(text, valid):
+    sequent = parse_sequent(text)
+    assert is_valid(sequent) == valid
+    assert is_valid(sequent, limit=0) == valid
+
+
+def test_semantics_agree():
+    generator = random.Random(0)
+    sequents = [Sequent([random_formula(generator, 3, 10)], [random_formula(generator, 4, 10)]) for _ in range(200)]
+    for sequent, table, solved in zip(sequents, check_all(sequents), check_all(sequents, limit=0)):
+        assert (table is None) == (solved is None) == (prove(sequent) is not None)
+        for valuation in filter(None, [table, solved]):
+            assert all(truth(formula, valuation) for formula in sequent.antecedent)
+            assert not any(truth(formula, valuation) for formula in sequent.succedent)
+
+
+def test_check_graph():
+    graph = derivation_graph(prove(parse_sequent("p ∨ q, p → r, q → r ⊢ r")))
+    graph.add_node("p ⊢ q")
+    graph.add_node("∀x P(x)")
+    results = check_graph(graph)
+    assert results.pop("p ⊢ q") == {"p": True, "q": False}
+    assert "∀x P(x)" not in results
+    assert all(valuation is None for valuation in results.values())
+
+
+def test_unify():
+    substitution = unify(parse("?A ∧ P(?x)"), parse("(p → q) ∧ P(f(?y))"))
+    assert substitution.apply(parse("?A ∨ Q(?x)")) is parse("(p → q) ∨ Q(f(?y))")
+    assert unify(parse("?A"), parse("?A ∧ p")) is None
+    substitution = unify(parse("?A ∧ ?B"), parse("?B ∧ (p → ?C)"))
+    assert substitution.apply(parse("?A ∧ ?C")) is parse("(p → ?C) ∧ ?C")
+    assert match(parse("?A ∧ ?A"), parse("?B ∧ p")) is None
+    assert match(parse("?A ∧ ?A"), parse("?B ∧ ?B")).apply(parse("?A")) is parse("?B")
+
+
+def test_substitution_shares_structure():
+    formula = Meta("A")
+    for _ in range(1000):
+        formula = And(formula, formula)
+    substitution = Substitution({Meta("A"): Meta("B"), Meta("B"): parse("p ∧ q")})
+    result = substitution.apply(formula)
+    assert len(subterms(result)) == 1003
+    assert substitution.apply(Implies(formula, Predicate("r"))).left is result
+    assert substitution.bindings[Meta("A")] is parse("p ∧ q")
+
+
+def test_graph_rules():
+    graph = networkx.DiGraph()
+    graph.add_nodes_from(["p", "p → q", "q → r", "?X → s", "?X"])
+    assert apply_rule(graph, [parse("?A"), parse("?A → ?B")], parse("?B"), "MP") == 2
+    assert apply_rule(graph, [parse("?A"), parse("?A → ?B")], parse("?B"), "MP") == 1
+    assert set(graph.predecessors("r")) == {"q", "q → r"}
+    assert set(graph.predecessors("s")) == {"?X", "?X → s"}
+    substituted = substitute_graph(graph, parse_substitution("?X := t ∧ u, x := y"))
+    assert set(substituted.predecessors("s")) == {"t ∧ u", "t ∧ u → s"}
+
+
+@pytest.mark.parametrize("premises", [["?A", "?A → ?B"], ["?A → ?B", "?A"], ["?A → ?B", "?B → ?C"]])
+def test_rule_instances_scale(premises, monkeypatch):
+    n = 2000
+    formulas = {parse(f"p{i}") for i in range(n)} | {parse(f"p{i} → p{i + 1}") for i in range(n)}
+    calls = []
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return match(*args, **kwargs)
+
+    monkeypatch.setattr(logic.unify, "match", counted)
+    instances = rule_instances([parse(p) for p in premises], parse("?B"), formulas)
+    assert len(instances) == (n if "?A" in premises else n - 1)
+    # Each premise that is not looked up is tried against the formulas of one index bucket only.
+    assert len(calls) <= 4 * n
+
+
+def test_verifier():
+    graph = derivation_graph(prove(parse_sequent("∀x P(x) ⊢ ∃y P(y) ∧ (q → q)")))
+    verifier = Verifier(graph)
+    changed = verifier.verify()
+    assert set(changed.values()) == set(verifier.status.values()) == {VALID}
+    # Statuses are left to the caller to show, since verify runs on a worker thread.
+    assert not any("status" in data for _, data in graph.nodes(data=True))
+    root = "∀x P(x) ⊢ ∃y P(y) ∧ (q → q)"
+    changed = verifier.replace_node("q, ∀x P(x) ⊢ q", "q, ∀x P(x) ⊢ r")
+    assert changed == {"q, ∀x P(x) ⊢ r": INVALID, "∀x P(x) ⊢ q → q": INVALID, root: DEPENDS}
+    assert verifier.replace_node("q, ∀x P(x) ⊢ r", "q, ∀x P(x) ⊢ q")[root] == VALID
+
+
+def test_verifier_after_apply_rule():
+    graph = networkx.DiGraph()
+    graph.add_nodes_from(["p", "p → q"])
+    Verifier(graph).verify()
+    apply_rule(graph, [parse("?A"), parse("?A → ?B")], parse("?B"), "?A, ?A → ?B ⊢ ?B")
+    # The graph changed in place, so the tools widget verifies it with a new Verifier.
+    verifier = Verifier(graph)
+    assert verifier.verify()["q"] == VALID
+    assert verifier.replace_node("q", "r")["r"] == INVALID
+    # A verifier that has not verified yet checks the whole graph after an edit.
+    assert Verifier(graph).replace_node("r", "q") == {"p": ASSUMED, "p → q": ASSUMED, "q": VALID}
+
+
+def test_verifier_rules():
+    graph = networkx.DiGraph()
+    graph.add_edge("q", "q ∨ r ∧ s", rule="?A ⊢ ?A ∨ ?B")
+    graph.add_edge("q", "r ∨ q", rule="?A ⊢ ?A ∨ ?B")
+    graph.add_edge("p → q", "¬q → ¬p")
+    graph.add_edge("p → q", "q → p")
+    verifier = Verifier(graph)
+    verifier.verify()
+    assert verifier.status["q ∨ r ∧ s"] == VALID and verifier.status["r ∨ q"] == INVALID
+    assert verifier.status["¬q → ¬p"] == VALID and verifier.status["q → p"] == INVALID
+
+
+def test_lemma_store(tmp_path):
+    assert canonical(parse_sequent("∀x ∃y R(x, y) ⊢ ∀a ∃b R(a, b)")) == canonical(
+        parse_sequent("∀u ∃v R(u, v) ⊢ ∀x ∃y R(x, y)")
+    )
+    assert canonical(parse_sequent("⊢ ∀x P(x, y)")) != canonical(parse_sequent("⊢ ∀y P(y, y)"))
+    sequent = parse_sequent("⊢ ∀x P(x) → P(c)")
+    store = LemmaStore(tmp_path / "lemmas.sqlite3", cache_size=1)
+    store.add(prove(sequent))
+    store.add(prove(parse_sequent("⊢ p ∨ ¬p")))
+    store.close()
+    store = LemmaStore(tmp_path / "lemmas.sqlite3")
+    derivation = store.get(parse_sequent("⊢ ∀z P(z) → P(c)"))
+    assert derivation.sequent is sequent and len(store) == 2
+    assert store.get(parse_sequent("⊢ ∀z P(z) → P(d)")) is None
+    assert store.search("p(C)") == [str(sequent)] and len(store.search("p")) == 2
+
+
+def test_trigram_index():
+    index = index_texts((i, f"p{i} ∧ q") for i in range(1000))
+    assert sorted(index.search("P99")) == [99, 990, 991, 992, 993, 994, 995, 996, 997, 998, 999]
+    assert len(index.search("∧", limit=5)) == 5 and index.search("r") == []
+    index.remove(99)
+    assert 99 not in index.search("p99 ")
@@ -0,0 +1,33 @@
+import logging
+
+from widgets.logstore import LogRecordStore
+
+
+def filled_store():
+    store = LogRecordStore()
+    for i in range(100):
+        level = [logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR][i % 4]
+        store.append(level, ["main_window", "widgets.graphwidget"][i % 2], 1.5 + i, f"record {i} ⊢ p")
+    return store
+
+
+def test_select_by_level_logger_and_text():
+    store = filled_store()
+    assert list(store.select()) == list(range(100))
+    assert list(store.select(logging.WARNING)) == [i for i in range(100) if i % 4 >= 2]
+    assert list(store.select(0, {"widgets.graphwidget"})) == list(range(1, 100, 2))
+    assert list(store.select(logging.ERROR, {"widgets.graphwidget"})) == list(range(3, 100, 4))
+    assert list(store.select(0, {"unknown"})) == []
+    assert list(store.select(0, None, "record 4")) == [4, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49]
+    assert list(store.select(logging.ERROR, None, "record 4")) == [43, 47]
+    assert store.matches(43, logging.ERROR, {"widgets.graphwidget"}, "⊢")
+
+
+def test_store_discards_oldest_half_when_full():
+    store = filled_store()
+    store.MAX_RECORDS = 100
+    assert store.append(logging.CRITICAL, "proofy", 200.0, "newest")
+    assert (len(store), store.first) == (51, 50)
+    assert store.message(0) == "record 50 ⊢ p" and store.message(50) == "newest"
+    assert list(store.select(logging.CRITICAL)) == [50]
+    assert list(store.select(0, {"main_window"}, "record 9")) == [40, 42, 44, 46, 48]
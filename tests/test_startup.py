@@ -0,0 +1,14 @@
+import startup
+
+
+def test_startup_report(monkeypatch):
+    monkeypatch.setattr(startup, "MARKS", [])
+    monkeypatch.setattr(startup, "START", 1.0)
+    startup.MARKS.extend([("Qt imported", 1.25), ("main window shown", 2.0)])
+    lines = startup.report().splitlines()
+    assert lines[1].split() == ["250.0", "ms", "Qt", "imported"]
+    assert lines[2].split()[0] == "750.0" and lines[-1].split() == ["1000.0", "ms", "total"]
+
+
+def test_preload():
+    startup.preload()
@@ -0,0 +1,46 @@
+import json
+import threading
+
+import networkx
+
+import tracing
+from formats.registry import read_graph, write_graph
+
+
+def test_spans(tmp_path):
+    tracing.clear()
+    graph = networkx.path_graph(10, create_using=networkx.DiGraph)
+    write_graph(graph, tmp_path / "graph.pgb")
+    read_graph(tmp_path / "graph.pgb")
+    thread = threading.Thread(target=lambda: tracing.record("web render", 0, 1000), name="page")
+    thread.start()
+    thread.join()
+    assert [name for name, *_ in tracing.spans()] == ["save", "parse", "graph build", "open", "web render"]
+    assert [row[:2] for row in tracing.summary()][-1] == ("web render", 1)
+
+    path = tmp_path / "trace.json"
+    tracing.write_chrome_trace(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert {"name": "page"} in [event["args"] for event in events if event["ph"] == "M"]
+    complete = [event for event in events if event["ph"] == "X"]
+    assert complete[0]["name"] == "save" and complete[0]["args"]["nodes"] == "10"
+    assert complete[-1]["ts"] == 0 and complete[-1]["dur"] == 1.0
+
+
+def test_ring_buffer():
+    tracing.clear()
+    for i in range(tracing.RING_SIZE + 10):
+        tracing.record("tick", i, 1)
+    assert len(tracing.spans()) == tracing.RING_SIZE and tracing.spans()[0][2] == 10
+
+
+def test_profile_next(tmp_path):
+    tracing.profile_next("slow")
+    with tracing.span("fast"):
+        pass
+    with tracing.span("slow"):
+        sorted(range(1000), key=str)
+    assert tracing.PROFILE["target"] is None
+    assert "sorted" in tracing.last_profile()
+    tracing.save_profile(tmp_path / "slow.prof")
+    assert (tmp_path / "slow.prof").stat().st_size > 0